@@ -10,6 +10,14 @@ import numpy as np
 from typing import Dict, List, Tuple, Any
 import re
 
+try:
+    from page_rasterizer import cached_page_text
+    from spatial_word_index import page_index
+except ImportError:
+    from backend.page_rasterizer import cached_page_text
+    from backend.spatial_word_index import page_index
+
+
 class AICoordinateLearner:
     """Learn field positions from filled JO sample using computer vision"""
     
@@ -66,7 +74,7 @@ class AICoordinateLearner:
         """Learn header field positions from the sample"""
         
         # Get all text on the page with positions
-        text_dict = page.get_text("dict")
+        text_dict = cached_page_text(page)
         
         # If no text found, this might be an image-based PDF
         if not text_dict.get('blocks'):
@@ -85,68 +93,53 @@ class AICoordinateLearner:
             'Measure By': 'measure_by'
         }
         
-        for block in text_dict.get('blocks', []):
-            if 'lines' not in block:
+        index = page_index(page)
+        
+        for label, field_name in header_labels.items():
+            matches = index.find_all(label)
+            if not matches:
                 continue
-                
-            for line in block['lines']:
-                for span in line['spans']:
-                    text = span['text'].strip()
-                    
-                    # Check if this text matches a header label
-                    for label, field_name in header_labels.items():
-                        if label.lower() in text.lower():
-                            # Found a header label, now find where data should go
-                            label_bbox = span['bbox']
-                            
-                            # Data position is typically to the right of the label
-                            # Look for actual data in the sample
-                            data_position = self.find_data_position_for_label(
-                                page, label_bbox, field_name
-                            )
-                            
-                            coordinates['header_fields'][field_name] = {
-                                'label_position': {
-                                    'x': label_bbox[0],
-                                    'y': label_bbox[1], 
-                                    'width': label_bbox[2] - label_bbox[0],
-                                    'height': label_bbox[3] - label_bbox[1]
-                                },
-                                'data_position': data_position,
-                                'font_size': span['size']
-                            }
+            
+            # The last occurrence on the page wins, as in a top-to-bottom read
+            span = matches[-1]
+            label_bbox = span.bbox
+            
+            # Data position is typically to the right of the label
+            # Look for actual data in the sample
+            data_position = self.find_data_position_for_label(
+                page, label_bbox, field_name
+            )
+            
+            coordinates['header_fields'][field_name] = {
+                'label_position': {
+                    'x': label_bbox[0],
+                    'y': label_bbox[1], 
+                    'width': label_bbox[2] - label_bbox[0],
+                    'height': label_bbox[3] - label_bbox[1]
+                },
+                'data_position': data_position,
+                'font_size': span.size
+            }
     
     def find_data_position_for_label(self, page, label_bbox: Tuple, field_name: str) -> Dict:
         """Find where data appears relative to the label"""
         
-        # Get all text near the label
-        text_dict = page.get_text("dict")
         label_right = label_bbox[2]
         label_y = label_bbox[1]
         
-        # Look for data in the same row, to the right of the label
-        for block in text_dict.get('blocks', []):
-            if 'lines' not in block:
-                continue
-                
-            for line in block['lines']:
-                for span in line['spans']:
-                    span_bbox = span['bbox']
-                    text = span['text'].strip()
-                    
-                    # Check if this text is in the same row and to the right
-                    if (abs(span_bbox[1] - label_y) < 10 and  # Same row (within 10 points)
-                        span_bbox[0] > label_right and        # To the right of label
-                        text and                              # Has content
-                        not self.is_label_text(text)):       # Not another label
-                        
-                        return {
-                            'x': span_bbox[0],
-                            'y': span_bbox[1],
-                            'width': span_bbox[2] - span_bbox[0],
-                            'height': span_bbox[3] - span_bbox[1],
-                            'sample_text': text
-                        }
+        # Nearest non-label text in the same row (within 10 points), right of the label
+        candidates = page_index(page).right_of(
+            label_bbox, tolerance=10, predicate=lambda item: not self.is_label_text(item.text)
+        )
+        if candidates:
+            span_bbox = candidates[0].bbox
+            return {
+                'x': span_bbox[0],
+                'y': span_bbox[1],
+                'width': span_bbox[2] - span_bbox[0],
+                'height': span_bbox[3] - span_bbox[1],
+                'sample_text': candidates[0].text
+            }
         
         # If no data found, estimate position
         return {
@@ -161,7 +154,7 @@ class AICoordinateLearner:
         """Learn door table structure and positions"""
         
         # Find the door table by looking for specific text patterns
-        text_dict = page.get_text("dict")
+        index = page_index(page)
         
         # Door table headers to look for
         door_headers = [
@@ -170,23 +163,18 @@ class AICoordinateLearner:
             'OPEN HOLE TYPE', 'DRAWING REMARK'
         ]
         
-        # Find table header positions
+        # Find table header positions: text containing the header, or a fragment of it
+        # (headers often wrap over several spans); the last match on the page wins
         header_positions = {}
-        for block in text_dict.get('blocks', []):
-            if 'lines' not in block:
-                continue
-                
-            for line in block['lines']:
-                for span in line['spans']:
-                    text = span['text'].strip()
-                    
-                    for header in door_headers:
-                        if header.lower() in text.lower() or text.upper() in header:
-                            header_positions[header] = {
-                                'x': span['bbox'][0],
-                                'y': span['bbox'][1],
-                                'width': span['bbox'][2] - span['bbox'][0]
-                            }
+        for header in door_headers:
+            matches = index.find_all(header) + index.find_within(header)
+            if matches:
+                span = max(matches, key=lambda item: item.order)
+                header_positions[header] = {
+                    'x': span.bbox[0],
+                    'y': span.bbox[1],
+                    'width': span.bbox[2] - span.bbox[0]
+                }
         
         coordinates['door_table']['headers'] = header_positions
         
@@ -199,7 +187,7 @@ class AICoordinateLearner:
     def learn_door_rows(self, page, coordinates: Dict):
         """Learn door table row positions from sample data"""
         
-        text_dict = page.get_text("dict")
+        text_dict = cached_page_text(page)
         
         # Look for laminate codes (like 6S-A057) to identify data rows
         laminate_pattern = r'[0-9]+[A-Z]-[A-Z0-9]+'
@@ -233,38 +221,30 @@ class AICoordinateLearner:
     def find_row_data(self, page, reference_bbox: Tuple) -> Dict:
         """Find all data in the same row as the reference"""
         
-        text_dict = page.get_text("dict")
         row_y = reference_bbox[1]
         row_data = {}
         
         # Look for size patterns (like 850MM x 2021MM)
         size_pattern = r'\d+MM?\s*[xX×]\s*\d+MM?'
         
-        for block in text_dict.get('blocks', []):
-            if 'lines' not in block:
-                continue
-                
-            for line in block['lines']:
-                for span in line['spans']:
-                    span_bbox = span['bbox']
-                    text = span['text'].strip()
-                    
-                    # Check if in same row (within 20 points vertically)
-                    if abs(span_bbox[1] - row_y) < 20 and text:
-                        
-                        # Classify the text type
-                        if re.search(size_pattern, text):
-                            row_data['door_size'] = {
-                                'text': text,
-                                'x': span_bbox[0],
-                                'y': span_bbox[1]
-                            }
-                        elif 'Location' in text:
-                            row_data['location'] = {
-                                'text': text,
-                                'x': span_bbox[0],
-                                'y': span_bbox[1]
-                            }
+        # Everything in the same row (within 20 points vertically)
+        for span in page_index(page).in_row(row_y, 20):
+            span_bbox = span.bbox
+            text = span.text
+            
+            # Classify the text type
+            if re.search(size_pattern, text):
+                row_data['door_size'] = {
+                    'text': text,
+                    'x': span_bbox[0],
+                    'y': span_bbox[1]
+                }
+            elif 'Location' in text:
+                row_data['location'] = {
+                    'text': text,
+                    'x': span_bbox[0],
+                    'y': span_bbox[1]
+                }
         
         return row_data
     
@@ -272,8 +252,6 @@ class AICoordinateLearner:
         """Learn checkbox positions for door specifications"""
         
         # Look for checkbox symbols and their associated text
-        text_dict = page.get_text("dict")
-        
         checkbox_groups = {
             'door_thickness': ['37mm', '43mm', '48mm'],
             'door_type': ['S/L', 'D/L', 'Unequal D/L'],
@@ -298,31 +276,22 @@ class AICoordinateLearner:
     def find_checkbox_option_position(self, page, option_text: str) -> Dict:
         """Find the position of a checkbox option"""
         
-        text_dict = page.get_text("dict")
-        
-        for block in text_dict.get('blocks', []):
-            if 'lines' not in block:
-                continue
-                
-            for line in block['lines']:
-                for span in line['spans']:
-                    text = span['text'].strip()
-                    
-                    if option_text.lower() in text.lower():
-                        return {
-                            'text_x': span['bbox'][0],
-                            'text_y': span['bbox'][1],
-                            'checkbox_x': span['bbox'][0] - 15,  # Checkbox typically before text
-                            'checkbox_y': span['bbox'][1] + 2,   # Slightly below text baseline
-                            'font_size': span['size']
-                        }
+        span = page_index(page).find_first(option_text)
+        if span:
+            return {
+                'text_x': span.bbox[0],
+                'text_y': span.bbox[1],
+                'checkbox_x': span.bbox[0] - 15,  # Checkbox typically before text
+                'checkbox_y': span.bbox[1] + 2,   # Slightly below text baseline
+                'font_size': span.size
+            }
         
         return None
     
     def learn_frame_table_structure(self, page, coordinates: Dict):
         """Learn frame table structure from page 2"""
         
-        text_dict = page.get_text("dict")
+        index = page_index(page)
         
         # Frame table headers
         frame_headers = [
@@ -330,23 +299,17 @@ class AICoordinateLearner:
             'INNER OR OUTER', 'FRAME PROFILE', 'DRAWING REMARK'
         ]
         
-        # Similar process as door table
+        # Similar process as door table (last match on the page wins)
         header_positions = {}
-        for block in text_dict.get('blocks', []):
-            if 'lines' not in block:
-                continue
-                
-            for line in block['lines']:
-                for span in line['spans']:
-                    text = span['text'].strip()
-                    
-                    for header in frame_headers:
-                        if header.lower() in text.lower():
-                            header_positions[header] = {
-                                'x': span['bbox'][0],
-                                'y': span['bbox'][1],
-                                'width': span['bbox'][2] - span['bbox'][0]
-                            }
+        for header in frame_headers:
+            matches = index.find_all(header)
+            if matches:
+                span = matches[-1]
+                header_positions[header] = {
+                    'x': span.bbox[0],
+                    'y': span.bbox[1],
+                    'width': span.bbox[2] - span.bbox[0]
+                }
         
         coordinates['frame_table'] = {
             'headers': header_positions,
@@ -358,7 +321,7 @@ class AICoordinateLearner:
         """Learn frame table row positions"""
         
         # Look for frame laminate codes (like 6S-145)
-        text_dict = page.get_text("dict")
+        text_dict = cached_page_text(page)
         frame_rows = []
         
         # Similar to door rows but for frame data
@@ -1,17 +1,10 @@
 from flask import Flask, request, render_template, jsonify, send_file, redirect, url_for, flash
 import os
-import cv2
-from PIL import Image
-import pandas as pd
-import numpy as np
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import json
 import re
 from dotenv import load_dotenv
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib.units import inch
 
 # Import our enhanced OCR providers
 from azure_form_recognizer import SendoraFormRecognizer
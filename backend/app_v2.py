@@ -19,7 +19,10 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_RIGHT
 
 # Import our processors
-from google_document_ai import GoogleDocumentProcessor
+from ensemble_ocr import create_document_processor
+from singleflight import process_document_once
+from idempotency import idempotent
+from storage_layout import storage_for
 from sendora_template_filler import SendoraTemplateFiller
 from precise_template_overlay import PreciseTemplateOverlay
 from smart_form_filler import SmartFormFiller
@@ -55,6 +58,7 @@ def convert_html_to_pdf_for_download(html_path):
     # Generate PDF filename
     html_name = Path(html_path).stem
     pdf_path = os.path.join(pdf_dir, f"{html_name}.pdf")
+    storage_for(JO_FOLDER).register(pdf_path, 'JO_PDF')
     
     # Try wkhtmltopdf first (most reliable)
     wkhtmltopdf_paths = [
@@ -150,7 +154,7 @@ for folder in [UPLOAD_FOLDER, JO_FOLDER, TEMP_FOLDER]:
 validation_sessions = {}
 
 # Initialize processors
-document_processor = GoogleDocumentProcessor()
+document_processor = create_document_processor()
 template_filler = SendoraTemplateFiller()
 precise_overlay = PreciseTemplateOverlay()
 smart_filler = SmartFormFiller()
@@ -190,15 +194,15 @@ def upload_file():
     
     try:
         # Save uploaded file
-        filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"{timestamp}_{filename}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
+        # Keep the original name (document type detection reads it) but make the path unique
+        stem, ext = os.path.splitext(secure_filename(file.filename))
+        filepath = storage_for(UPLOAD_FOLDER).new_path('UPLOAD', ext, label=stem or 'UPLOAD')
+        filename = os.path.basename(filepath)
         file.save(filepath)
         
         # Process with Google Document AI
         print(f"Processing file: {filename}")
-        extracted_data = document_processor.process_document(filepath)
+        extracted_data = process_document_once(document_processor, filepath)
         
         # Create validation session
         session_id = str(uuid.uuid4())
@@ -281,6 +285,7 @@ def save_validation():
     return jsonify({'status': 'saved', 'message': 'Progress saved successfully'})
 
 @app.route('/api/generate-jo', methods=['POST'])
+@idempotent('generate_jo')
 def generate_jo():
     """Generate Job Order from validated data"""
     
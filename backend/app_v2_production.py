@@ -3,7 +3,7 @@ Sendora OCR V2.0 - Production Flask Application
 Enhanced version with security, rate limiting, and demo controls
 """
 
-from flask import Flask, request, jsonify, render_template, send_file, redirect, url_for
+from flask import Flask, request, jsonify, render_template, send_file, redirect, url_for, Response, stream_with_context
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from werkzeug.utils import secure_filename
@@ -11,15 +11,26 @@ import os
 import uuid
 import json
 import time
+import shutil
+import zipfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 import logging
 from functools import wraps
 
 # Import our core modules
-from backend.google_document_ai import GoogleDocumentProcessor
-from backend.simple_working_template import SimpleWorkingTemplate
-from backend.fixed_responsive_template import FixedResponsiveTemplate
-from backend.exact_replica_template import ExactReplicaTemplate
+from backend.ensemble_ocr import create_document_processor
+from backend.progress_events import progress_tracker
+from backend.pipeline_metrics import pipeline_metrics
+from backend.ocr_resilience import breaker_status
+from backend.singleflight import process_document_once
+from backend.shared_store import shared_store
+from backend.idempotency import idempotent
+from backend.storage_layout import storage_for
+from backend.health_checks import health_checks, DocumentAIProbe, pdf_converter_probe, storage_probe
+# Heavy dependencies (Document AI SDK, PyMuPDF, NumPy/PIL, the JO generator) load
+# on first use; gunicorn.conf.py preloads them in the master when preload is on
 
 # Production configuration
 class ProductionConfig:
@@ -33,6 +44,16 @@ class ProductionConfig:
     RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
     MAX_REQUESTS_PER_MINUTE = int(os.environ.get('MAX_REQUESTS_PER_MINUTE', '10'))
     AUTO_CLEANUP_HOURS = int(os.environ.get('AUTO_CLEANUP_HOURS', '2'))
+    CLEANUP_INTERVAL_SECONDS = int(os.environ.get('CLEANUP_INTERVAL_SECONDS', '900'))
+    
+    # Batch upload settings
+    BATCH_CONCURRENCY = int(os.environ.get('BATCH_CONCURRENCY', '3'))
+    BATCH_MAX_FILES = int(os.environ.get('BATCH_MAX_FILES', '50'))
+    BATCH_MAX_UNCOMPRESSED = int(os.environ.get('BATCH_MAX_UNCOMPRESSED', str(200 * 1024 * 1024)))  # 200MB
+    
+    # Async uploads (progress streamed over /progress/<job_id>)
+    UPLOAD_ASYNC_WORKERS = int(os.environ.get('UPLOAD_ASYNC_WORKERS', '4'))
+    PROGRESS_STREAM_SECONDS = int(os.environ.get('PROGRESS_STREAM_SECONDS', '60'))
     
     # Google Cloud
     GOOGLE_APPLICATION_CREDENTIALS = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS', '/app/config/google-credentials.json')
@@ -58,8 +79,20 @@ logger = logging.getLogger(__name__)
 # )
 # limiter.init_app(app)
 
+# Dependency probes for /health/ready, refreshed in the background per worker
+health_checks.register('google_document_ai', DocumentAIProbe())
+health_checks.register('pdf_converter', pdf_converter_probe, critical=False)  # JOs fall back to HTML
+health_checks.register('storage', storage_probe([app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']],
+                                                shared_store))
+
 # Global session storage (in production, use Redis)
 validation_sessions = {}
+# Batches are processed by the worker that accepted them; every change is mirrored
+# to shared_store so a status poll answered by any worker sees it
+batch_jobs = {}
+batch_lock = threading.Lock()
+upload_executor = ThreadPoolExecutor(max_workers=app.config['UPLOAD_ASYNC_WORKERS'],
+                                     thread_name_prefix='upload')
 usage_stats = {
     'total_uploads': 0,
     'successful_conversions': 0,
@@ -95,6 +128,19 @@ def allowed_file(filename):
     
     return True
 
+def create_validation_session(file_path, filename, extracted_data, file_size):
+    """Register extracted data for human validation and return the session id"""
+    session_id = str(uuid.uuid4())
+    validation_sessions[session_id] = {
+        'file_path': file_path,
+        'filename': filename,
+        'extracted_data': extracted_data,
+        'timestamp': datetime.now(),
+        'status': 'pending_validation',
+        'file_size': file_size
+    }
+    return session_id
+
 def update_usage_stats(processing_time, success=True):
     """Update usage statistics"""
     global usage_stats
@@ -130,32 +176,37 @@ def index():
 
 @app.route('/health')
 def health_check():
-    """Health check endpoint"""
-    try:
-        # Check Google Document AI connection
-        processor = GoogleDocumentProcessor()
-        google_ai_status = processor.client is not None
-        
-        # Check wkhtmltopdf
-        wkhtmltopdf_status = os.path.exists('/usr/bin/wkhtmltopdf')
-        
-        return jsonify({
-            'status': 'healthy',
-            'version': '2.0',
-            'ocr_accuracy': '95%',
-            'demo_mode': app.config['DEMO_MODE'],
-            'services': {
-                'google_document_ai': google_ai_status,
-                'wkhtmltopdf': wkhtmltopdf_status
-            },
-            'stats': {
-                'total_uploads': usage_stats['total_uploads'],
-                'success_rate': f"{(usage_stats['successful_conversions'] / max(usage_stats['total_uploads'], 1) * 100):.1f}%"
-            }
-        })
-    except Exception as e:
-        logger.error(f"Health check failed: {e}")
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+    """Health summary from the cached dependency probes (never calls a dependency)"""
+    health = health_checks.status()
+    checks = health['checks']
+    return jsonify({
+        'status': 'healthy',
+        'ready': health['ready'],
+        'version': '2.0',
+        'ocr_accuracy': '95%',
+        'demo_mode': app.config['DEMO_MODE'],
+        'services': {
+            'google_document_ai': checks['google_document_ai']['ok'],
+            'wkhtmltopdf': checks['pdf_converter']['ok'],
+            'storage': checks['storage']['ok']
+        },
+        'circuit_breakers': {name: state['state'] for name, state in breaker_status().items()},
+        'stats': {
+            'total_uploads': usage_stats['total_uploads'],
+            'success_rate': f"{(usage_stats['successful_conversions'] / max(usage_stats['total_uploads'], 1) * 100):.1f}%"
+        }
+    })
+
+@app.route('/health/live')
+def health_live():
+    """Liveness: the worker is serving requests"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/health/ready')
+def health_ready():
+    """Readiness: every critical dependency probe passed recently"""
+    health = health_checks.status()
+    return jsonify(health), 200 if health['ready'] else 503
 
 @app.route('/demo-info')
 def demo_info():
@@ -184,10 +235,58 @@ def demo_info():
         }
     })
 
+def run_upload_pipeline(job_id, file_path, filename, file_size, start_time):
+    """OCR a saved upload and open its validation session, publishing each stage"""
+    report = progress_tracker.reporter(job_id)
+    
+    try:
+        # Process with Google Document AI (or the OCR ensemble when OCR_MODE=ensemble)
+        # Identical uploads in flight at the same time share one OCR call
+        processor = create_document_processor()
+        extracted_data = process_document_once(processor, file_path, progress=report)
+        
+        # Create validation session
+        session_id = create_validation_session(file_path, filename, extracted_data, file_size)
+        
+        processing_time = time.time() - start_time
+        update_usage_stats(processing_time, success=True)
+        
+        logger.info(f"Processing completed: {session_id}, time: {processing_time:.2f}s")
+        
+        result = {
+            'success': True,
+            'session_id': session_id,
+            'processing_time': f"{processing_time:.2f}s",
+            'validation_url': f"/validate/{session_id}",
+            'extracted_preview': {
+                'invoice_number': extracted_data.get('invoice_number', 'Not found'),
+                'customer_name': extracted_data.get('customer', {}).get('name', 'Not found'),
+                'door_size': extracted_data.get('door_size', 'Not found'),
+                'door_thickness': extracted_data.get('door_thickness', 'Not found')
+            }
+        }
+        report('session_created', **result)
+        return dict(result, job_id=job_id)
+        
+    except Exception as e:
+        processing_time = time.time() - start_time
+        update_usage_stats(processing_time, success=False)
+        
+        logger.error(f"Upload processing failed: {e}")
+        report('failed', error='Processing failed', details=str(e),
+               processing_time=f"{processing_time:.2f}s")
+        raise
+
 @app.route('/upload', methods=['POST'])
 @demo_mode_required
+@idempotent('upload')
 def upload_file():
-    """Enhanced file upload with demo restrictions"""
+    """Enhanced file upload with demo restrictions
+
+    Optional form fields:
+      job_id - client-generated id, so /progress/<job_id> can be opened before posting
+      async  - '1' returns 202 at once; the result arrives as the session_created event
+    """
     start_time = time.time()
     
     try:
@@ -205,62 +304,244 @@ def upload_file():
                 'supported_formats': ['PDF', 'JPG', 'PNG']
             }), 400
         
-        # Generate secure filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        job_id = request.form.get('job_id') or uuid.uuid4().hex
+        if not progress_tracker.is_valid_job_id(job_id):
+            return jsonify({'error': 'Invalid job_id (8-64 letters, digits, - or _)'}), 400
+        progress_tracker.start(job_id)
+        
+        # Unique sharded path: concurrent uploads can never overwrite each other
         original_ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{timestamp}_INVOICE.{original_ext}"
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+        file_path = storage_for(app.config['UPLOAD_FOLDER']).new_path('INVOICE', original_ext)
+        filename = os.path.basename(file_path)
         
         # Save file
         file.save(file_path)
         file_size = os.path.getsize(file_path)
         
         logger.info(f"File uploaded: {filename}, size: {file_size} bytes")
+        progress_tracker.publish(job_id, 'saved', filename=filename, file_size=file_size)
         
-        # Process with Google Document AI
-        processor = GoogleDocumentProcessor()
-        extracted_data = processor.process_document(file_path)
-        
-        # Create validation session
-        session_id = str(uuid.uuid4())
-        validation_sessions[session_id] = {
-            'file_path': file_path,
-            'filename': filename,
-            'extracted_data': extracted_data,
-            'timestamp': datetime.now(),
-            'status': 'pending_validation',
-            'file_size': file_size
-        }
+        if request.form.get('async') in ('1', 'true'):
+            upload_executor.submit(run_upload_pipeline, job_id, file_path, filename, file_size, start_time)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'progress_url': url_for('upload_progress', job_id=job_id)
+            }), 202
         
-        processing_time = time.time() - start_time
-        update_usage_stats(processing_time, success=True)
-        
-        logger.info(f"Processing completed: {session_id}, time: {processing_time:.2f}s")
-        
-        return jsonify({
-            'success': True,
-            'session_id': session_id,
-            'processing_time': f"{processing_time:.2f}s",
-            'validation_url': url_for('validate_data_get', session_id=session_id),
-            'extracted_preview': {
-                'invoice_number': extracted_data.get('invoice_number', 'Not found'),
-                'customer_name': extracted_data.get('customer', {}).get('name', 'Not found'),
-                'door_size': extracted_data.get('door_size', 'Not found'),
-                'door_thickness': extracted_data.get('door_thickness', 'Not found')
-            }
-        })
+        return jsonify(run_upload_pipeline(job_id, file_path, filename, file_size, start_time))
         
     except Exception as e:
         processing_time = time.time() - start_time
-        update_usage_stats(processing_time, success=False)
-        
-        logger.error(f"Upload processing failed: {e}")
         return jsonify({
             'error': 'Processing failed',
             'details': str(e),
             'processing_time': f"{processing_time:.2f}s"
         }), 500
 
+@app.route('/progress/<job_id>')
+def upload_progress(job_id):
+    """Server-sent events stream of an upload's stage transitions"""
+    if not progress_tracker.is_valid_job_id(job_id):
+        return jsonify({'error': 'Invalid job ID'}), 400
+    
+    # EventSource resends the last id it saw when it reconnects
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', '-1'))
+    except ValueError:
+        last_event_id = -1
+    
+    stream = progress_tracker.stream(job_id, last_event_id,
+                                     max_seconds=app.config['PROGRESS_STREAM_SECONDS'])
+    return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def save_batch_inputs(batch_id, uploads):
+    """Write uploaded files (or the members of one ZIP) to the upload folder
+
+    ZIP members are streamed straight from the archive on disk in chunks, so the
+    archive is never loaded into memory.
+    """
+    storage = storage_for(app.config['UPLOAD_FOLDER'])
+    saved = []
+    
+    def target_path(ext):
+        file_path = storage.new_path('INVOICE', ext, label=f"BATCH_{batch_id[:8]}_{len(saved):03d}_INVOICE")
+        return os.path.basename(file_path), file_path
+    
+    if len(uploads) == 1 and uploads[0].filename.lower().endswith('.zip'):
+        zip_path = storage.new_path('BATCH', 'zip')
+        uploads[0].save(zip_path)
+        try:
+            with zipfile.ZipFile(zip_path) as archive:
+                members = [info for info in archive.infolist()
+                           if not info.is_dir() and allowed_file(os.path.basename(info.filename))]
+                
+                if len(members) > app.config['BATCH_MAX_FILES']:
+                    raise ValueError(f"ZIP contains {len(members)} documents; limit is {app.config['BATCH_MAX_FILES']}")
+                if sum(info.file_size for info in members) > app.config['BATCH_MAX_UNCOMPRESSED']:
+                    raise ValueError('ZIP expands beyond the allowed batch size')
+                
+                for info in members:
+                    filename, file_path = target_path(info.filename.rsplit('.', 1)[1].lower())
+                    with archive.open(info) as src, open(file_path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, 1024 * 1024)
+                    saved.append({
+                        'name': os.path.basename(info.filename),
+                        'filename': filename,
+                        'file_path': file_path
+                    })
+        except zipfile.BadZipFile:
+            raise ValueError('Uploaded ZIP file is corrupt')
+        finally:
+            os.remove(zip_path)
+        return saved
+    
+    if len(uploads) > app.config['BATCH_MAX_FILES']:
+        raise ValueError(f"{len(uploads)} files uploaded; limit is {app.config['BATCH_MAX_FILES']}")
+    
+    for upload in uploads:
+        if not allowed_file(upload.filename):
+            raise ValueError(f"Invalid file type: {upload.filename}")
+        filename, file_path = target_path(upload.filename.rsplit('.', 1)[1].lower())
+        upload.save(file_path)
+        saved.append({
+            'name': upload.filename,
+            'filename': filename,
+            'file_path': file_path
+        })
+    return saved
+
+def publish_batch(batch):
+    """Mirror a batch's state to the shared store (call with batch_lock held)"""
+    shared_store.set(f"batch:{batch['batch_id']}", batch, app.config['AUTO_CLEANUP_HOURS'] * 3600)
+
+def process_batch_file(batch_id, index, processor):
+    """OCR one batch member and attach its validation session"""
+    batch = batch_jobs[batch_id]
+    entry = batch['files'][index]
+    start_time = time.time()
+    
+    with batch_lock:
+        entry['status'] = 'processing'
+        publish_batch(batch)
+    
+    try:
+        file_size = os.path.getsize(entry['file_path'])
+        extracted_data = process_document_once(processor, entry['file_path'])
+        session_id = create_validation_session(entry['file_path'], entry['filename'], extracted_data, file_size)
+        processing_time = time.time() - start_time
+        update_usage_stats(processing_time, success=True)
+        
+        with batch_lock:
+            entry.update({
+                'status': 'completed',
+                'session_id': session_id,
+                'processing_time': f"{processing_time:.2f}s"
+            })
+            publish_batch(batch)
+        logger.info(f"Batch {batch_id}: {entry['name']} -> session {session_id} ({processing_time:.2f}s)")
+        
+    except Exception as e:
+        processing_time = time.time() - start_time
+        update_usage_stats(processing_time, success=False)
+        with batch_lock:
+            entry.update({
+                'status': 'failed',
+                'error': str(e),
+                'processing_time': f"{processing_time:.2f}s"
+            })
+            publish_batch(batch)
+        logger.error(f"Batch {batch_id}: {entry['name']} failed: {e}")
+    
+    finally:
+        with batch_lock:
+            if all(f['status'] in ('completed', 'failed') for f in batch['files']):
+                batch['status'] = 'completed'
+                batch['completed_at'] = datetime.now()
+                publish_batch(batch)
+
+@app.route('/upload/batch', methods=['POST'])
+@demo_mode_required
+def upload_batch():
+    """Accept many files (field 'files') or a single ZIP and process them concurrently"""
+    uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+    if not uploads:
+        return jsonify({'error': 'No files uploaded'}), 400
+    
+    batch_id = str(uuid.uuid4())
+    
+    try:
+        saved = save_batch_inputs(batch_id, uploads)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if not saved:
+        return jsonify({'error': 'No supported documents found. Supported formats: PDF, JPG, PNG'}), 400
+    
+    with batch_lock:
+        batch_jobs[batch_id] = {
+            'batch_id': batch_id,
+            'status': 'processing',
+            'timestamp': datetime.now(),
+            'files': [dict(entry, status='queued', session_id=None, error=None) for entry in saved]
+        }
+        publish_batch(batch_jobs[batch_id])
+    
+    # Per-batch pool: one large batch cannot use more than BATCH_CONCURRENCY OCR slots
+    processor = create_document_processor()
+    executor = ThreadPoolExecutor(max_workers=app.config['BATCH_CONCURRENCY'],
+                                  thread_name_prefix=f"batch-{batch_id[:8]}")
+    for index in range(len(saved)):
+        executor.submit(process_batch_file, batch_id, index, processor)
+    executor.shutdown(wait=False)
+    
+    logger.info(f"Batch {batch_id} accepted: {len(saved)} documents")
+    
+    return jsonify({
+        'success': True,
+        'batch_id': batch_id,
+        'total_files': len(saved),
+        'status_url': url_for('batch_status', batch_id=batch_id)
+    }), 202
+
+@app.route('/upload/batch/<batch_id>')
+def batch_status(batch_id):
+    """Per-file progress and validation session ids for a batch"""
+    # Shared copy: the batch may be running in another worker
+    batch = shared_store.get(f"batch:{batch_id}")
+    if batch is None:
+        return jsonify({'error': 'Invalid batch ID'}), 404
+    
+    files = []
+    for entry in batch['files']:
+        item = {
+            'name': entry['name'],
+            'status': entry['status'],
+            'session_id': entry['session_id'],
+            'processing_time': entry.get('processing_time'),
+            'error': entry['error']
+        }
+        if entry['session_id']:
+            item['validation_url'] = url_for('validate_data_get', session_id=entry['session_id'])
+        files.append(item)
+    status = batch['status']
+    
+    counts = {}
+    for item in files:
+        counts[item['status']] = counts.get(item['status'], 0) + 1
+    
+    return jsonify({
+        'batch_id': batch_id,
+        'status': status,
+        'total_files': len(files),
+        'progress': counts,
+        'session_ids': [item['session_id'] for item in files if item['session_id']],
+        'files': files
+    })
+
 @app.route('/validate/<session_id>')
 def validate_data_get(session_id):
     """Display validation form"""
@@ -282,6 +563,7 @@ def validate_data_get(session_id):
 
 @app.route('/validate/<session_id>', methods=['POST'])
 @demo_mode_required
+@idempotent('validate')
 def validate_data_post(session_id):
     """Process validated data and generate Job Order"""
     start_time = time.time()
@@ -402,16 +684,18 @@ def statistics():
         'successful_conversions': usage_stats['successful_conversions'],
         'success_rate': f"{(usage_stats['successful_conversions'] / max(usage_stats['total_uploads'], 1) * 100):.1f}%",
         'average_processing_time': f"{usage_stats['total_processing_time'] / max(usage_stats['total_uploads'], 1):.2f}s",
-        'daily_stats': usage_stats['daily_stats']
+        'daily_stats': usage_stats['daily_stats'],
+        'circuit_breakers': breaker_status(),
+        'pipeline': pipeline_metrics.snapshot()
     })
 
-# Session cleanup task (runs periodically)
+# Session cleanup task (runs every CLEANUP_INTERVAL_SECONDS in each worker)
 def cleanup_old_sessions():
     """Clean up expired sessions"""
     cutoff_time = datetime.now() - timedelta(hours=app.config['AUTO_CLEANUP_HOURS'])
     expired_sessions = []
     
-    for session_id, session_data in validation_sessions.items():
+    for session_id, session_data in list(validation_sessions.items()):
         if session_data['timestamp'] < cutoff_time:
             expired_sessions.append(session_id)
             
@@ -425,11 +709,44 @@ def cleanup_old_sessions():
                 logger.error(f"Cleanup error: {e}")
     
     for session_id in expired_sessions:
-        del validation_sessions[session_id]
+        validation_sessions.pop(session_id, None)
+    
+    with batch_lock:
+        expired_batches = [batch_id for batch_id, batch in batch_jobs.items()
+                           if batch['timestamp'] < cutoff_time and batch['status'] == 'completed']
+        for batch_id in expired_batches:
+            del batch_jobs[batch_id]
+    
+    progress_tracker.cleanup(app.config['AUTO_CLEANUP_HOURS'] * 3600)
+    for folder in (app.config['UPLOAD_FOLDER'], app.config['OUTPUT_FOLDER']):
+        storage_for(folder).expire(app.config['AUTO_CLEANUP_HOURS'] * 3600)
+    shared_store.cleanup()
     
     if expired_sessions:
         logger.info(f"Cleaned up {len(expired_sessions)} expired sessions")
 
+cleanup_loop = {'pid': None, 'thread': None}
+cleanup_loop_lock = threading.Lock()
+
+def run_cleanup_loop():
+    while True:
+        time.sleep(app.config['CLEANUP_INTERVAL_SECONDS'])
+        try:
+            cleanup_old_sessions()
+        except Exception as e:
+            logger.error(f"Periodic cleanup failed: {e}")
+
+@app.before_request
+def start_cleanup_loop():
+    """Start the cleanup thread in this worker on its first request (the preloading master forks no threads)"""
+    if cleanup_loop['pid'] == os.getpid():
+        return
+    with cleanup_loop_lock:
+        if cleanup_loop['pid'] != os.getpid():
+            cleanup_loop['thread'] = threading.Thread(target=run_cleanup_loop, name='session-cleanup', daemon=True)
+            cleanup_loop['thread'].start()
+            cleanup_loop['pid'] = os.getpid()
+
 # Error handlers
 @app.errorhandler(413)
 def file_too_large(e):
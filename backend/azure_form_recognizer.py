@@ -7,26 +7,112 @@ import os
 import io
 import json
 import time
+import random
+import threading
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import requests
-from PIL import Image
-import cv2
-import numpy as np
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+# OpenCV, NumPy and PIL are imported inside the preprocessing methods: the web
+# apps construct a recognizer at startup but only preprocess on upload
+
+try:
+    from pipeline_metrics import pipeline_metrics
+    from page_rasterizer import page_rasterizer
+except ImportError:
+    from backend.pipeline_metrics import pipeline_metrics
+    from backend.page_rasterizer import page_rasterizer
+
+
+# Shared across instances so the cap holds for the whole process
+AZURE_MAX_CONCURRENT = int(os.environ.get('AZURE_MAX_CONCURRENT', '4'))
+_analysis_slots = threading.BoundedSemaphore(AZURE_MAX_CONCURRENT)
+
+# Total time a submit may spend waiting out 429s before the call fails
+AZURE_THROTTLE_MAX_WAIT = float(os.environ.get('AZURE_THROTTLE_MAX_WAIT', '10'))
+
+# Keep-alive pools shared by every recognizer in the process (one per API key),
+# so per-request recognizers reuse connections instead of new TLS handshakes
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+
+def shared_session(api_key: str) -> requests.Session:
+    """Process-wide keep-alive pool; transient GET failures are retried by urllib3"""
+    with _sessions_lock:
+        session = _sessions.get(api_key)
+        if session is None:
+            session = requests.Session()
+            retry = Retry(
+                total=3,
+                connect=3,
+                backoff_factor=0.3,
+                status_forcelist=(500, 502, 504),
+                allowed_methods=frozenset(['GET']),  # never replay the analyze POST
+                respect_retry_after_header=True
+            )
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=AZURE_MAX_CONCURRENT * 2, max_retries=retry)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({'Ocp-Apim-Subscription-Key': api_key})
+            _sessions[api_key] = session
+        return session
+
+# Preprocessing profiles: cost vs. robustness on poor scans.
+# max-quality is the original CLAHE + 9px bilateral + adaptive threshold chain.
+PREPROCESS_PROFILES = {
+    'fast': {'clahe': False, 'denoise': None, 'threshold': 'otsu'},
+    'balanced': {'clahe': True, 'denoise': 'median', 'threshold': 'adaptive'},
+    'max-quality': {'clahe': True, 'denoise': 'bilateral', 'threshold': 'adaptive'}
+}
+# 'auto' runs the quality gate and enables only the steps a page needs
+DEFAULT_PREPROCESS_PROFILE = os.environ.get('AZURE_PREPROCESS_PROFILE', 'auto')
+
+# Quality gate thresholds, measured on a ~800px downsampled copy
+QUALITY_GATE = {
+    'sample_size': 800,
+    'min_contrast': 100,        # paper (p90) minus ink (p1) grey levels
+    'max_background_std': 8.0,  # spread of paper brightness across an 8x8 grid
+    'max_noise': 3.0,           # median |pixel - 3px median| on a full-resolution crop
+    'min_sharpness': 150.0      # Laplacian variance; below this thresholding eats thin strokes
+}
+
+# Starting cost estimates (ms per megapixel) for reporting time saved by the gate;
+# refined from observed runs
+_step_cost_ms_per_mp = {'clahe': 8.0, 'bilateral': 22.0, 'median': 4.0, 'adaptive': 7.0, 'otsu': 1.5}
+_step_cost_lock = threading.Lock()
+
+MIME_TYPES = {
+    '.pdf': 'application/pdf',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png'
+}
 
 
 class SendoraFormRecognizer:
     """Azure Form Recognizer client optimized for Sendora documents"""
     
     def __init__(self):
-        self.endpoint = "https://sendoraformparser.cognitiveservices.azure.com/"
-        self.api_key = "6LVEZiaOrkHK60L5Rqn1trreA0wiSQSizvI1QQSizvI1QQjpfp6FV8G7VqcYJQQJ99BHACqBBLyXJ3w3AAALACOGwtQN"
+        self.endpoint = os.environ.get('AZURE_FORM_RECOGNIZER_ENDPOINT',
+                                       "https://sendoraformparser.cognitiveservices.azure.com/")
+        if not self.endpoint.endswith('/'):
+            self.endpoint += '/'
+        self.api_key = os.environ.get('AZURE_FORM_RECOGNIZER_KEY',
+                                      "6LVEZiaOrkHK60L5Rqn1trreA0wiSQSizvI1QQSizvI1QQjpfp6FV8G7VqcYJQQJ99BHACqBBLyXJ3w3AAALACOGwtQN")
         self.api_version = "2023-07-31"
         self.headers = {
             'Ocp-Apim-Subscription-Key': self.api_key,
             'Content-Type': 'application/octet-stream'
         }
         
+        # Polling: honor Retry-After, otherwise exponential backoff with jitter
+        self.poll_initial_delay = float(os.environ.get('AZURE_POLL_INITIAL_DELAY', '0.5'))
+        self.poll_max_delay = float(os.environ.get('AZURE_POLL_MAX_DELAY', '5.0'))
+        self.request_timeout = (5, 60)  # (connect, read) seconds
+        self.session = shared_session(self.api_key)
+        
         # Malaysian business document patterns
         self.malaysian_patterns = {
             'company_indicators': ['sdn bhd', 'sdn.bhd', 'bhd', 'enterprise', 'trading'],
@@ -41,62 +127,238 @@ class SendoraFormRecognizer:
         
         print("Azure Form Recognizer initialized for Sendora documents")
     
-    def preprocess_document(self, image_path: str) -> str:
-        """Enhanced preprocessing for Malaysian business documents"""
-        try:
-            # Load image
-            image = cv2.imread(image_path)
-            if image is None:
-                return image_path
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Enhance contrast for better text recognition
+    def assess_scan_quality(self, gray: 'np.ndarray') -> Dict[str, float]:
+        """Cheap contrast / blur / noise / background measurements for the quality gate"""
+        import cv2
+        import numpy as np
+        h, w = gray.shape
+        
+        # Integer-factor INTER_AREA downsample takes OpenCV's fast path
+        factor = max(1, -(-max(h, w) // QUALITY_GATE['sample_size']))
+        small = cv2.resize(gray[:h // factor * factor, :w // factor * factor],
+                           (w // factor, h // factor), interpolation=cv2.INTER_AREA)
+        
+        def percentile(hist, pct):
+            cumulative = np.cumsum(hist)
+            return int(np.searchsorted(cumulative, pct / 100.0 * cumulative[-1]))
+        
+        hist = np.bincount(small.ravel(), minlength=256)
+        contrast = percentile(hist, 90) - percentile(hist, 1)
+        
+        sharpness = float(cv2.Laplacian(small, cv2.CV_32F).var())
+        
+        # Sensor/JPEG noise is a per-pixel effect, so sample it at full resolution
+        cy, cx = h // 2, w // 2
+        crop = gray[max(0, cy - 256):cy + 256, max(0, cx - 256):cx + 256]
+        residual = cv2.absdiff(crop, cv2.medianBlur(crop, 3))
+        noise = percentile(np.bincount(residual.ravel(), minlength=256), 50)
+        
+        # Paper brightness map: dilation removes ink, then an 8x8 grid of means
+        paper = cv2.dilate(small, np.ones((9, 9), np.uint8))
+        background_std = float(cv2.resize(paper, (8, 8), interpolation=cv2.INTER_AREA).std())
+        
+        return {
+            'contrast': contrast,
+            'sharpness': round(sharpness, 1),
+            'noise': noise,
+            'background_std': round(background_std, 2)
+        }
+    
+    def gate_preprocessing(self, quality: Dict[str, float]) -> Dict[str, Any]:
+        """Pick only the enhancement steps the measured quality calls for"""
+        blurry = quality['sharpness'] < QUALITY_GATE['min_sharpness']
+        uneven = quality['background_std'] > QUALITY_GATE['max_background_std']
+        return {
+            'clahe': quality['contrast'] < QUALITY_GATE['min_contrast'],
+            'denoise': 'bilateral' if quality['noise'] > QUALITY_GATE['max_noise'] else None,
+            'threshold': None if blurry else ('adaptive' if uneven else 'otsu')
+        }
+    
+    def preprocess_image(self, gray: 'np.ndarray', profile=None) -> 'np.ndarray':
+        """Enhance a grayscale page in memory
+
+        profile is a PREPROCESS_PROFILES name or a settings dict from gate_preprocessing.
+        Returns a binarized page unless the settings skip thresholding.
+        """
+        import cv2
+        settings = profile if isinstance(profile, dict) else PREPROCESS_PROFILES[profile or 'max-quality']
+        megapixels = gray.size / 1e6
+        
+        def timed(step, fn, *args):
+            start = time.perf_counter()
+            result = fn(*args)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with _step_cost_lock:
+                _step_cost_ms_per_mp[step] = 0.8 * _step_cost_ms_per_mp[step] + 0.2 * elapsed_ms / megapixels
+            return result
+        
+        # Enhance contrast for better text recognition
+        if settings['clahe']:
             clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
-            enhanced = clahe.apply(gray)
-            
-            # Noise reduction
-            denoised = cv2.bilateralFilter(enhanced, 9, 75, 75)
-            
-            # Adaptive thresholding for varying lighting conditions
-            binary = cv2.adaptiveThreshold(
-                denoised, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2
-            )
-            
-            # Morphological operations to clean up text
-            kernel = np.ones((1,1), np.uint8)
-            cleaned = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, kernel)
+            gray = timed('clahe', clahe.apply, gray)
+        
+        # Noise reduction
+        if settings['denoise'] == 'bilateral':
+            gray = timed('bilateral', cv2.bilateralFilter, gray, 9, 75, 75)
+        elif settings['denoise'] == 'median':
+            gray = timed('median', cv2.medianBlur, gray, 3)
+        
+        # Adaptive thresholding for varying lighting conditions
+        if settings['threshold'] == 'adaptive':
+            return timed('adaptive', cv2.adaptiveThreshold,
+                         gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        if settings['threshold'] == 'otsu':
+            return timed('otsu', cv2.threshold, gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        return gray
+    
+    def _record_gate_decision(self, quality: Dict[str, float], settings: Dict[str, Any], megapixels: float):
+        """Count gate decisions and estimate time saved against the max-quality chain"""
+        full = PREPROCESS_PROFILES['max-quality']
+        pipeline_metrics.increment('azure.quality_gate.pages')
+        
+        with _step_cost_lock:
+            costs = dict(_step_cost_ms_per_mp)
+        full_ms = (costs['clahe'] + costs['bilateral'] + costs['adaptive']) * megapixels
+        gated_ms = ((costs['clahe'] if settings['clahe'] else 0)
+                    + (costs['bilateral'] if settings['denoise'] else 0)
+                    + costs.get(settings['threshold'], 0)) * megapixels
+        
+        if not settings['clahe']:
+            pipeline_metrics.increment('azure.quality_gate.skipped_clahe')
+        if not settings['denoise']:
+            pipeline_metrics.increment('azure.quality_gate.skipped_denoise')
+        if settings['threshold'] != full['threshold']:
+            pipeline_metrics.increment(f"azure.quality_gate.threshold_{settings['threshold'] or 'none'}")
+        if not settings['clahe'] and not settings['denoise']:
+            pipeline_metrics.increment('azure.quality_gate.clean_pages')
+        pipeline_metrics.increment('azure.quality_gate.estimated_seconds_saved', max(0.0, full_ms - gated_ms) / 1000)
+        pipeline_metrics.set_gauge('azure.quality_gate.last', dict(quality, **{
+            'clahe': settings['clahe'], 'denoise': settings['denoise'], 'threshold': settings['threshold']
+        }))
+    
+    @staticmethod
+    def encode_page(page: 'np.ndarray', bilevel: bool = True) -> bytes:
+        """Encode a page once, ready to be the request body (1-bit PNG when binarized)"""
+        import cv2
+        params = [cv2.IMWRITE_PNG_BILEVEL, 1] if bilevel and hasattr(cv2, 'IMWRITE_PNG_BILEVEL') else []
+        ok, encoded = cv2.imencode('.png', page, params)
+        if not ok:
+            raise ValueError("PNG encoding failed")
+        return encoded.tobytes()
+    
+    def _preprocess_page(self, gray: 'np.ndarray', profile: str) -> 'Tuple[np.ndarray, bool]':
+        """Run the gate (or a fixed profile) on one page; returns (page, is_bilevel)"""
+        start = time.perf_counter()
+        if profile == 'auto':
+            quality = self.assess_scan_quality(gray)
+            settings = self.gate_preprocessing(quality)
+            pipeline_metrics.observe('azure.quality_gate.assess_seconds', time.perf_counter() - start)
+            self._record_gate_decision(quality, settings, gray.size / 1e6)
+        else:
+            settings = PREPROCESS_PROFILES[profile]
+        
+        page = self.preprocess_image(gray, settings)
+        pipeline_metrics.observe('azure.preprocess_seconds', time.perf_counter() - start)
+        return page, settings['threshold'] is not None
+    
+    @staticmethod
+    def encode_tiff(pages: 'List[Tuple[np.ndarray, bool]]') -> bytes:
+        """Multi-page TIFF body: CCITT G4 when every page is binarized, else LZW"""
+        from PIL import Image
+        all_bilevel = all(bilevel for _, bilevel in pages)
+        frames = [Image.fromarray(page > 127) if all_bilevel else Image.fromarray(page)
+                  for page, _ in pages]
+        buffer = io.BytesIO()
+        frames[0].save(buffer, format='TIFF', save_all=True, append_images=frames[1:],
+                       compression='group4' if all_bilevel else 'tiff_lzw')
+        return buffer.getvalue()
+    
+    def preprocess_document(self, image_path: str, profile: str = None) -> Tuple[bytes, str]:
+        """Enhanced preprocessing for Malaysian business documents
+
+        Returns the request body and its content type. Everything stays in memory.
+        PDFs are rasterized through the shared page cache and sent as a multi-page
+        TIFF; files that cannot be decoded are sent unchanged.
+        """
+        content_type = MIME_TYPES.get(os.path.splitext(image_path)[1].lower(), 'application/octet-stream')
+        profile = profile or DEFAULT_PREPROCESS_PROFILE
+        
+        if content_type == 'application/pdf':
+            try:
+                rasters = page_rasterizer.render_document(image_path)
+                pages = [self._preprocess_page(gray, profile) for gray in rasters]
+                return self.encode_tiff(pages), 'image/tiff'
+            except Exception as e:
+                print(f"PDF preprocessing error: {e}")
+                with open(image_path, 'rb') as f:
+                    return f.read(), content_type
+        
+        with open(image_path, 'rb') as f:
+            raw = f.read()
+        
+        try:
+            import cv2
+            import numpy as np
             
-            # Save enhanced image
-            base_name = os.path.splitext(os.path.basename(image_path))[0]
-            enhanced_path = os.path.join(os.path.dirname(image_path), f"{base_name}_enhanced.png")
-            cv2.imwrite(enhanced_path, cleaned)
+            # Decode straight to grayscale
+            gray = cv2.imdecode(np.frombuffer(raw, np.uint8), cv2.IMREAD_GRAYSCALE)
+            if gray is None:
+                return raw, content_type
             
-            return enhanced_path
+            page, bilevel = self._preprocess_page(gray, profile)
+            return self.encode_page(page, bilevel=bilevel), 'image/png'
             
         except Exception as e:
             print(f"Preprocessing error: {e}")
-            return image_path
+            return raw, content_type
     
     def analyze_document(self, image_path: str) -> Dict[str, Any]:
         """Analyze document using Azure Form Recognizer"""
         try:
-            # Preprocess document for better accuracy
-            processed_path = self.preprocess_document(image_path)
-            
-            # Read the processed image
-            with open(processed_path, 'rb') as image_file:
-                image_data = image_file.read()
+            return self.analyze_document_strict(image_path)
             
-            # Submit for analysis
-            analyze_url = f"{self.endpoint}formrecognizer/v3.1/layout/analyze"
+        except Exception as e:
+            print(f"Azure Form Recognizer error: {e}")
+            # Fallback to demo mode
+            return self._create_demo_result(image_path)
+    
+    def analyze_document_strict(self, image_path: str, max_wait: int = 30) -> Dict[str, Any]:
+        """Like analyze_document, but raises instead of returning demo data"""
+        # Preprocess document for better accuracy
+        image_data, content_type = self.preprocess_document(image_path)
+        
+        result = self._submit_and_poll(image_data, content_type, max_wait=max_wait)
+        
+        # Process and enhance the results
+        return self._enhance_extraction_results(result)
+    
+    def _submit_and_poll(self, image_data: bytes, content_type: str = 'application/octet-stream',
+                         max_wait: int = 30) -> Dict:
+        """Submit a layout analysis and wait for its result, within the concurrency cap"""
+        analyze_url = f"{self.endpoint}formrecognizer/v3.1/layout/analyze"
+        start_time = time.time()
+        
+        with _analysis_slots:
+            pipeline_metrics.observe('azure.slot_wait_seconds', time.time() - start_time)
             
-            response = requests.post(
-                analyze_url,
-                headers=self.headers,
-                data=image_data
-            )
+            # Submit for analysis; a throttled submit (429) is retried after Retry-After,
+            # but never waits longer in total than the throttle budget (or max_wait)
+            throttle_deadline = time.time() + min(AZURE_THROTTLE_MAX_WAIT, max_wait)
+            for attempt in range(4):
+                response = self.session.post(
+                    analyze_url,
+                    headers={'Content-Type': content_type},
+                    data=image_data,
+                    timeout=self.request_timeout
+                )
+                if response.status_code != 429:
+                    break
+                pipeline_metrics.increment('azure.throttled')
+                delay = self._next_poll_delay(response, attempt)
+                if time.time() + delay > throttle_deadline:
+                    pipeline_metrics.increment('azure.throttle_gave_up')
+                    raise Exception(f"Form Recognizer throttled; Retry-After {delay:.0f}s exceeds the wait budget")
+                time.sleep(delay)
             
             if response.status_code != 202:
                 raise Exception(f"Form Recognizer API error: {response.status_code} - {response.text}")
@@ -105,35 +367,65 @@ class SendoraFormRecognizer:
             operation_location = response.headers['Operation-Location']
             
             # Poll for results
-            result = self._poll_for_result(operation_location)
-            
-            # Process and enhance the results
-            enhanced_result = self._enhance_extraction_results(result)
-            
-            return enhanced_result
-            
-        except Exception as e:
-            print(f"Azure Form Recognizer error: {e}")
-            # Fallback to demo mode
-            return self._create_demo_result(image_path)
+            result = self._poll_for_result(operation_location, max_wait=max_wait,
+                                           first_delay=self._retry_after(response))
+        
+        pipeline_metrics.observe('azure.analyze_seconds', time.time() - start_time)
+        return result
+    
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        """Retry-After in seconds, if the service sent one"""
+        value = response.headers.get('Retry-After')
+        if value is None:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            return None  # HTTP-date form is not used by Form Recognizer
+    
+    def _next_poll_delay(self, response, attempt: int) -> float:
+        """Service hint if present, else exponential backoff with equal jitter"""
+        retry_after = self._retry_after(response) if response is not None else None
+        if retry_after is not None:
+            return retry_after
+        backoff = min(self.poll_max_delay, self.poll_initial_delay * (2 ** attempt))
+        return backoff / 2 + random.uniform(0, backoff / 2)
     
-    def _poll_for_result(self, operation_location: str, max_wait: int = 30) -> Dict:
+    def _poll_for_result(self, operation_location: str, max_wait: int = 30,
+                         first_delay: Optional[float] = None) -> Dict:
         """Poll for analysis completion"""
         start_time = time.time()
+        deadline = start_time + max_wait
+        polls = 0
         
-        while time.time() - start_time < max_wait:
-            response = requests.get(operation_location, headers={'Ocp-Apim-Subscription-Key': self.api_key})
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result['status'] == 'succeeded':
-                    return result
-                elif result['status'] == 'failed':
-                    raise Exception(f"Analysis failed: {result.get('error', 'Unknown error')}")
-            
-            time.sleep(1)
+        delay = first_delay if first_delay is not None else self.poll_initial_delay
         
-        raise Exception("Analysis timed out")
+        try:
+            while True:
+                # Never sleep past the deadline
+                time.sleep(max(0.0, min(delay, deadline - time.time())))
+                
+                response = self.session.get(operation_location, timeout=self.request_timeout)
+                polls += 1
+                
+                if response.status_code == 200:
+                    result = response.json()
+                    if result['status'] == 'succeeded':
+                        return result
+                    elif result['status'] == 'failed':
+                        raise Exception(f"Analysis failed: {result.get('error', 'Unknown error')}")
+                elif response.status_code == 429:
+                    pipeline_metrics.increment('azure.throttled')
+                
+                if time.time() >= deadline:
+                    raise Exception("Analysis timed out")
+                
+                delay = self._next_poll_delay(response, polls - 1)
+        finally:
+            elapsed = time.time() - start_time
+            pipeline_metrics.increment('azure.polls', polls)
+            pipeline_metrics.observe('azure.poll_seconds', elapsed)
     
     def _enhance_extraction_results(self, raw_result: Dict) -> Dict[str, Any]:
         """Enhance and structure the extraction results for Sendora use"""
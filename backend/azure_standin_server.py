@@ -0,0 +1,167 @@
+"""
+Local Azure Form Recognizer Stand-in
+Minimal HTTP server speaking the layout analyze/poll protocol used by
+SendoraFormRecognizer, for measuring poll counts and latency without the cloud.
+
+    python backend/azure_standin_server.py --port 8765 --processing 2.5 --retry-after 1
+
+Point the client at it with AZURE_FORM_RECOGNIZER_ENDPOINT=http://127.0.0.1:8765/
+"""
+
+import json
+import time
+import uuid
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional
+
+ANALYZE_PATH = '/formrecognizer/v3.1/layout/analyze'
+RESULTS_PATH = '/formrecognizer/v3.1/layout/analyzeResults/'
+
+SAMPLE_LINES = [
+    'SENDORA GROUP SDN BHD',
+    'Invoice No: INV-2025-003',
+    'Date: 15/01/2025',
+    'DOOR SIZE: 43MM X 3FT X 8FT',
+    'Total Amount: RM 2,850.00'
+]
+
+
+class StandinState:
+    """Operations in flight plus request counters"""
+
+    def __init__(self, processing_seconds: float, jitter: float, retry_after: Optional[float]):
+        self.processing_seconds = processing_seconds
+        self.jitter = jitter
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.operations: Dict[str, float] = {}
+        self.counters = {'connections': 0, 'analyze_requests': 0, 'poll_requests': 0}
+
+    def count(self, name: str):
+        with self.lock:
+            self.counters[name] += 1
+
+    def submit(self) -> str:
+        operation_id = uuid.uuid4().hex
+        delay = self.processing_seconds + random.uniform(0, self.jitter)
+        with self.lock:
+            self.operations[operation_id] = time.time() + delay
+        return operation_id
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.counters, in_flight=len(self.operations))
+
+    def reset(self):
+        with self.lock:
+            for name in self.counters:
+                self.counters[name] = 0
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible in the counters
+
+    def setup(self):
+        super().setup()
+        self.server.state.count('connections')
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Dict[str, Any], headers: Dict[str, str] = None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _retry_after_header(self) -> Dict[str, str]:
+        retry_after = self.server.state.retry_after
+        return {'Retry-After': f"{retry_after:g}"} if retry_after is not None else {}
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length', '0'))
+        self.rfile.read(length)
+
+        if self.path == '/reset':
+            state.reset()
+            return self._send_json(200, {'reset': True})
+        if self.path != ANALYZE_PATH:
+            return self._send_json(404, {'error': 'not found'})
+
+        state.count('analyze_requests')
+        operation_id = state.submit()
+        host = self.headers.get('Host', f"127.0.0.1:{self.server.server_port}")
+        headers = {'Operation-Location': f"http://{host}{RESULTS_PATH}{operation_id}"}
+        headers.update(self._retry_after_header())
+        self._send_json(202, {}, headers)
+
+    def do_GET(self):
+        state = self.server.state
+
+        if self.path == '/stats':
+            return self._send_json(200, state.stats())
+        if not self.path.startswith(RESULTS_PATH):
+            return self._send_json(404, {'error': 'not found'})
+
+        state.count('poll_requests')
+        operation_id = self.path[len(RESULTS_PATH):]
+        with state.lock:
+            ready_at = state.operations.get(operation_id)
+        if ready_at is None:
+            return self._send_json(404, {'error': 'unknown operation'})
+
+        if time.time() < ready_at:
+            return self._send_json(200, {'status': 'running'}, self._retry_after_header())
+
+        with state.lock:
+            state.operations.pop(operation_id, None)
+        self._send_json(200, {
+            'status': 'succeeded',
+            'analyzeResult': {
+                'pages': [{
+                    'pageNumber': 1,
+                    'lines': [{'content': line, 'confidence': 0.98} for line in SAMPLE_LINES]
+                }]
+            }
+        })
+
+
+def start_standin(port: int = 0, processing_seconds: float = 2.0, jitter: float = 0.5,
+                  retry_after: Optional[float] = 1.0) -> ThreadingHTTPServer:
+    """Start the stand-in on a daemon thread; port 0 picks a free port"""
+    server = ThreadingHTTPServer(('127.0.0.1', port), StandinHandler)
+    server.daemon_threads = True
+    server.state = StandinState(processing_seconds, jitter, retry_after)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Azure Form Recognizer stand-in')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--processing', type=float, default=2.0, help='Seconds until an analysis succeeds')
+    parser.add_argument('--jitter', type=float, default=0.5, help='Extra random processing seconds')
+    parser.add_argument('--retry-after', type=float, default=1.0,
+                        help='Retry-After sent with 202/running responses (negative to omit)')
+    args = parser.parse_args()
+
+    retry_after = args.retry_after if args.retry_after >= 0 else None
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StandinHandler)
+    server.state = StandinState(args.processing, args.jitter, retry_after)
+    print(f"Form Recognizer stand-in on http://127.0.0.1:{args.port}/ (stats at /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
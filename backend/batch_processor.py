@@ -0,0 +1,438 @@
+"""
+Bulk Batch Processor
+Back-loads a directory or ZIP of invoices through Google Document AI and renders
+Job Orders in a process pool. Progress is checkpointed so interrupted runs resume.
+
+Usage:
+    python backend/batch_processor.py uploads/2025-07 --output temp/batch_2025_07
+    python backend/batch_processor.py invoices_july.zip --output temp/batch_july --workers 8
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import hashlib
+import zipfile
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterator
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+try:
+    from google_document_ai import GoogleDocumentProcessor
+    from ensemble_ocr import create_document_processor
+except ImportError:  # imported as part of the backend package
+    from backend.google_document_ai import GoogleDocumentProcessor
+    from backend.ensemble_ocr import create_document_processor
+
+
+ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff'}
+
+# Specifications the validation step carries over from the OCR result
+SPECIFICATIONS_TO_PRESERVE = [
+    'door_thickness', 'door_type', 'door_core', 'door_edging',
+    'decorative_line', 'frame_type', 'line_items', 'door_size',
+    'item_size_0', 'item_desc_0'
+]
+
+STATUS_PENDING = 'pending'
+STATUS_EXTRACTED = 'extracted'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+
+
+def build_jo_data(extracted_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Map OCR output to the validated-data shape the template generators expect
+
+    Mirrors what validation.html pre-fills plus the specification merge done in
+    validate_data_post, so unattended batch JOs match a user accepting the defaults.
+    """
+
+    customer = extracted_data.get('customer') or {}
+    jo_data = {
+        'invoice_number': extracted_data.get('invoice_number') or '',
+        'customer_name': extracted_data.get('customer_name') or customer.get('name') or '',
+        'document_date': extracted_data.get('date') or extracted_data.get('document_date') or '',
+        'delivery_date': extracted_data.get('due_date') or extracted_data.get('delivery_date') or '',
+        'po_number': extracted_data.get('po_number') or '',
+        'measure_by': extracted_data.get('measure_by') or ''
+    }
+
+    for spec in SPECIFICATIONS_TO_PRESERVE:
+        if extracted_data.get(spec):
+            jo_data[spec] = extracted_data[spec]
+
+    if not jo_data.get('item_size_0') and extracted_data.get('door_size'):
+        jo_data['item_size_0'] = extracted_data['door_size']
+
+    return jo_data
+
+
+def render_job_order(jo_data: Dict[str, Any], html_path: str) -> str:
+    """Render one JO to a caller-chosen path (runs inside a worker process)
+
+    Writing to an explicit per-document path avoids the generator's
+    one-second timestamp filenames colliding when many JOs render at once.
+    """
+
+    try:
+        from correct_template_generator import CorrectTemplateGenerator
+    except ImportError:
+        from backend.correct_template_generator import CorrectTemplateGenerator
+
+    generator = CorrectTemplateGenerator()
+    html_content = generator.create_correct_template(jo_data)
+
+    with open(html_path, 'w', encoding='utf-8') as f:
+        f.write(html_content)
+
+    pdf_path = generator.generate_pdf_from_html(html_path)
+    return pdf_path or html_path
+
+
+class BatchCheckpoint:
+    """Manifest plus append-only journal for crash-safe resume
+
+    Every status change is appended (and fsynced) to a JSONL journal, which is
+    cheap regardless of batch size. The full manifest is rewritten atomically
+    every `compact_every` changes and at the end of the run; on resume the
+    manifest is loaded and the journal replayed on top of it.
+    """
+
+    def __init__(self, output_dir: str, compact_every: int = 50):
+        self.manifest_path = os.path.join(output_dir, 'batch_manifest.json')
+        self.journal_path = os.path.join(output_dir, 'batch_checkpoint.jsonl')
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.meta: Dict[str, Any] = {}
+        self._changes = 0
+        self._load()
+        self._journal = open(self.journal_path, 'a', encoding='utf-8')
+
+    def _load(self):
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.files = manifest.get('files', {})
+            self.meta = {k: v for k, v in manifest.items() if k != 'files'}
+
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # Torn final line from a hard kill; everything before it is valid
+                        break
+                    self.files.setdefault(record['key'], {}).update(record['entry'])
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.files.get(key)
+            return dict(entry) if entry else None
+
+    def update(self, key: str, **fields):
+        fields['updated_at'] = datetime.now().isoformat()
+        with self.lock:
+            self.files.setdefault(key, {}).update(fields)
+            self._journal.write(json.dumps({'key': key, 'entry': fields}) + '\n')
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._changes += 1
+            if self._changes % self.compact_every == 0:
+                self._compact_locked()
+
+    def compact(self):
+        with self.lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        counts: Dict[str, int] = {}
+        for entry in self.files.values():
+            status = entry.get('status', STATUS_PENDING)
+            counts[status] = counts.get(status, 0) + 1
+
+        manifest = dict(self.meta)
+        manifest['updated_at'] = datetime.now().isoformat()
+        manifest['summary'] = counts
+        manifest['files'] = self.files
+
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+        # Manifest now holds everything the journal did
+        self._journal.truncate(0)
+        self._journal.seek(0)
+
+    def close(self):
+        self.compact()
+        self._journal.close()
+
+
+class BatchProcessor:
+    """Run a directory or ZIP of documents through OCR and JO rendering"""
+
+    def __init__(self, input_path: str, output_dir: str, ocr_workers: int = 4,
+                 render_workers: int = 2, render_jo: bool = True, retry_failed: bool = False,
+                 processor: GoogleDocumentProcessor = None):
+        self.input_path = os.path.abspath(input_path)
+        self.output_dir = os.path.abspath(output_dir)
+        self.ocr_workers = max(1, ocr_workers)
+        self.render_workers = max(1, render_workers)
+        self.render_jo = render_jo
+        self.retry_failed = retry_failed
+        self.processor = processor
+
+        self.extracted_dir = os.path.join(self.output_dir, 'extracted')
+        self.jo_dir = os.path.join(self.output_dir, 'job_orders')
+        self.staging_dir = os.path.join(self.output_dir, 'inputs')
+        for folder in [self.output_dir, self.extracted_dir, self.jo_dir]:
+            os.makedirs(folder, exist_ok=True)
+
+        self.checkpoint = BatchCheckpoint(self.output_dir)
+        self.checkpoint.meta.update({
+            'input': self.input_path,
+            'started_at': self.checkpoint.meta.get('started_at') or datetime.now().isoformat()
+        })
+
+    # ------------------------------------------------------------------ inputs
+
+    def discover(self) -> Iterator[Dict[str, Any]]:
+        """Yield input documents with a stable key and change fingerprint"""
+
+        if zipfile.is_zipfile(self.input_path):
+            yield from self._discover_zip()
+        elif os.path.isdir(self.input_path):
+            yield from self._discover_directory()
+        else:
+            raise ValueError(f"Input must be a directory or ZIP file: {self.input_path}")
+
+    def _discover_directory(self) -> Iterator[Dict[str, Any]]:
+        for root, dirs, files in os.walk(self.input_path):
+            dirs.sort()
+            # Never pick up our own output if it lives inside the input tree
+            if os.path.commonpath([os.path.abspath(root), self.output_dir]) == self.output_dir:
+                dirs[:] = []
+                continue
+            for name in sorted(files):
+                if not self._allowed(name):
+                    continue
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                yield {
+                    'key': os.path.relpath(path, self.input_path).replace(os.sep, '/'),
+                    'fingerprint': f"{stat.st_size}:{int(stat.st_mtime)}",
+                    'path': path
+                }
+
+    def _discover_zip(self) -> Iterator[Dict[str, Any]]:
+        with zipfile.ZipFile(self.input_path) as archive:
+            members = sorted(archive.infolist(), key=lambda info: info.filename)
+        for info in members:
+            if info.is_dir() or not self._allowed(info.filename):
+                continue
+            yield {
+                'key': info.filename,
+                'fingerprint': f"{info.file_size}:{info.CRC:08x}",
+                'zip_member': info.filename
+            }
+
+    def _allowed(self, name: str) -> bool:
+        base = os.path.basename(name)
+        if base.startswith('.') or '.' not in base:
+            return False
+        return base.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+    def _materialize(self, item: Dict[str, Any]) -> str:
+        """Return a local path for the document, streaming ZIP members to disk"""
+
+        if 'path' in item:
+            return item['path']
+
+        target = os.path.join(self.staging_dir, self._safe_stem(item['key']) + '.' +
+                              item['key'].rsplit('.', 1)[1].lower())
+        os.makedirs(self.staging_dir, exist_ok=True)
+        with zipfile.ZipFile(self.input_path) as archive:
+            with archive.open(item['zip_member']) as src, open(target, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+        return target
+
+    def _safe_stem(self, key: str) -> str:
+        """Flatten a relative key into a filesystem-safe, collision-free stem"""
+        stem = re.sub(r'[^A-Za-z0-9_\-]+', '_', key.rsplit('.', 1)[0]).strip('_') or 'document'
+        # 'a/b.pdf', 'a_b.pdf' and 'a_b.png' flatten alike; the key hash keeps them apart
+        return f"{stem[:80]}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+
+    # -------------------------------------------------------------- processing
+
+    def needs_work(self, item: Dict[str, Any]) -> Optional[str]:
+        """Return the stage to resume from, or None if the file is already done"""
+
+        entry = self.checkpoint.get(item['key'])
+        if not entry or entry.get('fingerprint') != item['fingerprint']:
+            return 'ocr'
+
+        status = entry.get('status')
+        if status == STATUS_COMPLETED:
+            return None
+        if status == STATUS_FAILED and not self.retry_failed:
+            return None
+        if status == STATUS_EXTRACTED and entry.get('extracted_json') and \
+                os.path.exists(os.path.join(self.output_dir, entry['extracted_json'])):
+            return 'render' if self.render_jo else None
+        return 'ocr'
+
+    def ocr_one(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """OCR a single document and persist the extraction (runs in a thread)"""
+
+        start = time.time()
+        file_path = self._materialize(item)
+        extracted_data = self.processor.process_document(file_path)
+
+        if extracted_data.get('is_fallback'):
+            raise RuntimeError('Document AI unavailable - got fallback demo data')
+
+        extracted_rel = os.path.join('extracted', self._safe_stem(item['key']) + '.json')
+        with open(os.path.join(self.output_dir, extracted_rel), 'w', encoding='utf-8') as f:
+            json.dump(extracted_data, f, indent=2, ensure_ascii=False, default=str)
+
+        if 'zip_member' in item:
+            os.remove(file_path)
+
+        return {
+            'extracted_json': extracted_rel,
+            'invoice_number': extracted_data.get('invoice_number'),
+            'ocr_seconds': round(time.time() - start, 3)
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """Process everything that is not already completed"""
+
+        if self.processor is None:
+            self.processor = create_document_processor()
+
+        items = list(self.discover())
+        to_ocr, to_render = [], []
+        for item in items:
+            stage = self.needs_work(item)
+            if stage == 'ocr':
+                to_ocr.append(item)
+            elif stage == 'render':
+                to_render.append(item)
+
+        skipped = len(items) - len(to_ocr) - len(to_render)
+        print(f"Batch: {len(items)} documents, {skipped} already done, "
+              f"{len(to_ocr)} to OCR, {len(to_render)} to render")
+
+        for item in to_ocr:
+            self.checkpoint.update(item['key'], status=STATUS_PENDING, fingerprint=item['fingerprint'],
+                                   error=None)
+
+        start = time.time()
+        ocr_pool = ThreadPoolExecutor(max_workers=self.ocr_workers, thread_name_prefix='batch-ocr')
+        render_pool = ProcessPoolExecutor(max_workers=self.render_workers) if self.render_jo else None
+        pending = {}
+
+        try:
+            for item in to_ocr:
+                pending[ocr_pool.submit(self.ocr_one, item)] = ('ocr', item)
+            for item in to_render:
+                self._submit_render(render_pool, pending, item)
+
+            while pending:
+                done, _ = wait(list(pending), return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, item = pending.pop(future)
+                    self._handle_result(stage, item, future, render_pool, pending)
+        except KeyboardInterrupt:
+            print("\nInterrupted - progress is checkpointed; re-run the same command to resume")
+            raise
+        finally:
+            ocr_pool.shutdown(wait=False, cancel_futures=True)
+            if render_pool:
+                render_pool.shutdown(wait=False, cancel_futures=True)
+            self.checkpoint.meta['finished_at'] = datetime.now().isoformat()
+            self.checkpoint.close()
+
+        summary = self.summary()
+        summary['elapsed_seconds'] = round(time.time() - start, 2)
+        print(f"Batch finished in {summary['elapsed_seconds']}s: {summary['counts']}")
+        print(f"Manifest: {self.checkpoint.manifest_path}")
+        return summary
+
+    def _submit_render(self, render_pool, pending: Dict, item: Dict[str, Any]):
+        entry = self.checkpoint.get(item['key'])
+        with open(os.path.join(self.output_dir, entry['extracted_json']), 'r', encoding='utf-8') as f:
+            extracted_data = json.load(f)
+
+        html_path = os.path.join(self.jo_dir, f"JO_{self._safe_stem(item['key'])}.html")
+        future = render_pool.submit(render_job_order, build_jo_data(extracted_data), html_path)
+        pending[future] = ('render', item)
+
+    def _handle_result(self, stage: str, item: Dict[str, Any], future, render_pool, pending: Dict):
+        key = item['key']
+        try:
+            result = future.result()
+        except Exception as e:
+            print(f"FAILED [{stage}] {key}: {e}")
+            self.checkpoint.update(key, status=STATUS_FAILED, failed_stage=stage, error=str(e))
+            return
+
+        if stage == 'ocr':
+            print(f"OCR done: {key} ({result['ocr_seconds']}s)")
+            if self.render_jo:
+                self.checkpoint.update(key, status=STATUS_EXTRACTED, **result)
+                self._submit_render(render_pool, pending, item)
+            else:
+                self.checkpoint.update(key, status=STATUS_COMPLETED, **result)
+        else:
+            print(f"JO rendered: {key} -> {os.path.basename(result)}")
+            self.checkpoint.update(key, status=STATUS_COMPLETED,
+                                   jo_path=os.path.relpath(result, self.output_dir))
+
+    def summary(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for entry in self.checkpoint.files.values():
+            status = entry.get('status', STATUS_PENDING)
+            counts[status] = counts.get(status, 0) + 1
+        return {'counts': counts, 'manifest': self.checkpoint.manifest_path}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bulk-process invoices through OCR and JO generation')
+    parser.add_argument('input', help='Directory or ZIP file of invoices')
+    parser.add_argument('--output', required=True, help='Output directory (manifest, extractions, JOs)')
+    parser.add_argument('--workers', type=int, default=4, help='Concurrent Document AI requests')
+    parser.add_argument('--render-workers', type=int, default=os.cpu_count() or 2,
+                        help='Processes used to render Job Orders')
+    parser.add_argument('--no-render', action='store_true', help='Only run OCR, skip JO rendering')
+    parser.add_argument('--retry-failed', action='store_true', help='Reprocess files that failed previously')
+    args = parser.parse_args()
+
+    batch = BatchProcessor(
+        args.input,
+        args.output,
+        ocr_workers=args.workers,
+        render_workers=args.render_workers,
+        render_jo=not args.no_render,
+        retry_failed=args.retry_failed
+    )
+
+    try:
+        result = batch.run()
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    sys.exit(1 if result['counts'].get(STATUS_FAILED) else 0)
@@ -0,0 +1,87 @@
+"""
+Checkbox Detector
+Finds the printed checkbox squares of a rendered form page in one batched
+pass: a single connectedComponentsWithStats call labels every ink blob, and
+NumPy masks over the stats table keep the hollow squares of checkbox size.
+
+A component is a checkbox when its box is checkbox-sized, roughly square,
+has ink along nearly all of its one-pixel border (a square outline; letters
+such as N, H or O leave gaps there) and no ink in its middle half. Both
+tests are rectangle sums over one integral image, so no per-component
+Python code runs.
+
+Boxes are returned in PDF points as (N, 4) x0, y0, x1, y1 arrays, ordered by
+option row and then left to right.
+"""
+
+from typing import List
+
+import cv2
+import numpy as np
+
+INK_THRESHOLD = 128
+MIN_SIZE = 4.0          # points
+MAX_SIZE = 16.0
+MAX_ASPECT = 1.3
+MIN_BORDER_INK = 0.9    # share of the bounding box's outermost pixels that are ink
+ROW_TOLERANCE = 3.0     # points between box centres on one option row
+
+
+def detect_checkboxes(gray: np.ndarray, scale: float = 1.0, min_size: float = MIN_SIZE,
+                      max_size: float = MAX_SIZE, max_aspect: float = MAX_ASPECT,
+                      min_border_ink: float = MIN_BORDER_INK, ink_threshold: int = INK_THRESHOLD) -> np.ndarray:
+    """Checkbox squares of a grayscale page raster rendered at scale (pixels per point)"""
+    _, ink = cv2.threshold(np.asarray(gray), ink_threshold - 1, 1, cv2.THRESH_BINARY_INV)
+    labels_count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8, ltype=cv2.CV_16U)
+    if labels_count >= np.iinfo(np.uint16).max:
+        labels_count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+
+    x, y = stats[1:, cv2.CC_STAT_LEFT], stats[1:, cv2.CC_STAT_TOP]  # row 0 is the background
+    w, h = stats[1:, cv2.CC_STAT_WIDTH], stats[1:, cv2.CC_STAT_HEIGHT]
+
+    lo, hi = min_size * scale, max_size * scale
+    keep = ((w >= lo) & (w <= hi) & (h >= lo) & (h <= hi)
+            & (np.maximum(w, h) <= max_aspect * np.minimum(w, h)))
+    x, y, w, h = x[keep], y[keep], w[keep], h[keep]
+
+    sums = cv2.integral(ink)
+
+    def ink_in(x0, y0, x1, y1):
+        return sums[y1, x1] - sums[y0, x1] - sums[y1, x0] + sums[y0, x0]
+
+    border = ink_in(x, y, x + w, y + h) - ink_in(x + 1, y + 1, x + w - 1, y + h - 1)
+    middle = ink_in(x + w // 4, y + h // 4, x + w - w // 4, y + h - h // 4)
+    square = (border >= min_border_ink * (2 * (w + h) - 4)) & (middle == 0)
+
+    boxes = np.column_stack([x, y, x + w, y + h])[square].astype(np.float64) / scale
+    if len(boxes) == 0:
+        return boxes.reshape(0, 4)
+    return np.concatenate(group_rows(boxes))
+
+
+def group_rows(boxes: np.ndarray, tolerance: float = ROW_TOLERANCE) -> List[np.ndarray]:
+    """Split boxes into option rows (by vertical centre), each sorted left to right"""
+    if len(boxes) == 0:
+        return []
+    centres = (boxes[:, 1] + boxes[:, 3]) / 2
+    order = np.argsort(centres, kind='stable')
+    breaks = np.flatnonzero(np.diff(centres[order]) > tolerance) + 1
+    rows = []
+    for indices in np.split(order, breaks):
+        row = boxes[indices]
+        rows.append(row[np.argsort(row[:, 0], kind='stable')])
+    return rows
+
+
+def box_left_of(boxes: np.ndarray, label_bbox, max_distance: float = 30.0,
+                tolerance: float = ROW_TOLERANCE):
+    """The checkbox nearest to the left of a label on the same row, or None"""
+    if len(boxes) == 0:
+        return None
+    label_centre = (label_bbox[1] + label_bbox[3]) / 2
+    gap = label_bbox[0] - boxes[:, 2]
+    same_row = np.abs((boxes[:, 1] + boxes[:, 3]) / 2 - label_centre) <= max(tolerance, (label_bbox[3] - label_bbox[1]) / 2)
+    candidates = np.flatnonzero(same_row & (gap >= -2.0) & (gap <= max_distance))
+    if candidates.size == 0:
+        return None
+    return boxes[candidates[np.argmin(gap[candidates])]]
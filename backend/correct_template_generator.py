@@ -5,9 +5,14 @@ Based on the ACTUAL Sendora JO template structure
 
 import os
 import subprocess
-from datetime import datetime
 from typing import Dict, Any
 
+try:
+    from storage_layout import storage_for
+except ImportError:
+    from backend.storage_layout import storage_for
+
+
 class CorrectTemplateGenerator:
     """Generate HTML that matches the ACTUAL Sendora JO template"""
     
@@ -18,9 +23,9 @@ class CorrectTemplateGenerator:
     def generate_correct_jo(self, validated_data: Dict[str, Any]) -> str:
         """Generate correct JO based on actual template"""
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        html_filename = f"JO_CORRECT_{timestamp}.html"
-        html_path = os.path.join(self.output_dir, html_filename)
+        # Unique sharded path: JOs rendered in the same second no longer overwrite each other
+        html_path = storage_for(self.output_dir).new_path('JO_CORRECT', 'html')
+        html_filename = os.path.basename(html_path)
         
         # Generate HTML content
         html_content = self.create_correct_template(validated_data)
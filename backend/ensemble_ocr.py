@@ -0,0 +1,281 @@
+"""
+Ensemble OCR
+Runs Google Document AI, Azure Form Recognizer and a local engine (PDF text
+layer, or Tesseract when installed) concurrently, stops waiting at a deadline
+and merges the results field by field by confidence.
+
+Each document gets its own threads, one per engine, so the deadline starts
+when the engines do rather than after a queue shared with other uploads. If
+no engine has answered by the deadline, the first answer up to
+OCR_ENSEMBLE_MAX_WAIT is used; after that OCRUnavailable is raised, never
+demo data.
+
+Enable in the web apps with OCR_MODE=ensemble. The result has the same shape
+as GoogleDocumentProcessor.process_document, plus an 'ensemble' report of
+engine status, latency and which engine supplied each field.
+"""
+
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, Any, List, Optional, Callable, Tuple
+
+try:
+    from google_document_ai import GoogleDocumentProcessor
+    from pipeline_metrics import pipeline_metrics
+except ImportError:
+    from backend.google_document_ai import GoogleDocumentProcessor
+    from backend.pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+OCR_MODE = os.environ.get('OCR_MODE', 'google').lower()
+ENSEMBLE_DEADLINE = float(os.environ.get('OCR_ENSEMBLE_DEADLINE', '8.0'))
+# Wait this long in total for a first answer when none arrived by the deadline
+ENSEMBLE_MAX_WAIT = float(os.environ.get('OCR_ENSEMBLE_MAX_WAIT', '30'))
+ENSEMBLE_ENGINES = [name.strip() for name in
+                    os.environ.get('OCR_ENSEMBLE_ENGINES', 'google,azure,local').split(',') if name.strip()]
+
+# Prior trust in each engine's pattern-derived fields (Google entity confidences override)
+ENGINE_PRIORS = {
+    'google': 0.85,
+    'azure': 0.70,
+    'local_text': 0.80,   # exact PDF text layer, but fields come from regexes
+    'local_tesseract': 0.55
+}
+
+# Scalar fields merged across engines; nested names use dots
+MERGED_FIELDS = [
+    'invoice_number', 'po_number', 'date', 'due_date', 'subtotal', 'tax', 'total',
+    'customer.name', 'vendor.name', 'door_thickness', 'door_type', 'door_core',
+    'door_edging', 'decorative_line', 'frame_type', 'door_size', 'item_desc_0', 'item_size_0'
+]
+
+# Maps merged field names to the keys GoogleDocumentProcessor uses in confidence_scores
+CONFIDENCE_KEYS = {'customer.name': 'customer_name', 'vendor.name': 'vendor_name'}
+
+# One Azure recognizer per process: processors are built per upload, the client is stateless
+_azure = None
+_azure_lock = threading.Lock()
+
+
+def azure_recognizer():
+    """Process-wide SendoraFormRecognizer, created on first use"""
+    global _azure
+    with _azure_lock:
+        if _azure is None:
+            try:
+                from azure_form_recognizer import SendoraFormRecognizer
+            except ImportError:
+                from backend.azure_form_recognizer import SendoraFormRecognizer
+            _azure = SendoraFormRecognizer()
+        return _azure
+
+
+class OCRUnavailable(RuntimeError):
+    """No OCR engine produced a result for the document"""
+
+
+def _get_field(data: Dict[str, Any], field: str):
+    for part in field.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(part)
+    return data
+
+
+def _set_field(data: Dict[str, Any], field: str, value):
+    parts = field.split('.')
+    for part in parts[:-1]:
+        data = data.setdefault(part, {})
+    data[parts[-1]] = value
+
+
+def _normalize(value) -> str:
+    return ' '.join(str(value).upper().split())
+
+
+class EnsembleOCRProcessor:
+    """Drop-in replacement for GoogleDocumentProcessor that answers within a deadline"""
+
+    def __init__(self, deadline: float = None, engines: List[str] = None, max_wait: float = None):
+        self.deadline = deadline if deadline is not None else ENSEMBLE_DEADLINE
+        self.max_wait = max(self.deadline, max_wait if max_wait is not None else ENSEMBLE_MAX_WAIT)
+        self.engine_names = engines or ENSEMBLE_ENGINES
+        self.google = GoogleDocumentProcessor()
+
+    # Kept for code that checks processor.client (health endpoints)
+    @property
+    def client(self):
+        return self.google.client
+
+    # Engines -------------------------------------------------------------
+
+    def run_google(self, file_path: str) -> Tuple[Dict[str, Any], float]:
+        return self.google.process_document_strict(file_path), ENGINE_PRIORS['google']
+
+    def run_azure(self, file_path: str) -> Tuple[Dict[str, Any], float]:
+        # Azure's own poll deadline should not outlive the ensemble's
+        result = azure_recognizer().analyze_document_strict(file_path, max_wait=max(1, int(self.deadline)))
+        extracted = self.google.extract_from_text(result.get('full_text', ''))
+        return extracted, ENGINE_PRIORS['azure'] * result.get('confidence', 0.9)
+
+    def run_local(self, file_path: str) -> Tuple[Dict[str, Any], float]:
+        """PDF text layer when present, otherwise Tesseract over the page rasters"""
+        text = ''
+        if file_path.lower().endswith('.pdf'):
+            import fitz
+            with fitz.open(file_path) as doc:
+                text = '\n'.join(page.get_text() for page in doc)
+        if text.strip():
+            return self.google.extract_from_text(text), ENGINE_PRIORS['local_text']
+
+        try:
+            import pytesseract  # noqa: F401  (used through tesseract_words)
+        except ImportError:
+            raise RuntimeError('no text layer and pytesseract is not installed')
+
+        # Imported here: PyMuPDF/NumPy rasterizing is only needed for scans
+        try:
+            from page_rasterizer import page_rasterizer
+            from tesseract_cache import tesseract_words
+        except ImportError:
+            from backend.page_rasterizer import page_rasterizer
+            from backend.tesseract_cache import tesseract_words
+
+        # Pages are rendered one at a time so only one 300 dpi raster is held here at once
+        if file_path.lower().endswith('.pdf'):
+            pages = (page_rasterizer.render_page(file_path, page_number, dpi=300)
+                     for page_number in range(page_rasterizer.page_count(file_path)))
+        else:
+            import cv2
+            pages = [cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)]
+
+        # One Tesseract run per page: text and confidences both come from the word boxes
+        texts, confidences = [], []
+        for page in pages:
+            page_words = tesseract_words.page_words(page)
+            confidences.extend(word['conf'] for word in page_words.words())
+            texts.append(page_words.page_text())
+        mean_confidence = (sum(confidences) / len(confidences) / 100.0) if confidences else 0.5
+        return self.google.extract_from_text('\n'.join(texts)), ENGINE_PRIORS['local_tesseract'] * mean_confidence
+
+    # Merge ---------------------------------------------------------------
+
+    def merge(self, results: Dict[str, Tuple[Dict[str, Any], float]]) -> Dict[str, Any]:
+        """Pick each field's value by confidence; agreeing engines reinforce each other"""
+        # Engine order by overall trust decides the base document and line items
+        ranked = sorted(results, key=lambda name: results[name][1], reverse=True)
+        base_name = next((name for name in ranked if results[name][0].get('line_items')), ranked[0])
+        merged = dict(results[base_name][0])
+        merged['vendor'] = dict(merged.get('vendor') or {})
+        merged['customer'] = dict(merged.get('customer') or {})
+        merged['confidence_scores'] = {}
+        field_sources = {}
+
+        for field in MERGED_FIELDS:
+            candidates: Dict[str, Dict[str, Any]] = {}
+            for name in ranked:
+                extracted, prior = results[name]
+                value = _get_field(extracted, field)
+                if value in (None, ''):
+                    continue
+                score_key = CONFIDENCE_KEYS.get(field, field)
+                confidence = extracted.get('confidence_scores', {}).get(score_key, prior)
+                key = _normalize(value)
+                candidate = candidates.setdefault(key, {'value': value, 'miss': 1.0, 'engines': []})
+                # Independent engines agreeing: combined = 1 - prod(1 - c)
+                candidate['miss'] *= (1.0 - confidence)
+                candidate['engines'].append(name)
+
+            if not candidates:
+                continue
+
+            best = max(candidates.values(), key=lambda c: 1.0 - c['miss'])
+            _set_field(merged, field, best['value'])
+            merged['confidence_scores'][CONFIDENCE_KEYS.get(field, field)] = round(1.0 - best['miss'], 3)
+            field_sources[field] = best['engines']
+
+        merged['ensemble'] = {'base_engine': base_name, 'field_sources': field_sources}
+        return merged
+
+    # Entry point ---------------------------------------------------------
+
+    def process_document(self, file_path: str,
+                         progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        report = progress or (lambda stage, **details: None)
+        engines = {
+            'google': self.run_google,
+            'azure': self.run_azure,
+            'local': self.run_local
+        }
+        engines = {name: fn for name, fn in engines.items() if name in self.engine_names}
+
+        start = time.time()
+        report('ocr_started', engines=list(engines), deadline=self.deadline)
+
+        durations: Dict[str, float] = {}
+
+        def timed(name, fn):
+            engine_start = time.time()
+            try:
+                return fn(file_path)
+            finally:
+                durations[name] = time.time() - engine_start
+                pipeline_metrics.observe(f"ensemble.{name}_seconds", durations[name])
+
+        # Own threads per document: engines that miss the deadline finish in the
+        # background without delaying the engines of other documents
+        executor = ThreadPoolExecutor(max_workers=max(1, len(engines)), thread_name_prefix='ocr-engine')
+        futures = {executor.submit(timed, name, fn): name for name, fn in engines.items()}
+        executor.shutdown(wait=False)
+        done, pending = wait(futures, timeout=self.deadline)
+
+        # Nothing usable by the deadline: take the first engine that still answers
+        while pending and not any(future.exception() is None for future in done):
+            remaining = start + self.max_wait - time.time()
+            if remaining <= 0:
+                break
+            answered, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            done |= answered
+
+        results = {}
+        status = {}
+        for future, name in futures.items():
+            if future in pending:
+                status[name] = {'status': 'timeout'}
+                pipeline_metrics.increment(f"ensemble.{name}_timeouts")
+                continue
+            try:
+                results[name] = future.result()
+                status[name] = {'status': 'ok'}
+            except Exception as e:
+                status[name] = {'status': 'error', 'error': str(e)}
+                pipeline_metrics.increment(f"ensemble.{name}_errors")
+                logger.warning(f"Ensemble engine {name} failed: {e}")
+            status[name]['seconds'] = round(durations.get(name, 0.0), 3)
+
+        elapsed = time.time() - start
+        pipeline_metrics.observe('ensemble.seconds', elapsed)
+        report('ocr_finished', engines=status, seconds=round(elapsed, 3))
+
+        if not results:
+            pipeline_metrics.increment('ensemble.unanswered')
+            raise OCRUnavailable(f"No OCR engine answered within {self.max_wait:g}s: "
+                                 + ', '.join(f"{name} {engine['status']}" for name, engine in status.items()))
+
+        extracted = self.merge(results)
+        report('extracted', fallback=False, line_items=len(extracted.get('line_items', [])))
+
+        extracted.setdefault('ensemble', {})
+        extracted['ensemble'].update({'engines': status, 'deadline': self.deadline, 'seconds': round(elapsed, 3)})
+        return extracted
+
+
+def create_document_processor():
+    """OCR processor selected by OCR_MODE ('google' default, or 'ensemble')"""
+    if OCR_MODE == 'ensemble':
+        return EnsembleOCRProcessor()
+    return GoogleDocumentProcessor()
@@ -8,7 +8,12 @@ import fitz  # PyMuPDF
 import json
 import os
 from typing import Dict, Any
-from datetime import datetime
+
+try:
+    from storage_layout import storage_for
+except ImportError:
+    from backend.storage_layout import storage_for
+
 
 class ExactTemplateFiller:
     """Fill JO template with exact measured positions - preserving original format"""
@@ -397,9 +402,8 @@ class ExactTemplateFiller:
         """Generate JO with exact format preservation"""
         
         # Generate output filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_filename = f"JO_EXACT_{timestamp}.pdf"
-        output_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'job_orders', output_filename)
+        output_path = storage_for(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'job_orders')).new_path(
+            'JO_EXACT', 'pdf')
         
         if self.fill_exact_template(validated_data, output_path):
             return output_path
@@ -3,14 +3,28 @@ Google Document AI Processor for Sendora OCR V2.0
 High-accuracy document processing with structured data extraction
 """
 
-from google.cloud import documentai_v1 as documentai
-from google.oauth2 import service_account
-from google.api_core.client_options import ClientOptions
 import json
 import os
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 
+try:
+    from ocr_resilience import CircuitBreaker, call_with_resilience
+except ImportError:
+    from backend.ocr_resilience import CircuitBreaker, call_with_resilience
+
+# Per-call deadline for Document AI; well under gunicorn's 120s worker timeout
+GOOGLE_CALL_TIMEOUT = float(os.environ.get('GOOGLE_CALL_TIMEOUT', '30'))
+
+# Shared by every processor instance in the process
+document_ai_breaker = CircuitBreaker('google')
+
+
+def _documentai():
+    """The Document AI SDK, imported on first use (about 0.4s of app startup otherwise)"""
+    from google.cloud import documentai_v1
+    return documentai_v1
+
 
 class GoogleDocumentProcessor:
     """Google Document AI processor for invoices and purchase orders"""
@@ -35,6 +49,10 @@ class GoogleDocumentProcessor:
         
         # Initialize client with credentials
         try:
+            from google.oauth2 import service_account
+            from google.api_core.client_options import ClientOptions
+            documentai = _documentai()
+            
             credentials_path = os.path.join('config', 'google-credentials.json')
             if os.path.exists(credentials_path):
                 credentials = service_account.Credentials.from_service_account_file(
@@ -97,67 +115,106 @@ class GoogleDocumentProcessor:
         # Default to invoice processor
         return 'invoice'
     
-    def process_document(self, file_path: str) -> Dict[str, Any]:
-        """Process document with Google Document AI"""
+    def process_document(self, file_path: str,
+                         progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """Process document with Google Document AI
+
+        progress, if given, is called as progress(stage, **details) at each
+        pipeline stage: classified, ocr_started, ocr_finished, extracted.
+        Any failure falls back to demo data (marked is_fallback).
+        """
         
-        if not self.client:
-            return self.fallback_processing(file_path)
+        report = progress or (lambda stage, **details: None)
         
         try:
-            # Detect document type
-            doc_type = self.detect_document_type(file_path)
-            self.processor_id = self.processors.get(doc_type, self.processors['general'])
-            
-            # Read file
-            with open(file_path, 'rb') as f:
-                content = f.read()
-            
-            # Determine MIME type
-            if file_path.lower().endswith('.pdf'):
-                mime_type = 'application/pdf'
-            elif file_path.lower().endswith(('.jpg', '.jpeg')):
-                mime_type = 'image/jpeg'
-            elif file_path.lower().endswith('.png'):
-                mime_type = 'image/png'
-            else:
-                mime_type = 'application/octet-stream'
-            
-            # Create document object
-            raw_document = documentai.RawDocument(
-                content=content,
-                mime_type=mime_type
-            )
-            
-            # Configure the process request
-            name = self.client.processor_path(
-                self.project_id,
-                self.location,
-                self.processor_id
-            )
-            
-            request = documentai.ProcessRequest(
-                name=name,
-                raw_document=raw_document
-            )
-            
-            # Process the document
-            print(f"Processing document with Google Document AI...")
-            result = self.client.process_document(request=request)
-            
-            # Extract structured data
-            extracted_data = self.extract_structured_data(result.document)
-            
-            print(f"Document processed successfully")
-            return extracted_data
+            return self.process_document_strict(file_path, progress)
             
         except Exception as e:
             print(f"Error processing with Google Document AI: {e}")
+            report('extracted', fallback=True, reason=str(e))
             return self.fallback_processing(file_path)
     
-    def extract_structured_data(self, document) -> Dict[str, Any]:
-        """Extract structured data from Document AI response"""
+    def process_document_strict(self, file_path: str,
+                                progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+        """Like process_document, but raises instead of returning demo data"""
+        
+        report = progress or (lambda stage, **details: None)
         
-        extracted = {
+        if not self.client:
+            raise RuntimeError('Document AI client unavailable')
+        
+        # Detect document type
+        # Keep the processor id local: one instance is shared across request threads
+        doc_type = self.detect_document_type(file_path)
+        processor_id = self.processors.get(doc_type, self.processors['general'])
+        self.processor_id = processor_id
+        report('classified', document_type=doc_type)
+        
+        # Read file
+        with open(file_path, 'rb') as f:
+            content = f.read()
+        
+        # Determine MIME type
+        if file_path.lower().endswith('.pdf'):
+            mime_type = 'application/pdf'
+        elif file_path.lower().endswith(('.jpg', '.jpeg')):
+            mime_type = 'image/jpeg'
+        elif file_path.lower().endswith('.png'):
+            mime_type = 'image/png'
+        else:
+            mime_type = 'application/octet-stream'
+        
+        # Downscale / recompress before upload; the original is kept if it is smaller
+        try:
+            from payload_optimizer import optimize_payload
+        except ImportError:
+            from backend.payload_optimizer import optimize_payload
+        content, mime_type, payload_info = optimize_payload(content, mime_type)
+        if payload_info['optimized']:
+            print(f"Payload reduced {payload_info['bytes_in']} -> {payload_info['bytes_out']} bytes "
+                  f"in {payload_info['optimize_seconds']:.2f}s")
+        
+        # Create document object
+        documentai = _documentai()
+        raw_document = documentai.RawDocument(
+            content=content,
+            mime_type=mime_type
+        )
+        
+        # Configure the process request
+        name = self.client.processor_path(
+            self.project_id,
+            self.location,
+            processor_id
+        )
+        
+        request = documentai.ProcessRequest(
+            name=name,
+            raw_document=raw_document
+        )
+        
+        # Process the document
+        print(f"Processing document with Google Document AI...")
+        report('ocr_started', bytes=len(content))
+        result = call_with_resilience(
+            'google',
+            lambda: self.client.process_document(request=request, timeout=GOOGLE_CALL_TIMEOUT),
+            document_ai_breaker,
+            deadline=GOOGLE_CALL_TIMEOUT,
+            timing_name='google.process_seconds'
+        )
+        report('ocr_finished', pages=len(result.document.pages))
+        
+        # Extract structured data
+        extracted_data = self.extract_structured_data(result.document)
+        report('extracted', fallback=False, line_items=len(extracted_data.get('line_items', [])))
+        
+        print(f"Document processed successfully")
+        return extracted_data
+    
+    def empty_extraction(self, text: str) -> Dict[str, Any]:
+        """Blank result in the shape every consumer of extracted data expects"""
+        return {
             'invoice_number': None,
             'po_number': None,
             'date': None,
@@ -178,9 +235,50 @@ class GoogleDocumentProcessor:
             'total': None,
             'currency': 'MYR',
             'confidence_scores': {},
-            'full_text': document.text,
+            'full_text': text,
             'document_type': 'invoice'
         }
+    
+    def extract_from_text(self, text: str) -> Dict[str, Any]:
+        """Pattern-only extraction from plain OCR text (used for non-Google engines)"""
+        import re
+        
+        extracted = self.empty_extraction(text)
+        
+        header_patterns = {
+            'invoice_number': r'\b(?:invoice|inv|bil)\s*(?:no|number|#)\.?\s*[:#]?\s*((?=[A-Z\-/]*\d)[A-Z0-9][A-Z0-9\-/]{2,})',
+            'po_number': r'\b(?:p\.?o\.?|purchase\s+order)\s*(?:no|number|#)\.?\s*[:#]?\s*((?=[A-Z\-/]*\d)[A-Z0-9][A-Z0-9\-/]{2,})',
+            'date': r'\bdate\s*[:\s]\s*(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}|\d{4}-\d{2}-\d{2})',
+            'due_date': r'(?:due|delivery)\s+date\s*[:\s]\s*(\d{1,2}[/\-.]\d{1,2}[/\-.]\d{2,4}|\d{4}-\d{2}-\d{2})',
+            'total': r'\b(?:grand\s+)?total(?:\s+amount)?\s*[:\s]\s*(?:RM\s*)?([\d,]+\.\d{2})'
+        }
+        for field, pattern in header_patterns.items():
+            match = re.search(pattern, text, re.IGNORECASE)
+            if match:
+                extracted[field] = match.group(1).strip()
+        
+        # Door/frame lines become line items so the usual aggregation applies
+        for line in text.splitlines():
+            if re.search(r'\b(door|frame|pintu|bingkai)\b', line, re.IGNORECASE) and self.extract_size(line):
+                extracted['line_items'].append({
+                    'description': line.strip(),
+                    'quantity': None,
+                    'unit_price': None,
+                    'amount': None,
+                    'unit': None,
+                    'size': self.extract_size(line),
+                    'specifications': self.extract_specifications(line)
+                })
+        
+        extracted = self.extract_malaysian_patterns(extracted, text)
+        extracted = self.aggregate_door_specifications(extracted)
+        extracted = self.cleanup_customer_name(extracted)
+        return extracted
+    
+    def extract_structured_data(self, document) -> Dict[str, Any]:
+        """Extract structured data from Document AI response"""
+        
+        extracted = self.empty_extraction(document.text)
         
         # Extract entities
         for entity in document.entities:
@@ -638,7 +736,8 @@ class GoogleDocumentProcessor:
             'currency': 'MYR',
             'confidence_scores': {},
             'full_text': 'Demo document - Google Document AI not configured',
-            'document_type': 'invoice'
+            'document_type': 'invoice',
+            'is_fallback': True
         }
 
 
@@ -0,0 +1,173 @@
+"""
+Health Checks
+Dependency probes for the readiness endpoint, refreshed in the background so
+a health request never does the work itself.
+
+Each probe runs in one daemon thread per process every PROBE_INTERVAL
+seconds; requests only read the last result. A result older than PROBE_TTL
+(e.g. a probe stuck on a dead Redis) counts as failed. The thread starts on
+the first status request, so a gunicorn master that preloads the app forks
+no threads.
+
+    /health/live   the process is serving requests (no probes consulted)
+    /health/ready  every critical probe passed recently (503 otherwise)
+
+A probe returns a dict of details, and raises or returns {'ok': False, ...}
+when the dependency is unusable.
+"""
+
+import os
+import time
+import shutil
+import logging
+import threading
+from typing import Dict, Any, Callable, List, Optional
+
+try:
+    from pipeline_metrics import pipeline_metrics
+    from ocr_resilience import breaker_status, OPEN
+except ImportError:
+    from backend.pipeline_metrics import pipeline_metrics
+    from backend.ocr_resilience import breaker_status, OPEN
+
+logger = logging.getLogger(__name__)
+
+PROBE_INTERVAL = float(os.environ.get('HEALTH_PROBE_INTERVAL', '15'))
+PROBE_TTL = float(os.environ.get('HEALTH_PROBE_TTL', str(PROBE_INTERVAL * 3)))
+MIN_FREE_MB = int(os.environ.get('HEALTH_MIN_FREE_MB', '100'))
+CLIENT_RETRY_SECONDS = float(os.environ.get('HEALTH_CLIENT_RETRY', '300'))
+
+
+class HealthChecks:
+    """Registered probes and their last results, refreshed by a background thread"""
+
+    def __init__(self, interval: float = PROBE_INTERVAL, ttl: float = PROBE_TTL):
+        self.interval = interval
+        self.ttl = ttl
+        self.probes: Dict[str, Dict[str, Any]] = {}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid = None
+
+    def register(self, name: str, check: Callable[[], Dict[str, Any]], critical: bool = True):
+        with self.lock:
+            self.probes[name] = {'check': check, 'critical': critical}
+
+    def run_probe(self, name: str) -> Dict[str, Any]:
+        probe = self.probes[name]
+        start = time.time()
+        try:
+            details = probe['check']() or {}
+            ok = bool(details.pop('ok', True))
+        except Exception as e:
+            ok, details = False, {'error': str(e)}
+        duration = time.time() - start
+        pipeline_metrics.observe(f"health.{name}_seconds", duration)
+        if not ok:
+            pipeline_metrics.increment(f"health.{name}_failures")
+        result = {'ok': ok, 'critical': probe['critical'], 'checked_at': start,
+                  'duration_ms': round(duration * 1000, 1), **details}
+        with self.lock:
+            previous = self.results.get(name)
+            self.results[name] = result
+        if previous is not None and previous['ok'] != ok:
+            logger.log(logging.INFO if ok else logging.WARNING,
+                       f"Health probe {name} {'recovered' if ok else 'failing'}: {details}")
+        return result
+
+    def refresh(self):
+        for name in list(self.probes):
+            self.run_probe(name)
+
+    def _loop(self):
+        while True:
+            self.refresh()
+            time.sleep(self.interval)
+
+    def start(self):
+        """Start the refresher in this process (again after a fork)"""
+        with self.lock:
+            if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._loop, name='health-probes', daemon=True)
+            self._thread.start()
+
+    def status(self) -> Dict[str, Any]:
+        """Last result of every probe, marked stale or pending where needed; never runs a probe"""
+        self.start()
+        now = time.time()
+        with self.lock:
+            results = dict(self.results)
+            probes = dict(self.probes)
+        checks = {}
+        for name, probe in probes.items():
+            result = results.get(name)
+            if result is None:
+                checks[name] = {'ok': False, 'critical': probe['critical'], 'state': 'pending'}
+                continue
+            age = now - result['checked_at']
+            state = 'ok' if result['ok'] else 'failing'
+            if age > self.ttl:
+                state = 'stale'
+            checks[name] = dict(result, ok=state == 'ok', state=state, age_seconds=round(age, 1))
+        ready = all(check['ok'] for check in checks.values() if check['critical'])
+        degraded = not all(check['ok'] for check in checks.values())
+        return {'ready': ready, 'status': 'ready' if not degraded else ('degraded' if ready else 'unavailable'),
+                'checks': checks}
+
+
+# Probes ------------------------------------------------------------------
+
+class DocumentAIProbe:
+    """Document AI client built once per process, plus the live circuit breaker state
+
+    Without usable credentials, building the client can take seconds (default
+    credential lookup), so a failed build is retried every retry_seconds.
+    """
+
+    def __init__(self, retry_seconds: float = CLIENT_RETRY_SECONDS):
+        self.retry_seconds = retry_seconds
+        self.processor = None
+        self.built_at = 0.0
+
+    def __call__(self) -> Dict[str, Any]:
+        if self.processor is None or (self.processor.client is None
+                                      and time.time() - self.built_at >= self.retry_seconds):
+            try:
+                from google_document_ai import GoogleDocumentProcessor
+            except ImportError:
+                from backend.google_document_ai import GoogleDocumentProcessor
+            self.built_at = time.time()
+            self.processor = GoogleDocumentProcessor()
+        client = self.processor.client is not None
+        breaker = breaker_status().get('google', {}).get('state')
+        return {'ok': client and breaker != OPEN, 'client': client, 'breaker': breaker}
+
+
+def pdf_converter_probe() -> Dict[str, Any]:
+    """wkhtmltopdf on PATH (JO generation falls back to HTML without it)"""
+    path = shutil.which('wkhtmltopdf')
+    return {'ok': path is not None, 'path': path}
+
+
+def storage_probe(folders: List[str], store=None, min_free_mb: int = MIN_FREE_MB) -> Callable[[], Dict[str, Any]]:
+    """Folders exist, are writable and have space; the shared store answers"""
+    def check() -> Dict[str, Any]:
+        details, ok = {'folders': {}}, True
+        for folder in folders:
+            writable = os.path.isdir(folder) and os.access(folder, os.W_OK)
+            free_mb = shutil.disk_usage(folder).free // (1024 * 1024) if writable else 0
+            details['folders'][folder] = {'writable': writable, 'free_mb': free_mb}
+            ok = ok and writable and free_mb >= min_free_mb
+        if store is not None:
+            store.get('health:probe')  # raises if Redis is unreachable
+            details['shared_store'] = type(store).__name__
+        details['ok'] = ok
+        return details
+    return check
+
+
+# Shared instance used by the web apps
+health_checks = HealthChecks()
@@ -0,0 +1,136 @@
+"""
+Idempotency Keys
+Lets clients retry POSTs safely. A request carrying an `Idempotency-Key`
+header runs once per key within IDEMPOTENCY_TTL_SECONDS; repeats get the
+stored response back (marked `Idempotent-Replayed: true`) instead of
+re-running OCR or JO rendering.
+
+A repeat that arrives while the first request is still running waits for it
+and returns its response. Keys are coordinated through the shared store, so
+this works across gunicorn workers. Reusing a key with a different request
+body is rejected with 422. Server errors (5xx) are not stored, so those can
+be retried.
+"""
+
+import os
+import re
+import time
+import base64
+import hashlib
+import logging
+from functools import wraps
+
+from flask import request, jsonify, current_app
+
+try:
+    from pipeline_metrics import pipeline_metrics
+    from shared_store import shared_store
+except ImportError:
+    from backend.pipeline_metrics import pipeline_metrics
+    from backend.shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+# Matches the default session lifetime; replayed URLs would point at expired sessions anyway
+IDEMPOTENCY_TTL = float(os.environ.get('IDEMPOTENCY_TTL_SECONDS', '7200'))
+IDEMPOTENCY_WAIT = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', '120'))
+IDEMPOTENCY_LOCK_TTL = float(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', '300'))
+IDEMPOTENCY_MAX_BODY = int(os.environ.get('IDEMPOTENCY_MAX_BODY_MB', '10')) * 1024 * 1024
+KEY_PATTERN = re.compile(r'^[\x21-\x7e]{1,128}$')
+REPLAYED_HEADERS = ('Content-Type', 'Content-Disposition', 'Location', 'Cache-Control')
+POLL_SECONDS = 0.25
+
+
+def request_fingerprint() -> str:
+    """Hash of what the request asks for: path, form fields and uploaded file contents"""
+    digest = hashlib.sha256()
+    digest.update(f"{request.method} {request.path}\n".encode('utf-8'))
+    for key, value in sorted(request.form.items(multi=True)):
+        digest.update(f"{key}={value}\n".encode('utf-8'))
+    for field, upload in sorted(request.files.items(multi=True), key=lambda item: item[0]):
+        digest.update(f"{field}:{upload.filename}\n".encode('utf-8'))
+        for chunk in iter(lambda: upload.stream.read(1024 * 1024), b''):
+            digest.update(chunk)
+        upload.stream.seek(0)
+    return digest.hexdigest()
+
+
+def _serialize(response, fingerprint: str):
+    response.direct_passthrough = False  # send_file responses stream from disk by default
+    body = response.get_data()
+    if len(body) > IDEMPOTENCY_MAX_BODY:
+        return None
+    return {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'headers': {name: response.headers[name] for name in REPLAYED_HEADERS if name in response.headers},
+        'body': base64.b64encode(body).decode('ascii')
+    }
+
+
+def _replay(stored):
+    response = current_app.response_class(base64.b64decode(stored['body']), status=stored['status'])
+    for name, value in stored['headers'].items():
+        response.headers[name] = value
+    response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _mismatch():
+    pipeline_metrics.increment('idempotency.mismatches')
+    return jsonify({'error': 'Idempotency-Key was already used for a different request'}), 422
+
+
+def idempotent(scope: str):
+    """Decorator for Flask POST views honouring the Idempotency-Key header"""
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            key = request.headers.get('Idempotency-Key')
+            if key is None:
+                return view(*args, **kwargs)
+            if not KEY_PATTERN.match(key):
+                return jsonify({'error': 'Invalid Idempotency-Key (1-128 printable characters)'}), 400
+
+            fingerprint = request_fingerprint()
+            response_key = f"idempotency:{scope}:{key}"
+            lock_key = f"{response_key}:lock"
+            waited_since = time.time()
+            attached = False
+
+            while True:
+                stored = shared_store.get(response_key)
+                if stored is not None:
+                    if stored['fingerprint'] != fingerprint:
+                        return _mismatch()
+                    pipeline_metrics.increment('idempotency.attached' if attached else 'idempotency.replays')
+                    return _replay(stored)
+
+                if shared_store.add(lock_key, {'fingerprint': fingerprint}, IDEMPOTENCY_LOCK_TTL):
+                    break
+
+                # Same key still running elsewhere: attach to it
+                lock = shared_store.get(lock_key)
+                if lock is not None and lock['fingerprint'] != fingerprint:
+                    return _mismatch()
+                if time.time() - waited_since > IDEMPOTENCY_WAIT:
+                    response = jsonify({'error': 'A request with this Idempotency-Key is still in progress'})
+                    response.headers['Retry-After'] = '5'
+                    return response, 409
+                attached = True
+                time.sleep(POLL_SECONDS)
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code < 500:
+                    stored = _serialize(response, fingerprint)
+                    if stored is not None:
+                        shared_store.set(response_key, stored, IDEMPOTENCY_TTL)
+                        pipeline_metrics.increment('idempotency.stored')
+                    else:
+                        logger.warning(f"Response for Idempotency-Key {key} too large to store")
+                return response
+            finally:
+                shared_store.delete(lock_key)
+        return wrapped
+    return decorator
@@ -0,0 +1,346 @@
+"""
+Watch-Folder Ingestion Daemon
+Watches a drop folder with Linux inotify and feeds new documents through the
+OCR-and-extract pipeline. Partially written files are debounced until their
+size and mtime stop changing.
+
+Usage:
+    python backend/ingest_daemon.py --watch-dir /mnt/scanner --workers 4
+    INGEST_WATCH_DIR=/mnt/scanner python backend/ingest_daemon.py
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import select
+import shutil
+import signal
+import struct
+import ctypes
+import ctypes.util
+import argparse
+import threading
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from google_document_ai import GoogleDocumentProcessor
+    from ensemble_ocr import create_document_processor
+    from pipeline_metrics import pipeline_metrics
+except ImportError:  # imported as part of the backend package
+    from backend.google_document_ai import GoogleDocumentProcessor
+    from backend.ensemble_ocr import create_document_processor
+    from backend.pipeline_metrics import pipeline_metrics
+
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff'}
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT_HEADER = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Minimal ctypes binding to inotify for a single directory (no dependency)"""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library('c')
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+
+        mask = IN_CREATE | IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+        self.wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), mask)
+        if self.wd < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch failed for {directory}")
+
+    def read_events(self, timeout: float) -> Optional[List[str]]:
+        """Return changed file names; None means the kernel queue overflowed"""
+
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+
+        names, offset, overflow = [], 0, False
+        while offset + EVENT_HEADER.size <= len(buffer):
+            _, mask, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = buffer[offset:offset + name_len].rstrip(b'\0').decode('utf-8', 'replace')
+            offset += name_len
+
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name and not mask & (IN_ISDIR | IN_IGNORED):
+                names.append(name)
+
+        return None if overflow else names
+
+    def close(self):
+        os.close(self.fd)
+
+
+class IngestDaemon:
+    """Debounce new files in a drop folder and OCR them with a worker pool"""
+
+    def __init__(self, watch_dir: str, output_dir: str, workers: int = 2, settle_seconds: float = 2.0,
+                 rescan_interval: float = 60.0, metrics_interval: float = 10.0,
+                 processor: GoogleDocumentProcessor = None):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.output_dir = os.path.abspath(output_dir)
+        self.processed_dir = os.path.join(self.watch_dir, 'processed')
+        self.failed_dir = os.path.join(self.watch_dir, 'failed')
+        self.metrics_path = os.path.join(self.output_dir, 'ingest_metrics.json')
+
+        self.workers = max(1, workers)
+        self.settle_seconds = settle_seconds
+        self.rescan_interval = rescan_interval
+        self.metrics_interval = metrics_interval
+        self.processor = processor
+
+        # name -> {'first_seen', 'last_event', 'size', 'mtime'}
+        self.settling: Dict[str, Dict[str, float]] = {}
+        self.queued: List[Dict[str, Any]] = []
+        self.in_progress: Dict[str, float] = {}
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+
+        for folder in [self.watch_dir, self.output_dir, self.processed_dir, self.failed_dir]:
+            os.makedirs(folder, exist_ok=True)
+
+    # ------------------------------------------------------------ discovery
+
+    def _allowed(self, name: str) -> bool:
+        if name.startswith('.') or '.' not in name:
+            return False
+        return name.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+    def note_change(self, name: str, now: float):
+        """Record activity on a file; resets its debounce timer"""
+        if not self._allowed(name):
+            return
+        with self.lock:
+            if name in self.in_progress or any(item['name'] == name for item in self.queued):
+                return
+            entry = self.settling.get(name)
+            if entry is None:
+                self.settling[name] = {'first_seen': now, 'last_event': now, 'size': -1, 'mtime': -1}
+            else:
+                entry['last_event'] = now
+
+    def rescan(self, now: float):
+        """Full directory sweep: picks up the startup backlog and events inotify
+        cannot see (writes made by other hosts on a network mount)"""
+        for name in sorted(os.listdir(self.watch_dir)):
+            if os.path.isfile(os.path.join(self.watch_dir, name)):
+                self.note_change(name, now)
+
+    def promote_settled(self, now: float):
+        """Move files whose size and mtime held steady for settle_seconds to the queue"""
+
+        with self.lock:
+            candidates = [(name, entry) for name, entry in self.settling.items()
+                          if now - entry['last_event'] >= self.settle_seconds]
+
+        for name, entry in candidates:
+            path = os.path.join(self.watch_dir, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                with self.lock:
+                    self.settling.pop(name, None)
+                continue
+
+            with self.lock:
+                if stat.st_size > 0 and stat.st_size == entry['size'] and stat.st_mtime == entry['mtime']:
+                    self.settling.pop(name, None)
+                    self.queued.append({'name': name, 'first_seen': entry['first_seen']})
+                else:
+                    # Still growing (or first check): wait another settle period
+                    entry['size'] = stat.st_size
+                    entry['mtime'] = stat.st_mtime
+                    entry['last_event'] = now
+
+    # ----------------------------------------------------------- processing
+
+    def dispatch(self, pool: ThreadPoolExecutor):
+        """Hand queued files to the pool, never more than `workers` at once"""
+        with self.lock:
+            while self.queued and len(self.in_progress) < self.workers:
+                item = self.queued.pop(0)
+                self.in_progress[item['name']] = item['first_seen']
+                pool.submit(self.process_file, item)
+
+    def process_file(self, item: Dict[str, Any]):
+        name = item['name']
+        path = os.path.join(self.watch_dir, name)
+        start = time.time()
+
+        try:
+            extracted_data = self.processor.process_document(path)
+            if extracted_data.get('is_fallback'):
+                raise RuntimeError('Document AI unavailable - got fallback demo data')
+
+            # Full source name (a.pdf -> a.pdf.json), timestamped if a same-named file was seen before
+            result_path = self._unique_target(self.output_dir, f"{name}.json")
+            with open(result_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'source': name,
+                    'ingested_at': datetime.now().isoformat(),
+                    'extracted_data': extracted_data
+                }, f, indent=2, ensure_ascii=False, default=str)
+
+            shutil.move(path, self._unique_target(self.processed_dir, name))
+            pipeline_metrics.increment('ingest.processed')
+            print(f"Ingested {name} in {time.time() - start:.2f}s")
+
+        except Exception as e:
+            pipeline_metrics.increment('ingest.failed')
+            print(f"Ingest failed for {name}: {e}")
+            try:
+                shutil.move(path, self._unique_target(self.failed_dir, name))
+            except OSError:
+                pass
+
+        finally:
+            finished = time.time()
+            pipeline_metrics.observe('ingest.processing_seconds', finished - start)
+            pipeline_metrics.observe('ingest.lag_seconds', finished - item['first_seen'])
+            with self.lock:
+                self.in_progress.pop(name, None)
+
+    def _unique_target(self, folder: str, name: str) -> str:
+        target = os.path.join(folder, name)
+        if os.path.exists(target):
+            stem, ext = os.path.splitext(name)
+            target = os.path.join(folder, f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{ext}")
+        return target
+
+    # -------------------------------------------------------------- metrics
+
+    def export_metrics(self, now: float):
+        with self.lock:
+            settling = len(self.settling)
+            queued = len(self.queued)
+            in_progress = len(self.in_progress)
+            first_seen = [entry['first_seen'] for entry in self.settling.values()]
+            first_seen += [item['first_seen'] for item in self.queued]
+            first_seen += list(self.in_progress.values())
+
+        pipeline_metrics.set_gauge('ingest.backlog', settling + queued + in_progress)
+        pipeline_metrics.set_gauge('ingest.settling', settling)
+        pipeline_metrics.set_gauge('ingest.queued', queued)
+        pipeline_metrics.set_gauge('ingest.in_progress', in_progress)
+        pipeline_metrics.set_gauge('ingest.oldest_pending_seconds',
+                                   round(now - min(first_seen), 2) if first_seen else 0.0)
+        pipeline_metrics.write_json(self.metrics_path)
+
+    # ----------------------------------------------------------------- loop
+
+    def run(self):
+        if self.processor is None:
+            self.processor = create_document_processor()
+
+        try:
+            watcher = InotifyWatcher(self.watch_dir)
+            print(f"Watching {self.watch_dir} with inotify ({self.workers} workers)")
+        except (OSError, AttributeError) as e:
+            # Non-Linux hosts: fall back to periodic sweeps only
+            watcher = None
+            self.rescan_interval = self.rescan_interval or 5.0
+            print(f"inotify unavailable ({e}); polling every {self.rescan_interval}s")
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ingest')
+        now = time.time()
+        self.rescan(now)
+        last_rescan = last_metrics = now
+
+        try:
+            while not self.stopping.is_set():
+                tick = min(0.5, self.settle_seconds / 2 or 0.5)
+                if watcher:
+                    names = watcher.read_events(timeout=tick)
+                    now = time.time()
+                    if names is None:
+                        print("inotify queue overflow - rescanning watch folder")
+                        pipeline_metrics.increment('ingest.inotify_overflows')
+                        self.rescan(now)
+                    else:
+                        for name in names:
+                            self.note_change(name, now)
+                else:
+                    self.stopping.wait(tick)
+                    now = time.time()
+
+                if self.rescan_interval and now - last_rescan >= self.rescan_interval:
+                    self.rescan(now)
+                    last_rescan = now
+
+                self.promote_settled(now)
+                self.dispatch(pool)
+
+                if now - last_metrics >= self.metrics_interval:
+                    self.export_metrics(now)
+                    last_metrics = now
+        finally:
+            if watcher:
+                watcher.close()
+            print("Stopping ingest daemon - waiting for in-flight documents")
+            pool.shutdown(wait=True)
+            self.export_metrics(time.time())
+
+    def stop(self, *_):
+        self.stopping.set()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Watch a folder and OCR new documents as they arrive')
+    parser.add_argument('--watch-dir', default=os.environ.get('INGEST_WATCH_DIR', os.path.join(BASE_DIR, 'uploads', 'inbox')),
+                        help='Drop folder to watch (default: $INGEST_WATCH_DIR or uploads/inbox)')
+    parser.add_argument('--output-dir', default=os.environ.get('INGEST_OUTPUT_DIR', os.path.join(BASE_DIR, 'temp', 'ingested')),
+                        help='Where extraction results and ingest_metrics.json are written')
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('INGEST_WORKERS', '2')),
+                        help='Concurrent documents in the OCR pipeline')
+    parser.add_argument('--settle-seconds', type=float, default=2.0,
+                        help='Quiet period before a file is considered fully written')
+    parser.add_argument('--rescan-interval', type=float, default=60.0,
+                        help='Safety-net directory sweep for writes inotify cannot see (0 disables)')
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help='Seconds between metrics exports')
+    args = parser.parse_args()
+
+    daemon = IngestDaemon(
+        args.watch_dir,
+        args.output_dir,
+        workers=args.workers,
+        settle_seconds=args.settle_seconds,
+        rescan_interval=args.rescan_interval,
+        metrics_interval=args.metrics_interval
+    )
+
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run()
+    sys.exit(0)
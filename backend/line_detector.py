@@ -0,0 +1,117 @@
+"""
+Line Detector
+Finds the ruled lines of a rendered form page with projection profiles and
+run lengths instead of morphology + HoughLinesP.
+
+Rows whose ink count (the horizontal projection profile) is below the
+minimum line length cannot contain a line and are skipped. In the rest, runs
+of ink are found with a vectorized diff and gaps up to max_gap are bridged;
+runs shorter than min_length, or mostly gap (a line of text), are dropped. Runs on adjacent rows that
+overlap are one stroke, so a 3 px thick rule comes back as a single line
+rather than a pile of Hough fragments. Vertical lines are the same on the
+transposed image.
+
+Results are arrays with one row per line, in PDF points when a scale is
+given: horizontal (y, x0, x1, thickness) and vertical (x, y0, y1, thickness).
+"""
+
+from typing import Dict, Tuple
+
+import numpy as np
+
+INK_THRESHOLD = 128     # gray levels below this are ink
+MIN_FILL = 0.75         # share of a bridged run that must be ink (text rows bridge to sparse runs)
+MERGE_DISTANCE = 2      # px; strokes on rows this close together are one line
+
+
+def _row_runs(mask: np.ndarray, min_length: int, max_gap: int,
+              min_fill: float = MIN_FILL) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(row, start, end) of ink runs at least min_length long after bridging gaps; end is exclusive"""
+    # Projection profile: a row with fewer ink pixels than min_length has no line
+    rows = np.flatnonzero(mask.sum(axis=1) >= min_length)
+    if rows.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty
+
+    padded = np.zeros((rows.size, mask.shape[1] + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask[rows]
+    edges = np.diff(padded, axis=1)
+    start_row, start = np.nonzero(edges == 1)
+    _, end = np.nonzero(edges == -1)   # row-major order, so ends pair with starts
+    ink = end - start
+
+    if start.size > 1 and max_gap > 0:
+        bridged = (start_row[1:] == start_row[:-1]) & (start[1:] - end[:-1] <= max_gap)
+        first = np.concatenate(([True], ~bridged))
+        last = np.concatenate((~bridged, [True]))
+        ink = np.add.reduceat(ink, np.flatnonzero(first))
+        start_row, start, end = start_row[first], start[first], end[last]
+
+    keep = (end - start >= min_length) & (ink >= min_fill * (end - start))
+    return rows[start_row[keep]], start[keep], end[keep]
+
+
+def _merge_strokes(row: np.ndarray, start: np.ndarray, end: np.ndarray, width: int,
+                   max_gap: int, merge_distance: int) -> np.ndarray:
+    """Join runs on nearby rows that overlap along the line into (center, start, end, thickness)"""
+    if row.size == 0:
+        return np.empty((0, 4), dtype=np.float64)
+
+    # Bands of consecutive rows that have runs (row holds each row once per run, already sorted)
+    band = np.concatenate(([0], np.cumsum(np.diff(row) > merge_distance)))
+
+    # Interval union within each band; offsetting by band keeps bands from touching
+    offset = band * (2 * width + max_gap + 1)
+    order = np.lexsort((start, band))
+    row, start, end = row[order], start[order], end[order]
+    lo, hi = start + offset[order], end + offset[order]
+    reach = np.maximum.accumulate(hi)
+    new_line = np.concatenate(([True], lo[1:] > reach[:-1] + max_gap))
+    heads = np.flatnonzero(new_line)
+
+    top = np.minimum.reduceat(row, heads)
+    bottom = np.maximum.reduceat(row, heads)
+    return np.column_stack([
+        (top + bottom + 1) / 2.0,
+        np.minimum.reduceat(start, heads),
+        np.maximum.reduceat(end, heads),
+        bottom - top + 1
+    ]).astype(np.float64)
+
+
+def detect_lines(gray: np.ndarray, scale: float = 1.0, min_length: int = 100,
+                 min_vertical_length: int = None, max_gap: int = 10,
+                 ink_threshold: int = INK_THRESHOLD, min_fill: float = MIN_FILL,
+                 merge_distance: int = MERGE_DISTANCE) -> Dict[str, np.ndarray]:
+    """Horizontal and vertical lines of a grayscale page raster
+
+    Lengths and gaps are in pixels; coordinates in the result are divided by
+    scale (pass the render zoom to get PDF points).
+    """
+    mask = gray < ink_threshold
+    height, width = mask.shape
+
+    h_row, h_start, h_end = _row_runs(mask, min_length, max_gap, min_fill)
+    horizontal = _merge_strokes(h_row, h_start, h_end, width, max_gap, merge_distance)
+
+    v_col, v_start, v_end = _row_runs(mask.T, min_vertical_length or min_length, max_gap, min_fill)
+    vertical = _merge_strokes(v_col, v_start, v_end, height, max_gap, merge_distance)
+
+    if scale != 1.0:
+        horizontal /= scale
+        vertical /= scale
+    return {'horizontal': horizontal, 'vertical': vertical}
+
+
+def line_positions(lines: np.ndarray, min_span: float = 0.0, tolerance: float = 1.0) -> np.ndarray:
+    """Sorted distinct positions (y of horizontal / x of vertical lines) spanning at least min_span
+
+    Positions closer than tolerance (e.g. one rule broken by a cell divider)
+    are reported once, at their mean.
+    """
+    spans = lines[lines[:, 2] - lines[:, 1] >= min_span]
+    if spans.size == 0:
+        return np.empty(0, dtype=np.float64)
+    positions = np.sort(spans[:, 0])
+    groups = np.concatenate(([0], np.cumsum(np.diff(positions) > tolerance)))
+    return np.bincount(groups, weights=positions) / np.bincount(groups)
@@ -0,0 +1,254 @@
+"""
+OCR Call Resilience
+Circuit breaker and hedged calls for the cloud OCR request.
+
+The breaker opens after consecutive failures, or when too many recent calls
+were slower than the latency threshold, so uploads fail fast to the fallback
+path instead of holding worker threads. After a cool-down one trial call is
+let through (half-open); its outcome closes or re-opens the breaker.
+
+Only errors that say the backend is unhealthy count against it: timeouts,
+connection errors, 5xx and 429/ResourceExhausted. Client errors such as a
+rejected document (InvalidArgument) pass through without touching the breaker.
+
+Hedging sends one duplicate request once the primary has been running longer
+than the recent p95 latency and returns whichever answers first. Hedges are
+capped at a fraction of calls so a slow backend never doubles the load.
+"""
+
+import os
+import sys
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, Any, Callable, Optional
+
+try:
+    from pipeline_metrics import pipeline_metrics
+except ImportError:
+    from backend.pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+BREAKER_FAILURES = int(os.environ.get('BREAKER_FAILURES', '5'))
+BREAKER_SLOW_SECONDS = float(os.environ.get('BREAKER_SLOW_SECONDS', '20'))
+BREAKER_SLOW_RATE = float(os.environ.get('BREAKER_SLOW_RATE', '0.5'))
+BREAKER_WINDOW = int(os.environ.get('BREAKER_WINDOW', '20'))
+BREAKER_RESET_SECONDS = float(os.environ.get('BREAKER_RESET_SECONDS', '30'))
+
+HEDGE_ENABLED = os.environ.get('OCR_HEDGE', 'false').lower() == 'true'
+HEDGE_MIN_SECONDS = float(os.environ.get('OCR_HEDGE_MIN_SECONDS', '2'))
+HEDGE_MIN_SAMPLES = 20     # p95 is meaningless before this many calls
+HEDGE_BUDGET = float(os.environ.get('OCR_HEDGE_BUDGET', '0.1'))
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+# Every breaker registers itself here so /stats can report them all
+_breakers: Dict[str, 'CircuitBreaker'] = {}
+
+# Calls that may be hedged run here so the caller can stop waiting at the deadline
+_call_pool = ThreadPoolExecutor(max_workers=int(os.environ.get('OCR_CALL_WORKERS', '8')),
+                                thread_name_prefix='ocr-call')
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a backend whose breaker is open"""
+
+
+class DeadlineExceeded(TimeoutError):
+    """No answer (primary or hedge) before the per-call deadline"""
+
+
+def is_backend_failure(error: Exception) -> bool:
+    """Whether an error says the backend is unhealthy (rather than the request being bad)"""
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    requests = sys.modules.get('requests')  # a requests error implies it is loaded
+    if requests is not None and isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # google.api_core errors carry the HTTP status in .code, requests' HTTPError on .response
+    status = getattr(error, 'code', None)
+    if not isinstance(status, int):
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class CircuitBreaker:
+    """Consecutive-failure and slow-call-rate breaker with a half-open trial"""
+
+    def __init__(self, name: str, failure_threshold: int = None, slow_call_seconds: float = None,
+                 slow_call_rate: float = None, window: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or BREAKER_FAILURES
+        self.slow_call_seconds = slow_call_seconds or BREAKER_SLOW_SECONDS
+        self.slow_call_rate = slow_call_rate or BREAKER_SLOW_RATE
+        self.reset_timeout = reset_timeout or BREAKER_RESET_SECONDS
+        self.lock = threading.Lock()
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.recent_slow = deque(maxlen=window or BREAKER_WINDOW)
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.last_trip_reason = None
+        _breakers[name] = self
+        self._publish()
+
+    def allow(self):
+        """Raise CircuitOpenError unless a call may go through now"""
+        with self.lock:
+            if self.state == OPEN and time.time() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self.trial_in_flight = False
+                self._publish()
+            if self.state == CLOSED:
+                return
+            if self.state == HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return
+        pipeline_metrics.increment(f"breaker.{self.name}.rejected")
+        raise CircuitOpenError(f"{self.name} circuit open ({self.last_trip_reason})")
+
+    def record_success(self, seconds: float):
+        with self.lock:
+            slow = seconds > self.slow_call_seconds
+            self.recent_slow.append(slow)
+            self.consecutive_failures = 0
+            if self.state == HALF_OPEN:
+                if slow:
+                    self._trip(f"trial call took {seconds:.1f}s")
+                else:
+                    self.state = CLOSED
+                    self.recent_slow.clear()
+                    logger.info(f"Circuit {self.name} closed")
+                    self._publish()
+            elif self._too_slow():
+                self._trip(f"{sum(self.recent_slow)}/{len(self.recent_slow)} calls over {self.slow_call_seconds:.0f}s")
+
+    def record_failure(self, error: Exception):
+        """Count a backend failure; client errors are not counted"""
+        with self.lock:
+            if not is_backend_failure(error):
+                # The backend answered; a half-open trial that got this far frees the slot
+                self.trial_in_flight = False
+                return
+            self.consecutive_failures += 1
+            self.recent_slow.append(isinstance(error, TimeoutError))
+            if self.state == HALF_OPEN:
+                self._trip(f"trial call failed: {error}")
+            elif self.consecutive_failures >= self.failure_threshold:
+                self._trip(f"{self.consecutive_failures} consecutive failures, last: {error}")
+            elif self._too_slow():
+                self._trip(f"{sum(self.recent_slow)}/{len(self.recent_slow)} calls slow or timed out")
+
+    def _too_slow(self) -> bool:
+        # Needs a full window so a couple of early slow calls cannot trip it
+        return (len(self.recent_slow) == self.recent_slow.maxlen
+                and sum(self.recent_slow) >= self.slow_call_rate * len(self.recent_slow))
+
+    def _trip(self, reason: str):
+        # Caller holds self.lock
+        self.state = OPEN
+        self.opened_at = time.time()
+        self.trial_in_flight = False
+        self.last_trip_reason = reason
+        pipeline_metrics.increment(f"breaker.{self.name}.trips")
+        logger.warning(f"Circuit {self.name} opened: {reason}")
+        self._publish()
+
+    def _publish(self):
+        pipeline_metrics.set_gauge(f"breaker.{self.name}.state", self.state)
+
+    def status(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.consecutive_failures,
+                'slow_calls': sum(self.recent_slow),
+                'window': len(self.recent_slow),
+                'last_trip_reason': self.last_trip_reason,
+                'retry_in_seconds': (round(max(0.0, self.reset_timeout - (time.time() - self.opened_at)), 1)
+                                     if self.state == OPEN else 0.0)
+            }
+
+
+def breaker_status() -> Dict[str, Dict[str, Any]]:
+    """State of every registered breaker"""
+    return {name: breaker.status() for name, breaker in _breakers.items()}
+
+
+def hedge_delay(timing_name: str) -> Optional[float]:
+    """Seconds to wait before hedging, or None when hedging is off or uncalibrated"""
+    if not HEDGE_ENABLED:
+        return None
+    if pipeline_metrics.timing_count(timing_name) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(HEDGE_MIN_SECONDS, pipeline_metrics.percentile(timing_name, 95))
+
+
+def call_with_resilience(name: str, fn: Callable[[], Any], breaker: CircuitBreaker,
+                         deadline: float, timing_name: str) -> Any:
+    """Run fn through the breaker, enforcing the deadline and hedging after p95
+
+    fn must be safe to call twice concurrently (an idempotent read such as an
+    OCR request) and should itself honour the deadline so abandoned calls end.
+    """
+    breaker.allow()
+    pipeline_metrics.increment(f"{name}.calls")
+    start = time.time()
+    delay = hedge_delay(timing_name)
+
+    try:
+        if delay is None or delay >= deadline:
+            result = fn()
+        else:
+            result = _hedged(name, fn, deadline, delay)
+    except Exception as e:
+        if time.time() - start >= deadline and not isinstance(e, TimeoutError):
+            # Client-side deadline errors (e.g. gRPC DEADLINE_EXCEEDED) count as timeouts
+            timeout = DeadlineExceeded(f"{name} exceeded {deadline:g}s deadline: {e}")
+            breaker.record_failure(timeout)
+            raise timeout from e
+        breaker.record_failure(e)
+        raise
+
+    elapsed = time.time() - start
+    pipeline_metrics.observe(timing_name, elapsed)
+    breaker.record_success(elapsed)
+    return result
+
+
+def _hedged(name: str, fn: Callable[[], Any], deadline: float, delay: float) -> Any:
+    start = time.time()
+    futures = [_call_pool.submit(fn)]
+    done, _ = wait(futures, timeout=delay)
+
+    if not done:
+        if pipeline_metrics.counter(f"{name}.hedges") < HEDGE_BUDGET * pipeline_metrics.counter(f"{name}.calls"):
+            pipeline_metrics.increment(f"{name}.hedges")
+            futures.append(_call_pool.submit(fn))
+        else:
+            pipeline_metrics.increment(f"{name}.hedges_skipped")
+
+    # Return the first success; a failed primary still leaves the hedge a chance
+    pending = set(futures)
+    last_error = None
+    while pending:
+        remaining = deadline - (time.time() - start)
+        if remaining <= 0:
+            break
+        done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            if len(futures) > 1 and future is futures[1]:
+                pipeline_metrics.increment(f"{name}.hedge_wins")
+            return result
+
+    if pending:
+        raise DeadlineExceeded(f"{name} gave no answer within {deadline:g}s")
+    raise last_error
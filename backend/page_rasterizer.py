@@ -0,0 +1,205 @@
+"""
+PDF Page Rasterizer
+Renders PDF pages to numpy arrays with PyMuPDF and caches them per upload
+content hash, so image-based OCR engines and previews share one render.
+The JO template analysis tools use the same cache for template pages
+(render_template) and for parsed page text (page_text).
+
+Arrays are built directly on the pixmap sample buffer (no copy) and are
+returned read-only because they are shared through the cache; copy before
+modifying in place. Each array holds a reference to its pixmap, so it stays
+valid after the cache evicts the page (or never caches it).
+"""
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple
+
+# PyMuPDF and NumPy are imported on first render, so importing this module
+# (every OCR path does) stays cheap for processes that never rasterize
+
+DEFAULT_RASTER_DPI = int(os.environ.get('RASTER_DPI', '200'))
+RASTER_CACHE_MB = int(os.environ.get('RASTER_CACHE_MB', '256'))
+TEXT_CACHE_ENTRIES = 64
+
+
+class _PixmapSamples:
+    """Array interface over a pixmap's samples that keeps the pixmap alive
+
+    np.frombuffer(pix.samples_mv) does not reference the pixmap, so the view
+    would dangle once the pixmap is freed; arrays built on this object have it
+    as their base instead.
+    """
+
+    def __init__(self, pix: 'fitz.Pixmap', view: 'np.ndarray'):
+        self.pixmap = pix
+        self.__array_interface__ = dict(view.__array_interface__)
+
+
+def pixmap_to_array(pix: 'fitz.Pixmap') -> 'np.ndarray':
+    """View a pixmap's samples as an (h, w) or (h, w, n) uint8 array without copying"""
+    import numpy as np
+    buffer = pix.samples_mv if hasattr(pix, 'samples_mv') else pix.samples
+    array = np.frombuffer(buffer, dtype=np.uint8)
+    if pix.stride != pix.width * pix.n:
+        # Rows are padded; expose the visible width through a strided view
+        array = np.lib.stride_tricks.as_strided(
+            array, shape=(pix.height, pix.width, pix.n), strides=(pix.stride, pix.n, 1)
+        )
+    else:
+        array = array.reshape(pix.height, pix.width, pix.n)
+    if pix.n == 1:
+        array = array[:, :, 0]
+    array = np.asarray(_PixmapSamples(pix, array))
+    array.flags.writeable = False
+    return array
+
+
+class PageRasterizer:
+    """Byte-bounded LRU cache of rendered PDF pages keyed by content hash"""
+
+    def __init__(self, max_bytes: int = None, default_dpi: int = None):
+        self.max_bytes = max_bytes if max_bytes is not None else RASTER_CACHE_MB * 1024 * 1024
+        self.default_dpi = default_dpi or DEFAULT_RASTER_DPI
+        self.lock = threading.Lock()
+        # key -> array (the array references the pixmap that owns its memory)
+        self.pages: 'OrderedDict[Tuple, Any]' = OrderedDict()
+        self.page_counts: Dict[str, int] = {}
+        self.hashes: Dict[Tuple, str] = {}
+        self.texts: 'OrderedDict[Tuple, Any]' = OrderedDict()
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def document_hash(self, file_path: str) -> str:
+        """SHA-256 of the file contents, memoized on (path, size, mtime)"""
+        stat = os.stat(file_path)
+        stat_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            cached = self.hashes.get(stat_key)
+        if cached:
+            return cached
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        content_hash = digest.hexdigest()
+        with self.lock:
+            self.hashes[stat_key] = content_hash
+        return content_hash
+
+    def page_count(self, file_path: str) -> int:
+        content_hash = self.document_hash(file_path)
+        with self.lock:
+            if content_hash in self.page_counts:
+                return self.page_counts[content_hash]
+        import fitz  # PyMuPDF
+        with fitz.open(file_path) as doc:
+            count = doc.page_count
+        with self.lock:
+            self.page_counts[content_hash] = count
+        return count
+
+    def render_page(self, file_path: str, page_number: int, dpi: int = None,
+                    grayscale: bool = True) -> 'np.ndarray':
+        """One page as uint8 (h, w) grayscale or (h, w, 3) RGB"""
+        return self.render_document(file_path, dpi, grayscale, pages=[page_number])[0]
+
+    def render_document(self, file_path: str, dpi: int = None, grayscale: bool = True,
+                        pages: List[int] = None) -> 'List[np.ndarray]':
+        """Render the requested pages (default: all), reusing cached rasters"""
+        dpi = dpi or self.default_dpi
+        content_hash = self.document_hash(file_path)
+        if pages is None:
+            pages = list(range(self.page_count(file_path)))
+
+        results: Dict[int, Any] = {}
+        missing = []
+        with self.lock:
+            for page_number in pages:
+                key = (content_hash, page_number, dpi, grayscale)
+                entry = self.pages.get(key)
+                if entry is not None:
+                    self.pages.move_to_end(key)
+                    results[page_number] = entry
+                    self.hits += 1
+                else:
+                    missing.append(page_number)
+                    self.misses += 1
+
+        if missing:
+            import fitz  # PyMuPDF
+            colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+            with fitz.open(file_path) as doc:
+                for page_number in missing:
+                    pix = doc[page_number].get_pixmap(dpi=dpi, colorspace=colorspace, alpha=False)
+                    array = pixmap_to_array(pix)
+                    results[page_number] = array
+                    self._store((content_hash, page_number, dpi, grayscale), array)
+
+        return [results[page_number] for page_number in pages]
+
+    def render_template(self, file_path: str, page_number: int = 0, scale: float = 3.0,
+                        grayscale: bool = True) -> 'np.ndarray':
+        """Template page at a zoom factor (scale 3.0 == fitz.Matrix(3, 3) == 216 dpi)
+
+        Cached per file content, so every analyzer working on the same template
+        revision shares one render; editing the template invalidates it.
+        """
+        return self.render_page(file_path, page_number, dpi=int(round(72 * scale)), grayscale=grayscale)
+
+    def page_text(self, file_path: str, page_number: int = 0, kind: str = 'dict') -> Any:
+        """page.get_text(kind) parsed once per file content and page
+
+        Callers share the returned structure and must not modify it.
+        """
+        key = (self.document_hash(file_path), page_number, kind)
+        with self.lock:
+            cached = self.texts.get(key)
+            if cached is not None:
+                self.texts.move_to_end(key)
+                return cached
+        import fitz  # PyMuPDF
+        with fitz.open(file_path) as doc:
+            text = doc[page_number].get_text(kind)
+        with self.lock:
+            self.texts[key] = text
+            while len(self.texts) > TEXT_CACHE_ENTRIES:
+                self.texts.popitem(last=False)
+        return text
+
+    def _store(self, key: Tuple, array: 'np.ndarray'):
+        size = array.nbytes
+        with self.lock:
+            if size > self.max_bytes or key in self.pages:
+                return
+            self.pages[key] = array
+            self.cached_bytes += size
+            while self.cached_bytes > self.max_bytes:
+                _, evicted = self.pages.popitem(last=False)
+                self.cached_bytes -= evicted.nbytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'cached_pages': len(self.pages),
+                'cached_texts': len(self.texts),
+                'cached_mb': round(self.cached_bytes / (1024 * 1024), 1),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+# Shared instance used across the backend modules
+page_rasterizer = PageRasterizer()
+
+
+def cached_page_text(page: 'fitz.Page', kind: str = 'dict') -> Any:
+    """page.get_text(kind) through the shared cache when the page comes from a file on disk"""
+    path = page.parent.name
+    if path and os.path.isfile(path):
+        return page_rasterizer.page_text(path, page.number, kind)
+    return page.get_text(kind)
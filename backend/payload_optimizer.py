@@ -0,0 +1,150 @@
+"""
+Upload Payload Optimizer
+Shrinks documents before they are sent to cloud OCR: images are EXIF-rotated,
+capped at an OCR-sufficient resolution, converted to grayscale and re-encoded
+(1-bit PNG for bilevel scans, tuned JPEG otherwise). Oversized images embedded
+in PDFs are downscaled and recompressed in place.
+
+The optimized payload is only used when it is actually smaller.
+"""
+
+import io
+import os
+import time
+import logging
+from typing import Dict, Any, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    from pipeline_metrics import pipeline_metrics
+except ImportError:
+    from backend.pipeline_metrics import pipeline_metrics
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_OPTIMIZE = os.environ.get('PAYLOAD_OPTIMIZE', 'true').lower() == 'true'
+TARGET_DPI = int(os.environ.get('PAYLOAD_TARGET_DPI', '300'))
+JPEG_QUALITY = int(os.environ.get('PAYLOAD_JPEG_QUALITY', '80'))
+PDF_IMAGE_THRESHOLD = int(os.environ.get('PAYLOAD_PDF_IMAGE_KB', '300')) * 1024
+PAGE_LONG_SIDE_INCHES = 11.69  # A4; photos carry no trustworthy DPI, so size against the page
+BILEVEL_FRACTION = 0.97        # share of pixels near black/white for a page to count as bilevel
+
+
+def is_bilevel(gray: Image.Image) -> bool:
+    """True when almost every pixel is near black or near white"""
+    hist = np.asarray(gray.histogram(), dtype=np.int64)
+    extremes = hist[:32].sum() + hist[224:].sum()
+    return extremes >= BILEVEL_FRACTION * hist.sum()
+
+
+def shrink_image(image: Image.Image, max_long_side: int) -> Tuple[Image.Image, str]:
+    """Rotate, downscale and recode one image; returns (image, 'PNG' | 'JPEG')"""
+    image = ImageOps.exif_transpose(image)
+    gray = image.convert('L')
+
+    long_side = max(gray.size)
+    if long_side > max_long_side:
+        scale = max_long_side / long_side
+        # reduce() does the bulk by an integer factor cheaply, resize() finishes exactly
+        factor = int(1 / scale)
+        if factor >= 2:
+            gray = gray.reduce(factor)
+        new_size = (round(image.size[0] * scale), round(image.size[1] * scale))
+        gray = gray.resize(new_size, Image.LANCZOS)
+
+    if is_bilevel(gray):
+        return gray.point(lambda value: 255 if value > 127 else 0).convert('1'), 'PNG'
+    return gray, 'JPEG'
+
+
+def encode_image(image: Image.Image, fmt: str) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == 'PNG':
+        image.save(buffer, format='PNG', optimize=True)
+    else:
+        image.save(buffer, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+def optimize_image(content: bytes, target_dpi: int = TARGET_DPI) -> Tuple[bytes, str]:
+    image, fmt = shrink_image(Image.open(io.BytesIO(content)), int(target_dpi * PAGE_LONG_SIDE_INCHES))
+    return encode_image(image, fmt), 'image/png' if fmt == 'PNG' else 'image/jpeg'
+
+
+def optimize_pdf(content: bytes, target_dpi: int = TARGET_DPI) -> Tuple[bytes, int]:
+    """Downscale/recompress embedded images above the size threshold; returns (pdf, images_replaced)"""
+    import fitz  # PyMuPDF
+
+    replaced = 0
+    with fitz.open(stream=content, filetype='pdf') as doc:
+        seen = set()
+        for page in doc:
+            for image_info in page.get_images(full=True):
+                xref = image_info[0]
+                if xref in seen:
+                    continue
+                seen.add(xref)
+
+                raw = doc.extract_image(xref)
+                if not raw or len(raw['image']) < PDF_IMAGE_THRESHOLD:
+                    continue
+                if image_info[1]:
+                    continue  # soft-masked images would lose their transparency
+
+                # Cap pixels at target_dpi over the size the image is drawn at on the page
+                rects = page.get_image_rects(xref)
+                drawn_inches = (max(rects[0].width, rects[0].height) / 72.0) if rects else PAGE_LONG_SIDE_INCHES
+                max_long_side = max(int(target_dpi * drawn_inches), 256)
+
+                try:
+                    image, fmt = shrink_image(Image.open(io.BytesIO(raw['image'])), max_long_side)
+                except Exception:
+                    continue  # formats PIL cannot decode (JBIG2, CCITT) are left untouched
+                if fmt == 'PNG':
+                    image = image.convert('L')  # PyMuPDF does not insert 1-bit PNGs reliably
+                encoded = encode_image(image, fmt)
+                if len(encoded) < len(raw['image']):
+                    page.replace_image(xref, stream=encoded)
+                    replaced += 1
+
+        if not replaced:
+            return content, 0
+        return doc.tobytes(garbage=3, deflate=True), replaced
+
+
+def optimize_payload(content: bytes, mime_type: str) -> Tuple[bytes, str, Dict[str, Any]]:
+    """Return the smallest of (optimized, original) plus a report of what happened"""
+    start = time.perf_counter()
+    info: Dict[str, Any] = {'bytes_in': len(content), 'optimized': False}
+
+    if PAYLOAD_OPTIMIZE:
+        try:
+            if mime_type in ('image/jpeg', 'image/png'):
+                optimized, optimized_mime = optimize_image(content)
+            elif mime_type == 'application/pdf':
+                optimized, info['pdf_images_replaced'] = optimize_pdf(content)
+                optimized_mime = mime_type
+            else:
+                optimized, optimized_mime = content, mime_type
+
+            if len(optimized) < len(content):
+                content, mime_type = optimized, optimized_mime
+                info['optimized'] = True
+        except Exception as e:
+            logger.warning(f"Payload optimization skipped: {e}")
+
+    elapsed = time.perf_counter() - start
+    info.update({
+        'bytes_out': len(content),
+        'bytes_saved': info['bytes_in'] - len(content),
+        'mime_type': mime_type,
+        'optimize_seconds': round(elapsed, 4)
+    })
+
+    pipeline_metrics.increment('payload.documents')
+    pipeline_metrics.increment('payload.bytes_in', info['bytes_in'])
+    pipeline_metrics.increment('payload.bytes_out', info['bytes_out'])
+    pipeline_metrics.observe('payload.optimize_seconds', elapsed)
+    return content, mime_type, info
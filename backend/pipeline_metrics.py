@@ -0,0 +1,92 @@
+"""
+Pipeline Metrics
+Thread-safe counters, gauges and timings for the OCR pipeline.
+Exposed through the /stats endpoint and written to JSON by background daemons.
+"""
+
+import os
+import json
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any
+
+
+class PipelineMetrics:
+    """Process-wide metrics registry"""
+
+    def __init__(self, window: int = 500):
+        self.lock = threading.Lock()
+        self.window = window
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, Any] = {}
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def increment(self, name: str, value: float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: Any):
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """Record a duration; keeps totals plus a recent window for percentiles"""
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = {'count': 0, 'total': 0.0, 'max': 0.0, 'recent': deque(maxlen=self.window)}
+                self.timings[name] = timing
+            timing['count'] += 1
+            timing['total'] += seconds
+            timing['max'] = max(timing['max'], seconds)
+            timing['recent'].append(seconds)
+
+    def percentile(self, name: str, pct: float) -> float:
+        """Percentile over the recent window (0.0 if nothing recorded yet)"""
+        with self.lock:
+            timing = self.timings.get(name)
+            recent = sorted(timing['recent']) if timing else []
+        if not recent:
+            return 0.0
+        index = min(len(recent) - 1, int(round(pct / 100.0 * (len(recent) - 1))))
+        return recent[index]
+
+    def counter(self, name: str) -> float:
+        with self.lock:
+            return self.counters.get(name, 0)
+
+    def timing_count(self, name: str) -> int:
+        with self.lock:
+            timing = self.timings.get(name)
+            return timing['count'] if timing else 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            timings = {}
+            for name, timing in self.timings.items():
+                recent = sorted(timing['recent'])
+                timings[name] = {
+                    'count': timing['count'],
+                    'avg': round(timing['total'] / timing['count'], 4) if timing['count'] else 0.0,
+                    'max': round(timing['max'], 4),
+                    'p50': round(recent[len(recent) // 2], 4) if recent else 0.0,
+                    'p95': round(recent[min(len(recent) - 1, int(len(recent) * 0.95))], 4) if recent else 0.0
+                }
+            return {
+                'counters': dict(self.counters),
+                'gauges': dict(self.gauges),
+                'timings': timings,
+                'generated_at': datetime.now().isoformat()
+            }
+
+    def write_json(self, path: str):
+        """Atomically write a snapshot so readers never see a partial file"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+# Shared instance used across the backend modules
+pipeline_metrics = PipelineMetrics()
@@ -3,11 +3,15 @@ Precise Coordinate Mapper
 Maps exact field positions by analyzing the original template structure
 """
 
-import fitz  # PyMuPDF
 import json
 import os
 from typing import Dict, List, Tuple, Any
 
+try:
+    from template_layout_model import template_layout
+except ImportError:
+    from backend.template_layout_model import template_layout
+
 class PreciseCoordinateMapper:
     """Map precise coordinates by analyzing template structure"""
     
@@ -23,14 +27,8 @@ class PreciseCoordinateMapper:
             print(f"Template not found: {self.door_template}")
             return None
         
-        # Open template
-        doc = fitz.open(self.door_template)
-        page = doc[0]
-        
-        # Get page dimensions
-        rect = page.rect
-        page_width = rect.width  # ~595 points
-        page_height = rect.height  # ~842 points
+        # Page dimensions from the shared template layout model
+        page_width, page_height = template_layout(self.door_template).pages[0].size  # ~842 x 595 points
         
         print(f"Page size: {page_width} x {page_height} points")
         
@@ -177,8 +175,6 @@ class PreciseCoordinateMapper:
             }
         }
         
-        doc.close()
-        
         return coordinates
     
     def save_precise_specs(self):
@@ -6,9 +6,14 @@ Uses extracted coordinates for pixel-perfect positioning
 import fitz  # PyMuPDF
 import json
 import os
-from datetime import datetime
 from typing import Dict, Any
 
+try:
+    from storage_layout import storage_for
+except ImportError:
+    from backend.storage_layout import storage_for
+
+
 class PreciseTemplateOverlay:
     """Overlay data on original templates with pixel-perfect positioning"""
     
@@ -74,9 +79,8 @@ class PreciseTemplateOverlay:
             raise ValueError(f"No specification found for template: {template_type}")
         
         # Generate output filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_filename = f"JO_PRECISE_{template_type.upper()}_{timestamp}.pdf"
-        output_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'job_orders', output_filename)
+        output_path = storage_for(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'job_orders')).new_path(
+            f"JO_PRECISE_{template_type.upper()}", 'pdf')
         
         # Create precise overlay
         self.create_precise_overlay(template_path, self.specs[template_type], validated_data, output_path)
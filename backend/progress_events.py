@@ -0,0 +1,173 @@
+"""
+Upload Progress Events
+Per-job stage transitions (saved, classified, OCR started/finished, extracted,
+session created) published by the upload pipeline and streamed to clients as
+server-sent events.
+
+Events are appended to a small JSONL file per job under a shared directory so
+a stream served by one gunicorn worker can follow a job running in another.
+Within one process a Condition wakes streams immediately on publish.
+
+A stream holds a request thread, and a gthread worker has only a few, so
+streams are bounded: at most MAX_STREAMS per process follow a job live (the
+rest get the events so far and reconnect after a few seconds, i.e. poll), a
+live stream ends after PROGRESS_STREAM_SECONDS (EventSource resumes it with
+Last-Event-ID), and a stream for a job with no events file ends after
+PROGRESS_STREAM_GRACE_SECONDS.
+"""
+
+import os
+import re
+import json
+import time
+import logging
+import threading
+from typing import Dict, Any, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STAGES = ('session_created', 'failed')
+JOB_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{8,64}$')
+
+STREAM_SECONDS = float(os.environ.get('PROGRESS_STREAM_SECONDS', '60'))
+STREAM_GRACE_SECONDS = float(os.environ.get('PROGRESS_STREAM_GRACE_SECONDS', '12'))
+# Per process; keep it below the worker's thread count so other routes always get a thread
+MAX_STREAMS = int(os.environ.get('PROGRESS_MAX_STREAMS', '1'))
+POLL_RETRY_MS = 3000   # reconnect delay for clients turned away from a live stream
+
+
+class ProgressTracker:
+    """Publishes and streams progress events for upload jobs"""
+
+    def __init__(self, events_dir: str = None, ttl_seconds: int = 3600, max_streams: int = MAX_STREAMS):
+        self.events_dir = events_dir or os.environ.get('PROGRESS_EVENTS_DIR', os.path.join('temp', 'progress'))
+        self.ttl_seconds = ttl_seconds
+        self.condition = threading.Condition()
+        self.stream_slots = threading.BoundedSemaphore(max_streams)
+        self.started: Dict[str, float] = {}
+        os.makedirs(self.events_dir, exist_ok=True)
+
+    @staticmethod
+    def is_valid_job_id(job_id: str) -> bool:
+        return bool(job_id) and bool(JOB_ID_PATTERN.match(job_id))
+
+    def _events_path(self, job_id: str) -> str:
+        return os.path.join(self.events_dir, f"{job_id}.jsonl")
+
+    def start(self, job_id: str):
+        """Register a job; its clock is the reference for the elapsed times in events"""
+        with self.condition:
+            self.started[job_id] = time.time()
+        open(self._events_path(job_id), 'a').close()
+
+    def publish(self, job_id: str, stage: str, **details):
+        """Record a stage transition and wake any local streams"""
+        if not job_id:
+            return
+        now = time.time()
+        with self.condition:
+            started = self.started.setdefault(job_id, now)
+            event = {
+                'stage': stage,
+                'elapsed': round(now - started, 3),
+                'timestamp': now,
+                **details
+            }
+            with open(self._events_path(job_id), 'a', encoding='utf-8') as f:
+                f.write(json.dumps(event, default=str) + '\n')
+            if stage in TERMINAL_STAGES:
+                self.started.pop(job_id, None)
+            self.condition.notify_all()
+
+        logger.info(f"Job {job_id}: {stage} at +{event['elapsed']:.2f}s")
+
+    def reporter(self, job_id: str):
+        """Callback for code that reports progress as stage(**details)"""
+        def report(stage: str, **details):
+            self.publish(job_id, stage, **details)
+        return report
+
+    def events(self, job_id: str, start: int = 0) -> List[Dict[str, Any]]:
+        """Events recorded for a job, starting at index `start`"""
+        try:
+            with open(self._events_path(job_id), 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        events = []
+        for line in lines[start:]:
+            # A concurrent writer may leave a partial last line; it is picked up next read
+            if not line.endswith('\n'):
+                break
+            events.append(json.loads(line))
+        return events
+
+    def exists(self, job_id: str) -> bool:
+        return os.path.exists(self._events_path(job_id))
+
+    @staticmethod
+    def _frame(index: int, event: Dict[str, Any]) -> str:
+        return f"id: {index}\nevent: {event['stage']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    def stream(self, job_id: str, last_event_id: int = -1, max_seconds: float = STREAM_SECONDS,
+               keepalive_seconds: float = 15, poll_seconds: float = 0.25,
+               grace_seconds: float = STREAM_GRACE_SECONDS) -> Iterator[str]:
+        """Yield SSE frames for a job until a terminal stage, max_seconds, or grace_seconds without a job"""
+        next_index = last_event_id + 1
+
+        # Slot taken inside the generator so the finally below always releases it
+        if not self.stream_slots.acquire(blocking=False):
+            yield f"retry: {POLL_RETRY_MS}\n\n"
+            for event in self.events(job_id, next_index):
+                yield self._frame(next_index, event)
+                next_index += 1
+            return
+
+        try:
+            start = time.time()
+            deadline = start + max_seconds
+            last_sent = start
+
+            yield 'retry: 2000\n\n'
+
+            while time.time() < deadline:
+                events = self.events(job_id, next_index)
+                for event in events:
+                    yield self._frame(next_index, event)
+                    next_index += 1
+                    last_sent = time.time()
+                    if event['stage'] in TERMINAL_STAGES:
+                        return
+
+                if not events and time.time() - start >= grace_seconds and not self.exists(job_id):
+                    # Never started here (or already cleaned up): end it instead of holding the thread
+                    yield f"event: failed\ndata: {json.dumps({'stage': 'failed', 'error': 'Unknown job'})}\n\n"
+                    return
+
+                if time.time() - last_sent >= keepalive_seconds:
+                    yield ': keepalive\n\n'
+                    last_sent = time.time()
+
+                # Local publishes wake us at once; other workers' events are seen on the next poll
+                with self.condition:
+                    self.condition.wait(poll_seconds)
+        finally:
+            self.stream_slots.release()
+
+    def cleanup(self, max_age_seconds: Optional[int] = None) -> int:
+        """Remove event files older than the TTL"""
+        cutoff = time.time() - (max_age_seconds or self.ttl_seconds)
+        removed = 0
+        for name in os.listdir(self.events_dir):
+            path = os.path.join(self.events_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+
+# Shared instance used by the web apps
+progress_tracker = ProgressTracker()
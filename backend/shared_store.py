@@ -0,0 +1,150 @@
+"""
+Shared Store
+Small key/value store shared by all gunicorn workers, used for cross-worker
+coordination (in-flight markers, short-lived results).
+
+Uses Redis when REDIS_URL is set and the redis package is installed;
+otherwise one JSON file per key under SHARED_STORE_DIR (default
+temp/shared), which works for workers on the same host.
+"""
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: no gunicorn, so one process; the thread lock is enough
+
+logger = logging.getLogger(__name__)
+
+REDIS_URL = os.environ.get('REDIS_URL')
+SHARED_STORE_DIR = os.environ.get('SHARED_STORE_DIR', os.path.join('temp', 'shared'))
+
+
+class FileStore:
+    """Per-key JSON files with expiry
+
+    Files are written to a temp file and renamed into place, so readers never
+    see a partial record. add() and cleanup() check and replace under an
+    exclusive flock on the store's lock file, so only one process can claim an
+    absent or expired key.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = directory or SHARED_STORE_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self.lock_path = os.path.join(self.directory, '.lock')
+        self.thread_lock = threading.Lock()
+
+    @contextmanager
+    def _locked(self):
+        with self.thread_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(self.lock_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.json')
+
+    def _read(self, path: str) -> Optional[dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if record.get('expires', 0) < time.time():
+            return None
+        return record
+
+    def get(self, key: str) -> Any:
+        record = self._read(self._path(key))
+        return record['value'] if record else None
+
+    def _write(self, key: str, value: Any, ttl: float):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'value': value, 'expires': time.time() + ttl}, f, default=str)
+        os.replace(tmp_path, path)
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._write(key, value, ttl)
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        """Set only if the key is absent (or expired); True when this call set it"""
+        with self._locked():
+            # An expired marker (e.g. left by a crashed owner) is replaced like an absent one
+            if self._read(self._path(key)) is not None:
+                return False
+            self._write(key, value, ttl)
+            return True
+
+    def delete(self, key: str):
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def cleanup(self):
+        """Remove expired keys (locked, so a key re-claimed by add() meanwhile survives)"""
+        with self._locked():
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if name.endswith('.json') and self._read(path) is None:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+class RedisStore:
+    """Same interface on top of Redis (values stored as JSON)"""
+
+    def __init__(self, url: str):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Any:
+        raw = self.client.get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value: Any, ttl: float):
+        self.client.set(key, json.dumps(value, default=str), px=int(ttl * 1000))
+
+    def add(self, key: str, value: Any, ttl: float) -> bool:
+        return bool(self.client.set(key, json.dumps(value, default=str), px=int(ttl * 1000), nx=True))
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def cleanup(self):
+        pass  # Redis expires keys itself
+
+
+def create_shared_store():
+    if REDIS_URL:
+        try:
+            store = RedisStore(REDIS_URL)
+            store.client.ping()
+            logger.info("Shared store: Redis")
+            return store
+        except Exception as e:
+            logger.warning(f"Redis unavailable ({e}), using file store")
+    return FileStore()
+
+
+# Shared instance used across the backend modules
+shared_store = create_shared_store()
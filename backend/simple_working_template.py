@@ -5,10 +5,15 @@ Clean, functional template that actually works
 
 import os
 import subprocess
-from datetime import datetime
 from typing import Dict, Any
 import re
 
+try:
+    from storage_layout import storage_for
+except ImportError:
+    from backend.storage_layout import storage_for
+
+
 class SimpleWorkingTemplate:
     """Generate a simple, clean template that actually works"""
     
@@ -19,9 +24,9 @@ class SimpleWorkingTemplate:
     def generate_working_jo(self, validated_data: Dict[str, Any]) -> str:
         """Generate working JO that actually displays correctly"""
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        html_filename = f"JO_WORKING_{timestamp}.html"
-        html_path = os.path.join(self.output_dir, html_filename)
+        # Unique sharded path: JOs rendered in the same second no longer overwrite each other
+        html_path = storage_for(self.output_dir).new_path('JO_WORKING', 'html')
+        html_filename = os.path.basename(html_path)
         
         # Generate HTML content
         html_content = self.create_working_template(validated_data)
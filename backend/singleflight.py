@@ -0,0 +1,148 @@
+"""
+Singleflight
+Coalesces concurrent identical work so it runs once. Used for OCR, keyed by
+upload content hash: a double-clicked upload, or two people uploading the same
+PDF at once, share a single Document AI call.
+
+Within a worker, callers with the same key wait on one Future. Across workers,
+an in-flight marker in the shared store elects one leader; other workers
+poll the store for the leader's result, and run the work themselves if the
+leader disappears without publishing one.
+
+This is coalescing, not caching: results are kept only long enough for the
+waiting callers to pick them up. Every caller receives its own copy.
+"""
+
+import os
+import copy
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Optional
+
+try:
+    from pipeline_metrics import pipeline_metrics
+    from shared_store import shared_store
+except ImportError:
+    from backend.pipeline_metrics import pipeline_metrics
+    from backend.shared_store import shared_store
+
+logger = logging.getLogger(__name__)
+
+SINGLEFLIGHT_ENABLED = os.environ.get('SINGLEFLIGHT_ENABLED', 'true').lower() == 'true'
+INFLIGHT_TTL = float(os.environ.get('SINGLEFLIGHT_INFLIGHT_SECONDS', '120'))
+RESULT_TTL = float(os.environ.get('SINGLEFLIGHT_RESULT_SECONDS', '60'))
+POLL_SECONDS = 0.25
+
+
+def file_digest(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Run fn once per key among concurrent callers in all workers"""
+
+    def __init__(self, name: str, store=None):
+        self.name = name
+        self.store = store or shared_store
+        self.lock = threading.Lock()
+        self.in_flight: Dict[str, Future] = {}
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+    def do(self, key: str, fn: Callable[[], Any],
+           on_shared: Optional[Callable[[str], None]] = None) -> Any:
+        """Result of fn for this key; on_shared('local' | 'remote') is called for followers"""
+        if not SINGLEFLIGHT_ENABLED:
+            return fn()
+
+        with self.lock:
+            future = self.in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self.in_flight[key] = future
+
+        if not leader:
+            pipeline_metrics.increment(f"{self.name}.coalesced_local")
+            if on_shared:
+                on_shared('local')
+            return copy.deepcopy(future.result())
+
+        try:
+            result = self._run_across_workers(key, fn, on_shared)
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                self.in_flight.pop(key, None)
+        return copy.deepcopy(result)
+
+    def _run_across_workers(self, key: str, fn: Callable[[], Any],
+                            on_shared: Optional[Callable[[str], None]]) -> Any:
+        marker_key = f"{self.name}:inflight:{key}"
+        result_key = f"{self.name}:result:{key}"
+
+        try:
+            owns_marker = self.store.add(marker_key, self.owner, INFLIGHT_TTL)
+        except Exception as e:
+            logger.warning(f"Shared store unavailable, not coalescing across workers: {e}")
+            return fn()
+
+        if not owns_marker:
+            shared = self._wait_for_remote(marker_key, result_key)
+            if shared is not None:
+                pipeline_metrics.increment(f"{self.name}.coalesced_remote")
+                if on_shared:
+                    on_shared('remote')
+                return shared
+            # The other worker failed or timed out; do the work here
+            pipeline_metrics.increment(f"{self.name}.remote_abandoned")
+
+        pipeline_metrics.increment(f"{self.name}.executions")
+        try:
+            result = fn()
+            try:
+                self.store.set(result_key, result, RESULT_TTL)
+            except Exception as e:
+                logger.warning(f"Could not share {self.name} result: {e}")
+            return result
+        finally:
+            if owns_marker:
+                self.store.delete(marker_key)
+
+    def _wait_for_remote(self, marker_key: str, result_key: str) -> Any:
+        deadline = time.time() + INFLIGHT_TTL
+        while time.time() < deadline:
+            result = self.store.get(result_key)
+            if result is not None:
+                return result
+            if self.store.get(marker_key) is None:
+                # Leader finished; its result may have landed just before the marker went
+                return self.store.get(result_key)
+            time.sleep(POLL_SECONDS)
+        return None
+
+
+# Shared instance for OCR of uploaded documents
+ocr_singleflight = SingleFlight('ocr')
+
+
+def process_document_once(processor, file_path: str,
+                          progress: Optional[Callable[..., None]] = None) -> Dict[str, Any]:
+    """processor.process_document, shared with concurrent uploads of the same content"""
+    report = progress or (lambda stage, **details: None)
+    key = f"{type(processor).__name__}:{file_digest(file_path)}"
+    return ocr_singleflight.do(
+        key,
+        lambda: processor.process_document(file_path, progress=progress),
+        on_shared=lambda scope: report('coalesced', scope=scope)
+    )
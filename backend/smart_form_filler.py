@@ -7,7 +7,12 @@ import fitz  # PyMuPDF
 import json
 import os
 from typing import Dict, Any
-from datetime import datetime
+
+try:
+    from storage_layout import storage_for
+except ImportError:
+    from backend.storage_layout import storage_for
+
 
 class SmartFormFiller:
     """Smart form filling that combines template analysis with precise positioning"""
@@ -356,9 +361,8 @@ class SmartFormFiller:
         template_path = self.template_paths[template_type]
         
         # Generate output filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_filename = f"JO_SMART_{template_type.upper()}_{timestamp}.pdf"
-        output_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'job_orders', output_filename)
+        output_path = storage_for(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'job_orders')).new_path(
+            f"JO_SMART_{template_type.upper()}", 'pdf')
         
         if self.fill_smart_form(template_path, validated_data, output_path):
             return output_path
@@ -0,0 +1,220 @@
+"""
+Spatial Word Index
+Per-page index over PDF text so template learners can answer "text containing
+X", "right of this label", "same row as" and "nearest to" without rescanning
+every span of the page for every field.
+
+Geometry lives in a uniform grid of GRID_CELL-point cells (each item is filed
+under every cell its bbox touches); text lookups go through a trigram map, so
+a substring query only verifies the few items sharing all of its trigrams.
+Items keep page (document) order, so "first"/"last" match semantics of the
+old scanning code are preserved.
+
+Indexes are built once per template revision and page and cached.
+"""
+
+import math
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Tuple, Any, Callable, Optional, Iterable
+
+try:
+    from page_rasterizer import page_rasterizer, cached_page_text
+except ImportError:
+    from backend.page_rasterizer import page_rasterizer, cached_page_text
+
+GRID_CELL = 50.0        # points; a JO page is roughly 17 x 12 cells
+INDEX_CACHE_ENTRIES = 32
+
+
+class TextItem:
+    """One span or word: bbox, text, font size and page-order position"""
+
+    __slots__ = ('order', 'bbox', 'text', 'lower', 'size')
+
+    def __init__(self, order: int, bbox: Tuple[float, float, float, float], text: str, size: float = 0.0):
+        self.order = order
+        self.bbox = tuple(bbox)
+        self.text = text
+        self.lower = text.lower()
+        self.size = size
+
+    def __repr__(self):
+        return f"TextItem({self.text!r}, {tuple(round(v, 1) for v in self.bbox)})"
+
+
+def _trigrams(text: str) -> Iterable[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SpatialWordIndex:
+    """Grid + trigram index over the text items of one page"""
+
+    def __init__(self, items: List[TextItem], cell: float = GRID_CELL):
+        self.items = items
+        self.cell = cell
+        self.grid: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+        self.trigrams: Dict[str, List[int]] = defaultdict(list)
+        self.exact: Dict[str, List[int]] = defaultdict(list)
+
+        for item in items:
+            x0, y0, x1, y1 = item.bbox
+            for cx in range(int(x0 // cell), int(x1 // cell) + 1):
+                for cy in range(int(y0 // cell), int(y1 // cell) + 1):
+                    self.grid[(cx, cy)].append(item.order)
+            for gram in _trigrams(item.lower):
+                self.trigrams[gram].append(item.order)
+            self.exact[item.lower].append(item.order)
+
+        # Occupied cell range, so row queries span the page without knowing its size
+        columns = [cx for cx, _ in self.grid] or [0]
+        rows = [cy for _, cy in self.grid] or [0]
+        self.cell_bounds = (min(columns), min(rows), max(columns), max(rows))
+
+    # Construction --------------------------------------------------------
+
+    @classmethod
+    def from_text_dict(cls, text_dict: Dict[str, Any]) -> 'SpatialWordIndex':
+        """Index the stripped, non-empty spans of page.get_text('dict')"""
+        items = []
+        for block in text_dict.get('blocks', []):
+            for line in block.get('lines', []):
+                for span in line['spans']:
+                    text = span['text'].strip()
+                    if text:
+                        items.append(TextItem(len(items), span['bbox'], text, span.get('size', 0.0)))
+        return cls(items)
+
+    @classmethod
+    def from_words(cls, words: List[Tuple]) -> 'SpatialWordIndex':
+        """Index page.get_text('words') tuples (x0, y0, x1, y1, word, ...)"""
+        return cls([TextItem(i, word[:4], word[4]) for i, word in enumerate(words)])
+
+    # Text queries --------------------------------------------------------
+
+    def find_all(self, needle: str) -> List[TextItem]:
+        """Items whose text contains needle (case-insensitive), in page order"""
+        needle = needle.lower()
+        grams = _trigrams(needle)
+        if not grams:
+            return [item for item in self.items if needle in item.lower]
+        candidates = None
+        for gram in sorted(grams, key=lambda g: len(self.trigrams.get(g, ()))):
+            ids = self.trigrams.get(gram)
+            if not ids:
+                return []
+            candidates = set(ids) if candidates is None else candidates.intersection(ids)
+            if not candidates:
+                return []
+        return [self.items[i] for i in sorted(candidates) if needle in self.items[i].lower]
+
+    def find_first(self, needle: str) -> Optional[TextItem]:
+        matches = self.find_all(needle)
+        return matches[0] if matches else None
+
+    def find_within(self, haystack: str) -> List[TextItem]:
+        """Items whose whole text is a substring of haystack (e.g. 'DOOR' for 'DOOR SIZE')"""
+        haystack = haystack.lower()
+        ids = set()
+        for start in range(len(haystack)):
+            for end in range(start + 1, len(haystack) + 1):
+                ids.update(self.exact.get(haystack[start:end], ()))
+        return [self.items[i] for i in sorted(ids)]
+
+    # Geometric queries ---------------------------------------------------
+
+    def _in_cells(self, x0: float, y0: float, x1: float, y1: float) -> List[TextItem]:
+        """Items filed in the cells covering the rectangle, deduplicated, in page order"""
+        ids = set()
+        for cx in range(int(x0 // self.cell), int(x1 // self.cell) + 1):
+            for cy in range(int(y0 // self.cell), int(y1 // self.cell) + 1):
+                ids.update(self.grid.get((cx, cy), ()))
+        return [self.items[i] for i in sorted(ids)]
+
+    def in_row(self, y: float, tolerance: float) -> List[TextItem]:
+        """Items whose top edge is within tolerance of y, in page order"""
+        min_cx, _, max_cx, _ = self.cell_bounds
+        return [item for item in self._in_cells(min_cx * self.cell, y - tolerance,
+                                                 max_cx * self.cell, y + tolerance)
+                if abs(item.bbox[1] - y) < tolerance]
+
+    def right_of(self, bbox: Tuple, tolerance: float = 10.0,
+                 predicate: Callable[[TextItem], bool] = None) -> List[TextItem]:
+        """Items in the same row starting right of bbox, nearest first"""
+        items = [item for item in self.in_row(bbox[1], tolerance)
+                 if item.bbox[0] > bbox[2] and (predicate is None or predicate(item))]
+        return sorted(items, key=lambda item: (item.bbox[0] - bbox[2], item.order))
+
+    def below(self, bbox: Tuple, max_distance: float = 100.0,
+              predicate: Callable[[TextItem], bool] = None) -> List[TextItem]:
+        """Items overlapping bbox horizontally and starting below it, nearest first"""
+        items = [item for item in self._in_cells(bbox[0], bbox[3], bbox[2], bbox[3] + max_distance)
+                 if item.bbox[1] >= bbox[3] and item.bbox[1] - bbox[3] <= max_distance
+                 and item.bbox[0] < bbox[2] and item.bbox[2] > bbox[0]
+                 and (predicate is None or predicate(item))]
+        return sorted(items, key=lambda item: (item.bbox[1] - bbox[3], item.order))
+
+    def nearest(self, x: float, y: float, k: int = 1,
+                predicate: Callable[[TextItem], bool] = None) -> List[TextItem]:
+        """k items whose bbox is closest to (x, y), searching outward ring by ring"""
+        def distance(item):
+            x0, y0, x1, y1 = item.bbox
+            dx = max(x0 - x, 0.0, x - x1)
+            dy = max(y0 - y, 0.0, y - y1)
+            return math.hypot(dx, dy)
+
+        cx, cy = int(x // self.cell), int(y // self.cell)
+        min_cx, min_cy, max_cx, max_cy = self.cell_bounds
+        max_ring = max(abs(cx - min_cx), abs(cx - max_cx), abs(cy - min_cy), abs(cy - max_cy))
+        seen = set()
+        found: List[Tuple[float, int]] = []
+        for ring in range(max_ring + 1):
+            for gx in range(cx - ring, cx + ring + 1):
+                for gy in range(cy - ring, cy + ring + 1):
+                    if max(abs(gx - cx), abs(gy - cy)) != ring:
+                        continue
+                    for i in self.grid.get((gx, gy), ()):
+                        if i in seen:
+                            continue
+                        seen.add(i)
+                        item = self.items[i]
+                        if predicate is None or predicate(item):
+                            found.append((distance(item), i))
+            # Anything outside ring r is at least r cells away, so stop once k are closer than that
+            found.sort()
+            if len(found) >= k and found[k - 1][0] <= ring * self.cell:
+                break
+        return [self.items[i] for _, i in found[:k]]
+
+
+_indexes: 'OrderedDict[Tuple, SpatialWordIndex]' = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def page_index(page, kind: str = 'spans') -> SpatialWordIndex:
+    """Cached index of a fitz page: 'spans' (from get_text('dict')) or 'words'"""
+    path = page.parent.name
+    key = None
+    if path:
+        try:
+            key = (page_rasterizer.document_hash(path), page.number, kind)
+        except OSError:
+            key = None
+    if key is not None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is not None:
+                _indexes.move_to_end(key)
+                return index
+
+    if kind == 'words':
+        index = SpatialWordIndex.from_words(cached_page_text(page, 'words'))
+    else:
+        index = SpatialWordIndex.from_text_dict(cached_page_text(page, 'dict'))
+
+    if key is not None:
+        with _indexes_lock:
+            _indexes[key] = index
+            while len(_indexes) > INDEX_CACHE_ENTRIES:
+                _indexes.popitem(last=False)
+    return index
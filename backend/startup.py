@@ -0,0 +1,51 @@
+"""
+Startup Preload
+The web apps import only what every request needs; the Document AI SDK,
+PyMuPDF, NumPy/PIL and the JO generator load on first use. Under gunicorn with
+preload on (gunicorn.conf.py), the master calls preload() once before forking,
+so every worker - including the ones --max-requests recycles - starts with
+those modules already in memory and shares their pages copy-on-write.
+
+Only imports happen here. gRPC channels, HTTP sessions and thread pools are
+not fork-safe, so GoogleDocumentProcessor() and friends are still created in
+the workers.
+
+Override the module list with PRELOAD_MODULES (comma-separated).
+"""
+
+import os
+import time
+import logging
+import importlib
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+PRELOAD_MODULES = [name.strip() for name in os.environ.get('PRELOAD_MODULES', ','.join([
+    'google.cloud.documentai_v1',
+    'google.oauth2.service_account',
+    'google.api_core.client_options',
+    'numpy',
+    'cv2',
+    'fitz',                               # PyMuPDF (page_rasterizer imports it on first render)
+    'backend.payload_optimizer',          # PIL
+    'backend.page_rasterizer',
+    'backend.tesseract_cache',
+    'backend.azure_form_recognizer',      # ensemble mode
+    'backend.correct_template_generator'
+])).split(',') if name.strip()]
+
+
+def preload(modules: List[str] = None) -> Dict[str, float]:
+    """Import modules ahead of first use; returns seconds per module (missing ones are skipped)"""
+    timings = {}
+    for name in PRELOAD_MODULES if modules is None else modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            logger.warning(f"Preload skipped {name}: {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+    logger.info(f"Preloaded {len(timings)} module(s) in {sum(timings.values()):.2f}s")
+    return timings
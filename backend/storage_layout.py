@@ -0,0 +1,172 @@
+"""
+Sharded Storage Layout
+Collision-free file placement for uploads and generated Job Orders.
+
+Every file gets a random UUID name and lives two directory levels down,
+sharded by the first hex digits of that UUID:
+
+    uploads/3f/a2/INVOICE_3fa2c4...e1.pdf
+    job_orders/9b/07/JO_CORRECT_9b07d1...4c.html
+
+Concurrent writers can never pick the same name, and no directory grows past
+a few dozen entries even at millions of files. A SQLite index next to the
+files records each one's creation time, so expiry is a range query instead
+of a directory walk. Files derived from an indexed file and sharing its stem
+(the PDF rendered from a JO's HTML) are removed with it.
+
+    python -m backend.storage_layout --expire-hours 2 /app/uploads /app/job_orders
+"""
+
+import os
+import glob
+import time
+import uuid
+import sqlite3
+import logging
+import argparse
+import threading
+from typing import Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = '.storage_index.sqlite3'
+SHARD_DEPTH = 2  # levels of two hex digits each: 65536 leaf directories
+
+
+class ShardedStorage:
+    """UUID-named, hash-sharded file placement with a SQLite index"""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.index_path = os.path.join(self.root, INDEX_FILENAME)
+        self.local = threading.local()
+        os.makedirs(self.root, exist_ok=True)
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS files (
+                              path TEXT PRIMARY KEY,
+                              file_id TEXT NOT NULL,
+                              kind TEXT NOT NULL,
+                              created REAL NOT NULL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS files_created ON files(created)")
+            db.execute("CREATE INDEX IF NOT EXISTS files_file_id ON files(file_id)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread and process (connections must not cross a fork)
+        db = getattr(self.local, 'db', None)
+        if db is None or self.local.pid != os.getpid():
+            db = sqlite3.connect(self.index_path, timeout=10)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self.local.db = db
+            self.local.pid = os.getpid()
+        return db
+
+    def shard_dir(self, file_id: str) -> str:
+        parts = [file_id[i * 2:i * 2 + 2] for i in range(SHARD_DEPTH)]
+        return os.path.join(self.root, *parts)
+
+    def new_path(self, kind: str, ext: str, label: str = None) -> str:
+        """Reserve a fresh path such as <root>/ab/cd/<KIND>_<uuid>.<ext> and index it
+
+        label replaces KIND in the file name (e.g. to keep an original upload name).
+        """
+        file_id = uuid.uuid4().hex
+        directory = self.shard_dir(file_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{(label or kind)[:80]}_{file_id}.{ext.lstrip('.')}")
+        self.register(path, kind, file_id)
+        return path
+
+    def register(self, path: str, kind: str, file_id: str = None):
+        """Index a file written somewhere under the root (e.g. a converted PDF)"""
+        path = os.path.abspath(path)
+        if file_id is None:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            file_id = stem.rsplit('_', 1)[-1]
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO files (path, file_id, kind, created) VALUES (?, ?, ?, ?)",
+                       (path, file_id, kind, time.time()))
+
+    def lookup(self, file_id: str) -> List[str]:
+        """Paths indexed under a file id"""
+        rows = self._connect().execute("SELECT path FROM files WHERE file_id = ?", (file_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def expire(self, max_age_seconds: float) -> int:
+        """Delete files older than max_age_seconds (plus same-stem derivatives); returns count"""
+        cutoff = time.time() - max_age_seconds
+        db = self._connect()
+        rows = db.execute("SELECT path FROM files WHERE created < ?", (cutoff,)).fetchall()
+        removed = 0
+        for (path,) in rows:
+            for candidate in glob.glob(glob.escape(os.path.splitext(path)[0]) + '.*'):
+                try:
+                    os.remove(candidate)
+                    removed += 1
+                except OSError:
+                    pass
+            self._prune(os.path.dirname(path))
+        with db:
+            db.execute("DELETE FROM files WHERE created < ?", (cutoff,))
+        return removed
+
+    def _prune(self, directory: str):
+        """Remove now-empty shard directories up to (not including) the root"""
+        while directory.startswith(self.root + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return
+            directory = os.path.dirname(directory)
+
+    def sweep_unindexed(self, max_age_seconds: float) -> int:
+        """Delete old files left directly in the root by the previous flat layout"""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for entry in os.scandir(self.root):
+            if entry.is_file() and not entry.name.startswith(INDEX_FILENAME) and entry.stat().st_mtime < cutoff:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._connect()
+        count, oldest = db.execute("SELECT COUNT(*), MIN(created) FROM files").fetchone()
+        return {
+            'root': self.root,
+            'indexed_files': count,
+            'oldest_age_seconds': round(time.time() - oldest, 1) if oldest else 0.0
+        }
+
+
+_storages: Dict[str, ShardedStorage] = {}
+_storages_lock = threading.Lock()
+
+
+def storage_for(root: str) -> ShardedStorage:
+    """Shared ShardedStorage for a root directory"""
+    key = os.path.abspath(root)
+    with _storages_lock:
+        if key not in _storages:
+            _storages[key] = ShardedStorage(key)
+        return _storages[key]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Expire old files from sharded storage roots')
+    parser.add_argument('roots', nargs='+', help='Storage root directories')
+    parser.add_argument('--expire-hours', type=float, default=2.0)
+    args = parser.parse_args()
+
+    max_age = args.expire_hours * 3600
+    for root in args.roots:
+        storage = storage_for(root)
+        removed = storage.expire(max_age) + storage.sweep_unindexed(max_age)
+        print(f"{root}: removed {removed} files, {storage.stats()['indexed_files']} indexed")
+
+
+if __name__ == '__main__':
+    main()
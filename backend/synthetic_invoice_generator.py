@@ -0,0 +1,440 @@
+"""
+Synthetic Invoice Generator
+Produces randomized Sendora-style invoices (PDF + PNG) with ground-truth JSON
+for benchmarking and scale testing. Output is deterministic for a given seed.
+"""
+
+import os
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+
+
+# Vocabulary kept in line with the patterns GoogleDocumentProcessor extracts
+CUSTOMER_PREFIXES = [
+    'KENCANA', 'BINA', 'MAJU', 'SINAR', 'JAYA', 'MEGAH', 'CAHAYA', 'PERDANA',
+    'SERI', 'TEGUH', 'WAWASAN', 'GEMILANG', 'HARMONI', 'INDAH', 'SETIA'
+]
+CUSTOMER_SUFFIXES = [
+    'CONSTRUCTION', 'BUILDERS', 'DEVELOPMENT', 'ENGINEERING', 'INTERIOR',
+    'RENOVATION', 'PROPERTIES', 'CONTRACTOR', 'HOLDINGS', 'RESOURCES'
+]
+CUSTOMER_ENTITY = ['SDN BHD', 'SDN BHD', 'SDN BHD', 'ENTERPRISE', 'TRADING']
+CITIES = [
+    ('KOTA DAMANSARA', '47810', 'SELANGOR'), ('SHAH ALAM', '40000', 'SELANGOR'),
+    ('PETALING JAYA', '46000', 'SELANGOR'), ('KLANG', '41000', 'SELANGOR'),
+    ('SEREMBAN', '70000', 'NEGERI SEMBILAN'), ('JOHOR BAHRU', '80000', 'JOHOR'),
+    ('IPOH', '30000', 'PERAK'), ('KUALA LUMPUR', '50450', 'WILAYAH PERSEKUTUAN')
+]
+STREETS = ['JALAN PJU 5/1', 'JALAN SS 15/4', 'JALAN KLANG LAMA', 'JALAN AMPANG',
+           'PERSIARAN SURIAN', 'JALAN TEKNOLOGI', 'JALAN PERUSAHAAN 2']
+
+LAMINATE_SERIES = ['6S', '5S', '8S', '3S', '7S']
+LAMINATE_LETTERS = ['A', 'B', 'C', 'D', 'W']
+
+DOOR_THICKNESS = ['37', '43', '46', '48']
+DOOR_TYPES = [('S/L', 'S/L'), ('D/L', 'D/L'), ('UNEQUAL D/L', 'Unequal D/L')]
+DOOR_CORES = [('HONEYCOMB', 'honeycomb'), ('SOLID TUBULAR CORE', 'solid_tubular'),
+              ('SOLID TIMBER', 'solid_timber'), ('METAL SKELETON', 'metal_skeleton')]
+DOOR_EDGING = [('NA LIPPING', 'na_lipping'), ('ABS EDGING', 'abs_edging'),
+               ('NO EDGING', 'no_edging'), (None, None)]
+DECORATIVE = [('T-BAR', 't_bar'), ('GROOVE LINE', 'groove_line'), (None, None)]
+FRAME_TYPES = [('INNER', 'inner'), ('OUTER', 'outer')]
+
+FEET_SIZES = [(3, 7), (3, 8), (4, 8), (2, 7), (3, 9)]
+MM_SIZES = [(750, 2100), (850, 2100), (900, 2100), (850, 2021), (1428, 2348), (915, 2440)]
+
+# 1 foot is rounded to 305mm, matching GoogleDocumentProcessor.extract_size
+MM_PER_FOOT = 305
+
+VENDOR = {
+    'name': 'SENDORA GROUP SDN BHD',
+    'address': 'NO. 12, JALAN PJU 5/1, KOTA DAMANSARA, 47810 PETALING JAYA, SELANGOR',
+    'phone': '+603-6142 8800'
+}
+
+
+class SyntheticInvoiceGenerator:
+    """Generate reproducible Sendora-style invoices with ground truth"""
+
+    def __init__(self, seed: int = 42, output_dir: str = None, dpi: int = 200,
+                 min_items: int = 1, max_items: int = 30):
+        self.seed = seed
+        self.output_dir = output_dir or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'temp', 'synthetic_invoices'
+        )
+        self.dpi = dpi
+        self.min_items = min_items
+        self.max_items = max_items
+        # Fixed epoch so dates never depend on when the corpus was generated
+        self.base_date = datetime(2025, 1, 1)
+
+    def rng_for(self, index: int) -> random.Random:
+        """Independent RNG per invoice so any single invoice can be regenerated"""
+        return random.Random(f"sendora-synthetic:{self.seed}:{index}")
+
+    def build_invoice(self, index: int) -> Dict[str, Any]:
+        """Build invoice content and matching ground truth for one document"""
+
+        rng = self.rng_for(index)
+
+        invoice_date = self.base_date + timedelta(days=rng.randint(0, 364))
+        due_date = invoice_date + timedelta(days=rng.choice([14, 30, 45, 60]))
+
+        customer_name = f"{rng.choice(CUSTOMER_PREFIXES)} {rng.choice(CUSTOMER_SUFFIXES)} {rng.choice(CUSTOMER_ENTITY)}"
+        city, postcode, state = rng.choice(CITIES)
+        customer_address = f"NO. {rng.randint(1, 250)}, {rng.choice(STREETS)}, {postcode} {city}, {state}"
+        customer_phone = f"+603-{rng.randint(1000, 9999)} {rng.randint(1000, 9999)}"
+
+        line_items = []
+        item_count = rng.randint(self.min_items, self.max_items)
+        for _ in range(item_count):
+            if rng.random() < 0.75:
+                line_items.append(self.build_door_item(rng))
+            else:
+                line_items.append(self.build_frame_item(rng))
+
+        subtotal = sum(float(item['amount']) for item in line_items)
+        tax_rate = rng.choice([0.0, 0.06, 0.08, 0.10])
+        tax = round(subtotal * tax_rate, 2)
+        total = round(subtotal + tax, 2)
+
+        ground_truth = {
+            'invoice_number': f"INV-{invoice_date.year}-{index + 1:05d}",
+            'po_number': f"PO-{invoice_date.year}-{rng.randint(100, 9999):04d}",
+            'date': invoice_date.strftime('%d/%m/%Y'),
+            'due_date': due_date.strftime('%d/%m/%Y'),
+            'vendor': dict(VENDOR),
+            'customer': {
+                'name': customer_name,
+                'address': customer_address,
+                'phone': customer_phone
+            },
+            'line_items': line_items,
+            'subtotal': f"{subtotal:.2f}",
+            'tax': f"{tax:.2f}",
+            'total': f"{total:.2f}",
+            'currency': 'MYR',
+            'document_type': 'invoice'
+        }
+
+        ground_truth.update(self.aggregate_door_fields(line_items))
+
+        ground_truth['synthetic'] = {
+            'seed': self.seed,
+            'index': index,
+            'tax_rate': tax_rate
+        }
+
+        return ground_truth
+
+    def build_door_item(self, rng: random.Random) -> Dict[str, Any]:
+        """Random door line item, e.g. '6S-A057 DOOR 43MM X 3FT X 8FT S/L HONEYCOMB'"""
+
+        laminate = f"{rng.choice(LAMINATE_SERIES)}-{rng.choice(LAMINATE_LETTERS)}{rng.randint(1, 999):03d}"
+        thickness = rng.choice(DOOR_THICKNESS)
+        type_text, type_value = rng.choice(DOOR_TYPES)
+        core_text, core_value = rng.choice(DOOR_CORES)
+        edging_text, edging_value = rng.choice(DOOR_EDGING)
+        deco_text, deco_value = rng.choice(DECORATIVE)
+
+        if rng.random() < 0.6:
+            width_ft, height_ft = rng.choice(FEET_SIZES)
+            size_text = f"{thickness}MM X {width_ft}FT X {height_ft}FT"
+            size = f"{width_ft * MM_PER_FOOT}MM x {height_ft * MM_PER_FOOT}MM"
+        else:
+            width_mm, height_mm = rng.choice(MM_SIZES)
+            size_text = f"{width_mm}MM X {height_mm}MM"
+            size = f"{width_mm}MM x {height_mm}MM"
+
+        parts = [laminate, 'DOOR', size_text, type_text, core_text]
+        if edging_text:
+            parts.append(edging_text)
+        if deco_text:
+            parts.append(deco_text)
+
+        specifications = {
+            'thickness': f"{thickness}mm",
+            'type': type_value,
+            'core': core_value
+        }
+        if edging_value:
+            specifications['edging'] = edging_value
+        if deco_value:
+            specifications['decorative'] = deco_value
+
+        quantity = rng.randint(1, 40)
+        unit_price = round(rng.uniform(180, 1450), 2)
+
+        return {
+            'description': ' '.join(parts),
+            'quantity': str(quantity),
+            'unit_price': f"{unit_price:.2f}",
+            'amount': f"{quantity * unit_price:.2f}",
+            'unit': 'PCS',
+            'size': size,
+            'laminate_code': laminate,
+            'specifications': specifications
+        }
+
+    def build_frame_item(self, rng: random.Random) -> Dict[str, Any]:
+        """Random frame line item, e.g. '6S-145 FRAME 130-150MM INNER 1428MM X 2348MM'"""
+
+        laminate = f"{rng.choice(LAMINATE_SERIES)}-{rng.randint(100, 299)}"
+        frame_text, frame_value = rng.choice(FRAME_TYPES)
+        width_mm, height_mm = rng.choice(MM_SIZES)
+        frame_width = rng.choice(['100-130MM', '130-150MM', '150-180MM'])
+
+        quantity = rng.randint(1, 40)
+        unit_price = round(rng.uniform(90, 650), 2)
+
+        return {
+            'description': f"{laminate} FRAME {frame_width} {frame_text} {width_mm}MM X {height_mm}MM",
+            'quantity': str(quantity),
+            'unit_price': f"{unit_price:.2f}",
+            'amount': f"{quantity * unit_price:.2f}",
+            'unit': 'SET',
+            'size': f"{width_mm}MM x {height_mm}MM",
+            'laminate_code': laminate,
+            'specifications': {'frame_type': frame_value}
+        }
+
+    def aggregate_door_fields(self, line_items: List[Dict]) -> Dict[str, str]:
+        """Expected aggregated fields, mirroring aggregate_door_specifications"""
+
+        aggregated = {
+            'door_thickness': '',
+            'door_type': '',
+            'door_core': '',
+            'door_edging': '',
+            'decorative_line': '',
+            'frame_type': '',
+            'door_size': '',
+            'item_desc_0': '',
+            'item_size_0': ''
+        }
+
+        spec_keys = {
+            'thickness': 'door_thickness',
+            'type': 'door_type',
+            'core': 'door_core',
+            'edging': 'door_edging',
+            'decorative': 'decorative_line',
+            'frame_type': 'frame_type'
+        }
+
+        for item in line_items:
+            if not aggregated['item_desc_0'] and 'DOOR' in item['description']:
+                aggregated['item_desc_0'] = item['description']
+                aggregated['item_size_0'] = item['size']
+                aggregated['door_size'] = item['size']
+
+            for spec_key, field in spec_keys.items():
+                if item['specifications'].get(spec_key) and not aggregated[field]:
+                    aggregated[field] = item['specifications'][spec_key]
+
+        return aggregated
+
+    def render_pdf(self, invoice: Dict[str, Any], pdf_path: str):
+        """Render invoice to PDF; multi-page when the line-item table overflows"""
+
+        # invariant=1 strips creation dates / random IDs so bytes are reproducible
+        doc = SimpleDocTemplate(
+            pdf_path, pagesize=A4, invariant=1,
+            leftMargin=15 * mm, rightMargin=15 * mm, topMargin=15 * mm, bottomMargin=15 * mm,
+            title=invoice['invoice_number'], author=VENDOR['name']
+        )
+        styles = getSampleStyleSheet()
+        normal = styles['Normal']
+        small = ParagraphStyle('Small', parent=normal, fontSize=8, leading=10)
+        title_style = ParagraphStyle('InvoiceTitle', parent=styles['Title'], fontSize=18, spaceAfter=6)
+
+        story = [
+            Paragraph(f"<b>{VENDOR['name']}</b>", styles['Heading2']),
+            Paragraph(VENDOR['address'], small),
+            Paragraph(f"Tel: {VENDOR['phone']}", small),
+            Spacer(1, 6 * mm),
+            Paragraph('TAX INVOICE', title_style)
+        ]
+
+        customer = invoice['customer']
+        header = Table([
+            ['Bill To:', customer['name'], 'Invoice No:', invoice['invoice_number']],
+            ['', Paragraph(customer['address'], small), 'Date:', invoice['date']],
+            ['', customer['phone'], 'PO No:', invoice['po_number']],
+            ['', '', 'Due Date:', invoice['due_date']]
+        ], colWidths=[18 * mm, 82 * mm, 24 * mm, 56 * mm])
+        header.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (2, 0), (2, -1), 'Helvetica-Bold'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ]))
+        story.extend([header, Spacer(1, 6 * mm)])
+
+        rows = [['No', 'Description', 'Qty', 'UOM', 'Unit Price (RM)', 'Amount (RM)']]
+        for i, item in enumerate(invoice['line_items'], start=1):
+            rows.append([
+                str(i),
+                Paragraph(item['description'], small),
+                item['quantity'],
+                item['unit'],
+                item['unit_price'],
+                item['amount']
+            ])
+
+        # repeatRows keeps the header on every continuation page
+        items_table = Table(rows, colWidths=[10 * mm, 88 * mm, 12 * mm, 14 * mm, 28 * mm, 28 * mm], repeatRows=1)
+        items_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 8),
+            ('ALIGN', (2, 1), (-1, -1), 'RIGHT'),
+            ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+            ('GRID', (0, 0), (-1, -1), 0.5, colors.black),
+        ]))
+        story.extend([items_table, Spacer(1, 4 * mm)])
+
+        totals = Table([
+            ['Subtotal:', f"RM {invoice['subtotal']}"],
+            ['SST:', f"RM {invoice['tax']}"],
+            ['Total:', f"RM {invoice['total']}"]
+        ], colWidths=[30 * mm, 40 * mm], hAlign='RIGHT')
+        totals.setStyle(TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 9),
+            ('ALIGN', (1, 0), (1, -1), 'RIGHT'),
+        ]))
+        story.append(totals)
+
+        doc.build(story)
+
+    def render_png(self, pdf_path: str, png_prefix: str) -> List[str]:
+        """Rasterize each PDF page to PNG (same pixels the OCR engines would see)"""
+
+        import fitz  # PyMuPDF
+
+        png_paths = []
+        doc = fitz.open(pdf_path)
+        try:
+            zoom = self.dpi / 72.0
+            for page_num in range(len(doc)):
+                pix = doc[page_num].get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                png_path = f"{png_prefix}_p{page_num + 1}.png"
+                pix.save(png_path)
+                png_paths.append(png_path)
+        finally:
+            doc.close()
+
+        return png_paths
+
+    def generate_one(self, index: int, formats: tuple = ('pdf', 'png')) -> Dict[str, Any]:
+        """Generate PDF/PNG/ground truth for a single invoice index"""
+
+        invoice = self.build_invoice(index)
+        stem = f"synthetic_invoice_{self.seed}_{index:06d}"
+        pdf_path = os.path.join(self.output_dir, f"{stem}.pdf")
+
+        # PNGs are rendered from the PDF, so the PDF is always produced
+        self.render_pdf(invoice, pdf_path)
+
+        files = {'pdf': os.path.basename(pdf_path), 'png': []}
+        if 'png' in formats:
+            png_paths = self.render_png(pdf_path, os.path.join(self.output_dir, stem))
+            files['png'] = [os.path.basename(p) for p in png_paths]
+
+        invoice['synthetic']['files'] = files
+        invoice['synthetic']['line_item_count'] = len(invoice['line_items'])
+
+        truth_path = os.path.join(self.output_dir, f"{stem}.json")
+        with open(truth_path, 'w', encoding='utf-8') as f:
+            json.dump(invoice, f, indent=2, ensure_ascii=False)
+
+        if 'pdf' not in formats:
+            os.remove(pdf_path)
+            files['pdf'] = None
+
+        return {'index': index, 'ground_truth': os.path.basename(truth_path), **files}
+
+    def generate_corpus(self, count: int, formats: tuple = ('pdf', 'png'), workers: int = 1,
+                        start: int = 0) -> Dict[str, Any]:
+        """Generate `count` invoices; identical seed/count always gives identical files"""
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        indices = range(start, start + count)
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                entries = list(pool.map(_generate_in_worker,
+                                        [(self.config(), i, formats) for i in indices],
+                                        chunksize=16))
+        else:
+            entries = [self.generate_one(i, formats) for i in indices]
+
+        manifest = {
+            'seed': self.seed,
+            'count': count,
+            'start': start,
+            'dpi': self.dpi,
+            'formats': list(formats),
+            'invoices': entries
+        }
+
+        manifest_path = os.path.join(self.output_dir, f"corpus_manifest_{self.seed}.json")
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        print(f"Generated {count} synthetic invoices in {self.output_dir}")
+        return manifest
+
+    def config(self) -> Dict[str, Any]:
+        """Constructor arguments, so worker processes rebuild an identical generator"""
+        return {
+            'seed': self.seed,
+            'output_dir': self.output_dir,
+            'dpi': self.dpi,
+            'min_items': self.min_items,
+            'max_items': self.max_items
+        }
+
+
+def _generate_in_worker(args) -> Dict[str, Any]:
+    """Process-pool entry point (must be module level to be picklable)"""
+    config, index, formats = args
+    return SyntheticInvoiceGenerator(**config).generate_one(index, formats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate synthetic Sendora invoices for benchmarking')
+    parser.add_argument('--count', type=int, default=100, help='Number of invoices to generate')
+    parser.add_argument('--seed', type=int, default=42, help='Seed; same seed gives the same corpus')
+    parser.add_argument('--output', default=None, help='Output directory (default: temp/synthetic_invoices)')
+    parser.add_argument('--formats', default='pdf,png', help='Comma-separated: pdf,png')
+    parser.add_argument('--dpi', type=int, default=200, help='PNG rasterization DPI')
+    parser.add_argument('--min-items', type=int, default=1, help='Minimum line items per invoice')
+    parser.add_argument('--max-items', type=int, default=30, help='Maximum line items (30+ spills onto a second page)')
+    parser.add_argument('--workers', type=int, default=1, help='Parallel worker processes')
+    parser.add_argument('--start', type=int, default=0, help='First invoice index (to extend a corpus)')
+    args = parser.parse_args()
+
+    generator = SyntheticInvoiceGenerator(
+        seed=args.seed,
+        output_dir=args.output,
+        dpi=args.dpi,
+        min_items=args.min_items,
+        max_items=args.max_items
+    )
+    formats = tuple(f.strip().lower() for f in args.formats.split(',') if f.strip())
+    generator.generate_corpus(args.count, formats=formats, workers=args.workers, start=args.start)
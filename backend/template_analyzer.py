@@ -3,11 +3,15 @@ Complete JO Template Analyzer
 Carefully documents every detail of your JO template for HTML recreation
 """
 
-import fitz  # PyMuPDF
 import json
 import os
 from typing import Dict, List, Any
 
+try:
+    from template_layout_model import template_layout
+except ImportError:
+    from backend.template_layout_model import template_layout
+
 class CompleteTemplateAnalyzer:
     """Analyze and document every detail of the JO template"""
     
@@ -26,14 +30,11 @@ class CompleteTemplateAnalyzer:
             print(f"Template not found: {self.door_template}")
             return None
         
-        # Open template for analysis
-        doc = fitz.open(self.door_template)
-        page = doc[0]
+        # Parsed once and shared with the other template analyzers
+        page = template_layout(self.door_template).pages[0]
         
         # Get page dimensions
-        rect = page.rect
-        width = rect.width
-        height = rect.height
+        width, height = page.size
         
         print(f"Page Dimensions: {width:.2f} x {height:.2f} points")
         print(f"Page Format: A4 Landscape")
@@ -58,8 +59,6 @@ class CompleteTemplateAnalyzer:
             'layout_structure': self.analyze_layout_structure(page)
         }
         
-        doc.close()
-        
         # Save complete specification
         self.save_complete_specification(template_spec)
         
@@ -70,7 +69,7 @@ class CompleteTemplateAnalyzer:
         
         print("\nANALYZING HEADER SECTION...")
         
-        text_dict = page.get_text("dict")
+        text_dict = page.text_dict()
         header_fields = {}
         
         # Header field labels and their details
@@ -127,7 +126,7 @@ class CompleteTemplateAnalyzer:
         
         print("\nANALYZING COMPANY BRANDING...")
         
-        text_dict = page.get_text("dict")
+        text_dict = page.text_dict()
         branding = {}
         
         for block in text_dict.get('blocks', []):
@@ -166,7 +165,7 @@ class CompleteTemplateAnalyzer:
         
         print("\nANALYZING FORM TITLE...")
         
-        text_dict = page.get_text("dict")
+        text_dict = page.text_dict()
         
         for block in text_dict.get('blocks', []):
             if 'lines' not in block:
@@ -195,7 +194,7 @@ class CompleteTemplateAnalyzer:
         
         print("\nANALYZING TABLE STRUCTURE...")
         
-        text_dict = page.get_text("dict")
+        text_dict = page.text_dict()
         
         # Table column headers
         table_headers = [
@@ -249,7 +248,7 @@ class CompleteTemplateAnalyzer:
         
         print("\nANALYZING CHECKBOX GROUPS...")
         
-        text_dict = page.get_text("dict")
+        text_dict = page.text_dict()
         
         checkbox_groups = {
             'door_thickness': {
@@ -307,7 +306,7 @@ class CompleteTemplateAnalyzer:
         
         print("\nANALYZING FOOTER SECTION...")
         
-        text_dict = page.get_text("dict")
+        text_dict = page.text_dict()
         footer_elements = {}
         
         footer_labels = [
@@ -3,12 +3,19 @@ Template Coordinate Extractor
 Extracts precise coordinates from your original Sendora JO templates
 """
 
-import fitz  # PyMuPDF
-import pdfplumber
 import json
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple
 
+try:
+    from template_fingerprint import IncrementalTemplateAnalysis, code_version
+    from template_layout_model import template_layout
+except ImportError:
+    from backend.template_fingerprint import IncrementalTemplateAnalysis, code_version
+    from backend.template_layout_model import template_layout
+
 class TemplateCoordinateExtractor:
     """Extract exact coordinates from original Sendora templates"""
     
@@ -19,30 +26,64 @@ class TemplateCoordinateExtractor:
             'combined': r'C:\Users\USER\Desktop\Project management\Sendora\Material\JOB ORDER FORM.pdf'
         }
         
-    def extract_all_templates(self):
-        """Extract coordinates from all templates"""
-        
-        results = {}
+    def extract_all_templates(self, workers: int = 1, force: bool = False):
+        """Extract coordinates from all templates
+
+        Only pages whose fingerprint changed since the last run are extracted
+        again (force re-extracts everything). With workers > 1 those pages are
+        extracted in a process pool; pages are merged back in page order, so
+        the spec files are the same as a sequential run.
+        """
         
+        analyses = {}
         for template_name, template_path in self.template_paths.items():
             if os.path.exists(template_path):
-                print(f"\nAnalyzing {template_name} template...")
-                coords = self.extract_template_coordinates(template_path)
-                results[template_name] = coords
-                
-                # Save individual spec file
-                spec_file = f"{template_name}_template_spec.json"
-                with open(spec_file, 'w', encoding='utf-8') as f:
-                    json.dump(coords, f, indent=2, ensure_ascii=False)
-                print(f"Saved: {spec_file}")
+                analyses[template_name] = IncrementalTemplateAnalysis(
+                    template_path, f"{template_name}_template_spec.json", 'template_coordinates', force=force,
+                    version=code_version(TemplateCoordinateExtractor, template_layout))
             else:
                 print(f"Template not found: {template_path}")
         
+        jobs = [(template_name, analysis.pdf_path, page_num)
+                for template_name, analysis in analyses.items()
+                for page_num in analysis.pages_to_analyze()]
+        if workers > 1 and len(jobs) > 1:
+            # Parse each template once up front rather than once per worker
+            for template_name in dict.fromkeys(job[0] for job in jobs):
+                template_layout(analyses[template_name].pdf_path)
+            with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+                page_results = list(pool.map(_extract_page_in_worker, jobs))
+        else:
+            page_results = [_extract_page_in_worker(job) for job in jobs]
+        for (template_name, _, page_num), page_coords in zip(jobs, page_results):
+            analyses[template_name].set(page_num, page_coords)
+        
+        results = {}
+        
+        for template_name, analysis in analyses.items():
+            print(f"\nAnalyzing {template_name} template... {analysis.summary()}")
+            coords = self.merge_page_coordinates(analysis.pdf_path, analysis.page_results())
+            results[template_name] = coords
+            
+            # Save individual spec file
+            spec_file = f"{template_name}_template_spec.json"
+            with open(spec_file, 'w', encoding='utf-8') as f:
+                json.dump(coords, f, indent=2, ensure_ascii=False)
+            analysis.save()
+            print(f"Saved: {spec_file}")
+        
         return results
     
     def extract_template_coordinates(self, pdf_path: str) -> Dict:
         """Extract precise coordinates from template PDF"""
         
+        page_count = len(template_layout(pdf_path))
+        pages = [self.extract_page_coordinates(pdf_path, page_num) for page_num in range(page_count)]
+        return self.merge_page_coordinates(pdf_path, pages)
+    
+    def extract_page_coordinates(self, pdf_path: str, page_num: int) -> Dict:
+        """Coordinates found on one page (the unit of work for parallel extraction)"""
+        
         coordinates = {
             'template_path': pdf_path,
             'page_size': None,
@@ -54,29 +95,48 @@ class TemplateCoordinateExtractor:
             'signature_areas': {}
         }
         
-        # Use PyMuPDF for precise extraction
-        doc = fitz.open(pdf_path)
+        # One parsed layout per template, shared with the other analyzers
+        page = template_layout(pdf_path).pages[page_num]
+        coordinates['page_size'] = page.size
         
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            
-            # Get page size
-            if coordinates['page_size'] is None:
-                rect = page.rect
-                coordinates['page_size'] = [rect.width, rect.height]
-            
-            # Extract text with exact positions
-            text_dict = page.get_text("dict")
-            self.parse_text_blocks(text_dict, coordinates, page_num)
-            
-            # Extract form fields
-            if page.first_widget:
-                self.extract_form_fields(page, coordinates, page_num)
+        # Text with exact positions
+        self.parse_text_blocks(page.text_dict(), coordinates, page_num)
         
-        doc.close()
+        # Form fields, tables and ruling lines
+        self.extract_form_fields(page, coordinates, page_num)
+        self.extract_table_structure(page, coordinates, page_num)
         
-        # Use pdfplumber for additional analysis
-        self.analyze_with_pdfplumber(pdf_path, coordinates)
+        return coordinates
+    
+    def merge_page_coordinates(self, pdf_path: str, pages: List[Dict]) -> Dict:
+        """Combine per-page coordinates in page order; later pages win on repeated labels"""
+        
+        coordinates = {
+            'template_path': pdf_path,
+            'page_size': pages[0]['page_size'] if pages else None,
+            'header_fields': {},
+            'text_elements': {},
+            'form_fields': {},
+            'table_structure': {},
+            'checkbox_groups': {},
+            'signature_areas': {}
+        }
+        
+        for page in pages:
+            coordinates['header_fields'].update(page['header_fields'])
+            coordinates['text_elements'].update(page['text_elements'])
+            coordinates['table_structure'].update(page['table_structure'])
+            coordinates['signature_areas'].update(page['signature_areas'])
+            for field_info in page['form_fields'].values():
+                coordinates['form_fields'][f"field_{len(coordinates['form_fields'])}"] = field_info
+            for group, options in page['checkbox_groups'].items():
+                coordinates['checkbox_groups'].setdefault(group, {}).update(options)
+        
+        # Line lists come after the text results, as in a single pass
+        for page in pages:
+            for key, value in page.items():
+                if key.startswith('lines_page_'):
+                    coordinates[key] = value
         
         return coordinates
     
@@ -121,54 +181,39 @@ class TemplateCoordinateExtractor:
     def extract_form_fields(self, page, coordinates: Dict, page_num: int):
         """Extract interactive form fields"""
         
-        widget = page.first_widget
-        while widget:
+        for widget in page.widgets():
+            x0, y0, x1, y1 = widget['rect']
             field_info = {
-                'field_name': widget.field_name or 'unnamed',
-                'field_type': widget.field_type_string,
-                'rect': list(widget.rect),
-                'x': widget.rect.x0,
-                'y': widget.rect.y0,
-                'width': widget.rect.width,
-                'height': widget.rect.height
+                'field_name': widget['field_name'],
+                'field_type': widget['field_type'],
+                'rect': widget['rect'],
+                'x': x0,
+                'y': y0,
+                'width': x1 - x0,
+                'height': y1 - y0
             }
             
             coordinates['form_fields'][f"field_{len(coordinates['form_fields'])}"] = field_info
-            widget = widget.next
     
-    def analyze_with_pdfplumber(self, pdf_path: str, coordinates: Dict):
-        """Use pdfplumber for table and structure analysis"""
-        
-        try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page_num, page in enumerate(pdf.pages):
-                    # Find tables
-                    tables = page.find_tables()
-                    if tables:
-                        coordinates['table_structure'][f"page_{page_num}"] = []
-                        for i, table in enumerate(tables):
-                            table_info = {
-                                'table_id': i,
-                                'bbox': table.bbox,
-                                'rows': len(table.rows) if table.rows else 0,
-                                'columns': len(table.rows[0]) if table.rows and table.rows[0] else 0
-                            }
-                            coordinates['table_structure'][f"page_{page_num}"].append(table_info)
-                    
-                    # Extract lines for form structure
-                    lines = page.lines
-                    if lines:
-                        coordinates[f"lines_page_{page_num}"] = [
-                            {
-                                'x0': line['x0'],
-                                'y0': line['y0'], 
-                                'x1': line['x1'],
-                                'y1': line['y1'],
-                                'width': line.get('width', 1)
-                            } for line in lines
-                        ]
-        except Exception as e:
-            print(f"pdfplumber analysis failed: {e}")
+    def extract_table_structure(self, page, coordinates: Dict, page_num: int):
+        """Tables and ruling lines (found by pdfplumber when the layout was parsed)"""
+        
+        if len(page.tables):
+            coordinates['table_structure'][f"page_{page_num}"] = [
+                {
+                    'table_id': i,
+                    'bbox': tuple(table[:4]),
+                    'rows': int(table[4]),
+                    'columns': int(table[5])
+                } for i, table in enumerate(page.tables.tolist())
+            ]
+        
+        # Lines for form structure
+        if len(page.lines):
+            coordinates[f"lines_page_{page_num}"] = [
+                {'x0': x0, 'y0': y0, 'x1': x1, 'y1': y1, 'width': width}
+                for x0, y0, x1, y1, width in page.lines.tolist()
+            ]
     
     def is_field_label(self, text: str) -> bool:
         """Check if text is a field label"""
@@ -285,14 +330,27 @@ class TemplateCoordinateExtractor:
             print(f"Created: {coord_file} and {spec_file}")
 
 
+def _extract_page_in_worker(job) -> Dict:
+    """Process-pool entry point: (template_name, template_path, page_num) -> page coordinates"""
+    _, template_path, page_num = job
+    return TemplateCoordinateExtractor().extract_page_coordinates(template_path, page_num)
+
+
 # Test and extract coordinates
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Extract coordinates from the Sendora JO templates')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes for per-page extraction (1 = sequential)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-extract every page even if its fingerprint is unchanged')
+    args = parser.parse_args()
+    
     extractor = TemplateCoordinateExtractor()
     
     print("Extracting coordinates from Sendora JO templates...")
     print("=" * 60)
     
-    results = extractor.extract_all_templates()
+    results = extractor.extract_all_templates(workers=args.workers, force=args.force)
     extractor.save_specifications(results)
     
     print("\n" + "=" * 60)
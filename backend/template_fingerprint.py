@@ -0,0 +1,206 @@
+"""
+Template Fingerprints
+Lets the template analysis scripts redo only the pages of a JO template that
+actually changed.
+
+A fingerprint is the template's SHA-256 plus, per page:
+  content    hash of the page's content stream (exact match)
+  resources  hash of what the content stream does not hold: form widgets
+             (name, type, rect), other annotations (type, rect), fonts and
+             the bytes of every image / form XObject the page draws
+  text       hash of every word with its position rounded to 0.1 pt
+  dhash      256-bit difference hash of a 72 dpi grayscale render
+
+A page counts as unchanged if its resources are identical and either its
+content stream is identical, or its text is identical and its dHash is
+within DHASH_TOLERANCE bits. The last rule covers a template re-exported
+without visible changes. The fingerprint and
+the per-page analysis results are stored next to the analysis output
+(door_template_spec.json -> door_template_spec.fingerprint.json). On the next
+run the stored results are reused for unchanged pages, and an unchanged file
+skips page fingerprinting altogether. The sidecar also records the analysis
+code version (code_version() of the analyzer and its helpers); after an edit
+to that code every page counts as changed.
+"""
+
+import os
+import sys
+import json
+import hashlib
+import logging
+from typing import Dict, List, Any, Optional, Iterable
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+try:
+    from page_rasterizer import page_rasterizer
+except ImportError:
+    from backend.page_rasterizer import page_rasterizer
+
+logger = logging.getLogger(__name__)
+
+DHASH_SIZE = 16
+DHASH_TOLERANCE = int(os.environ.get('TEMPLATE_DHASH_TOLERANCE', '0'))
+
+
+def dhash(gray: np.ndarray, size: int = DHASH_SIZE) -> str:
+    """Difference hash: sign of horizontal gradients on a (size x size+1) thumbnail, as hex"""
+    thumbnail = cv2.resize(np.ascontiguousarray(gray), (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (thumbnail[:, 1:] > thumbnail[:, :-1]).flatten()
+    return np.packbits(bits).tobytes().hex()
+
+
+def hamming(hex_a: str, hex_b: str) -> int:
+    if len(hex_a) != len(hex_b):
+        return len(hex_a) * 4
+    return bin(int(hex_a, 16) ^ int(hex_b, 16)).count('1')
+
+
+def resources_digest(doc: 'fitz.Document', page: 'fitz.Page') -> str:
+    """Hash of a page's widgets, annotations, fonts and drawn XObjects (by content, not xref number)"""
+    digest = hashlib.sha1()
+    for widget in page.widgets():
+        rect = ','.join(f"{v:.1f}" for v in widget.rect)
+        digest.update(f"widget {widget.field_name} {widget.field_type} {rect}\n".encode('utf-8'))
+    for annot in page.annots():
+        rect = ','.join(f"{v:.1f}" for v in annot.rect)
+        digest.update(f"annot {annot.type[1]} {rect}\n".encode('utf-8'))
+    for font in page.get_fonts(full=True):
+        digest.update(f"font {font[3]} {font[2]} {font[4]}\n".encode('utf-8'))
+    xrefs = [image[0] for image in page.get_images(full=True)] + [xobject[0] for xobject in page.get_xobjects()]
+    for xref in xrefs:
+        digest.update(b'xobject ')
+        digest.update(hashlib.sha1(doc.xref_stream_raw(xref) or b'').digest())
+    return digest.hexdigest()
+
+
+def page_fingerprint(pdf_path: str, page_number: int) -> Dict[str, str]:
+    with fitz.open(pdf_path) as doc:
+        page = doc[page_number]
+        content = hashlib.sha1(page.read_contents()).hexdigest()
+        resources = resources_digest(doc, page)
+    words = page_rasterizer.page_text(pdf_path, page_number, 'words')
+    text = hashlib.sha1('\n'.join(
+        f"{w[4]}@{w[0]:.1f},{w[1]:.1f},{w[2]:.1f},{w[3]:.1f}" for w in words
+    ).encode('utf-8')).hexdigest()
+    gray = page_rasterizer.render_template(pdf_path, page_number, scale=1.0)
+    return {'content': content, 'resources': resources, 'text': text, 'dhash': dhash(gray)}
+
+
+def page_unchanged(old: Optional[Dict[str, str]], new: Dict[str, str]) -> bool:
+    # A moved widget or a swapped logo leaves the content stream untouched
+    if not old or old.get('resources') != new['resources']:
+        return False
+    if old.get('content') == new['content']:
+        return True
+    return old.get('text') == new['text'] and hamming(old.get('dhash', ''), new['dhash']) <= DHASH_TOLERANCE
+
+
+def sidecar_path(output_path: str) -> str:
+    return f"{os.path.splitext(output_path)[0]}.fingerprint.json"
+
+
+def code_version(*objects) -> str:
+    """Hash of the source files defining the given modules, classes, functions or instances"""
+    paths = sorted({getattr(obj, '__file__', None) or sys.modules[obj.__module__].__file__
+                    for obj in objects})
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class IncrementalTemplateAnalysis:
+    """Per-page results of one analysis of one template, reused while pages are unchanged
+
+        analysis = IncrementalTemplateAnalysis(template_path, 'door_template_spec.json', 'coordinates',
+                                               version=code_version(TemplateCoordinateExtractor))
+        for page_number in analysis.pages_to_analyze():
+            analysis.set(page_number, analyze(page_number))
+        results = analysis.page_results()
+        analysis.save()
+
+    Results must be JSON-serializable. pages limits the analysis to some pages
+    (e.g. [0] for tools that only look at the first page). Stored results
+    from a different version of the analysis code are never reused.
+    """
+
+    def __init__(self, pdf_path: str, output_path: str, analysis: str,
+                 pages: Iterable[int] = None, force: bool = False, version: str = None):
+        self.pdf_path = pdf_path
+        self.output_path = output_path
+        self.sidecar = sidecar_path(output_path)
+        self.analysis = analysis
+        self.version = version
+        self.sha256 = page_rasterizer.document_hash(pdf_path)
+        self.pages = list(pages) if pages is not None else list(range(page_rasterizer.page_count(pdf_path)))
+        self.results: Dict[int, Any] = {}
+        self.fingerprints: Dict[int, Dict[str, str]] = {}
+
+        previous = None if force else self._load()
+        if previous and previous['sha256'] == self.sha256:
+            # Same file: every stored page is reusable without fingerprinting
+            for page_number in self.pages:
+                if str(page_number) in previous['results']:
+                    self.results[page_number] = previous['results'][str(page_number)]
+                    self.fingerprints[page_number] = previous['pages'].get(str(page_number))
+        else:
+            old_pages = previous['pages'] if previous else {}
+            for page_number in self.pages:
+                fingerprint = page_fingerprint(pdf_path, page_number)
+                self.fingerprints[page_number] = fingerprint
+                if previous and page_unchanged(old_pages.get(str(page_number)), fingerprint) \
+                        and str(page_number) in previous['results']:
+                    self.results[page_number] = previous['results'][str(page_number)]
+
+        self.reused = sorted(self.results)
+
+    def _load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.sidecar):
+            return None
+        try:
+            with open(self.sidecar, 'r', encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable fingerprint {self.sidecar}: {e}")
+            return None
+        if stored.get('analysis') != self.analysis:
+            return None
+        if stored.get('version') != self.version:
+            logger.info(f"{self.analysis} code changed since {self.sidecar} was written; re-analyzing every page")
+            return None
+        return stored
+
+    def pages_to_analyze(self) -> List[int]:
+        return [page_number for page_number in self.pages if page_number not in self.results]
+
+    def set(self, page_number: int, result: Any):
+        self.results[page_number] = result
+
+    def page_results(self) -> List[Any]:
+        """Results in page order (every page must have been reused or set)"""
+        return [self.results[page_number] for page_number in self.pages]
+
+    def save(self):
+        for page_number in self.pages:
+            if self.fingerprints.get(page_number) is None:
+                self.fingerprints[page_number] = page_fingerprint(self.pdf_path, page_number)
+        stored = {
+            'template': self.pdf_path,
+            'analysis': self.analysis,
+            'version': self.version,
+            'sha256': self.sha256,
+            'pages': {str(n): self.fingerprints[n] for n in self.pages},
+            'results': {str(n): self.results[n] for n in self.pages}
+        }
+        tmp_path = f"{self.sidecar}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False)
+        os.replace(tmp_path, self.sidecar)
+
+    def summary(self) -> str:
+        redone = len(self.pages) - len(self.reused)
+        return f"{len(self.reused)} unchanged page(s) reused, {redone} analyzed"
@@ -0,0 +1,247 @@
+"""
+Template Layout Model
+One parsed layout per JO template page: text spans with their block/line
+structure, vector lines, rectangles, checkbox candidates, form widgets and
+pdfplumber table regions. Every template analyzer reads this instead of
+re-parsing the PDF with its own PyMuPDF/pdfplumber walk.
+
+A template is parsed once per content hash. The arrays are kept in memory and
+written to LAYOUT_CACHE_DIR as a compressed .npz (no pickles), so later runs
+and worker processes load the layout in milliseconds.
+
+    layout = template_layout(pdf_path)
+    page = layout.pages[0]
+    page.text_dict()          # same shape as page.get_text('dict') (text blocks)
+    page.lines, page.rects    # (N, 5) x0, y0, x1, y1, width / (N, 4) x0, y0, x1, y1
+    page.checkbox_candidates()
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import fitz  # PyMuPDF
+import numpy as np
+
+try:
+    from page_rasterizer import page_rasterizer
+except ImportError:
+    from backend.page_rasterizer import page_rasterizer
+
+logger = logging.getLogger(__name__)
+
+LAYOUT_VERSION = 1
+LAYOUT_CACHE_DIR = os.environ.get('TEMPLATE_LAYOUT_CACHE_DIR', os.path.join('temp', 'template_layouts'))
+LAYOUT_CACHE_ENTRIES = 16
+CHECKBOX_MIN_SIZE = 4.0    # points
+CHECKBOX_MAX_SIZE = 16.0
+CHECKBOX_MAX_ASPECT = 1.3
+
+
+class PageLayout:
+    """Layout arrays of one page"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.width, self.height = (float(v) for v in arrays['size'])
+        self.span_bbox = arrays['span_bbox']        # (S, 4)
+        self.span_text = arrays['span_text']        # (S,) str
+        self.span_size = arrays['span_size']        # (S,)
+        self.span_flags = arrays['span_flags']      # (S,)
+        self.span_font = arrays['span_font']        # (S,) index into fonts
+        self.span_line = arrays['span_line']        # (S,) index into line_bbox
+        self.line_bbox = arrays['line_bbox']        # (L, 4)
+        self.line_block = arrays['line_block']      # (L,) index into block_bbox
+        self.block_bbox = arrays['block_bbox']      # (B, 4)
+        self.fonts = arrays['fonts']
+        self.lines = arrays['lines']                # (N, 5) x0, y0, x1, y1, width
+        self.rects = arrays['rects']                # (R, 4)
+        self.tables = arrays['tables']              # (T, 6) x0, y0, x1, y1, rows, columns
+        self.widget_rect = arrays['widget_rect']    # (W, 4)
+        self.widget_name = arrays['widget_name']
+        self.widget_type = arrays['widget_type']
+        self._text_dict = None
+
+    @property
+    def size(self) -> List[float]:
+        return [self.width, self.height]
+
+    def text_dict(self) -> Dict[str, Any]:
+        """Text blocks in page.get_text('dict') form (built once, shared; do not modify)"""
+        if self._text_dict is None:
+            blocks = [{'type': 0, 'number': b, 'bbox': tuple(bbox), 'lines': []}
+                      for b, bbox in enumerate(self.block_bbox.tolist())]
+            lines = []
+            for bbox, block in zip(self.line_bbox.tolist(), self.line_block.tolist()):
+                line = {'bbox': tuple(bbox), 'spans': []}
+                blocks[block]['lines'].append(line)
+                lines.append(line)
+            fonts = self.fonts.tolist()
+            for bbox, text, size, flags, font, line in zip(self.span_bbox.tolist(), self.span_text.tolist(),
+                                                           self.span_size.tolist(), self.span_flags.tolist(),
+                                                           self.span_font.tolist(), self.span_line.tolist()):
+                lines[line]['spans'].append({'bbox': tuple(bbox), 'text': text, 'size': size,
+                                             'flags': flags, 'font': fonts[font]})
+            self._text_dict = {'width': self.width, 'height': self.height, 'blocks': blocks}
+        return self._text_dict
+
+    def widgets(self) -> List[Dict[str, Any]]:
+        return [{'field_name': name, 'field_type': kind, 'rect': rect}
+                for name, kind, rect in zip(self.widget_name.tolist(), self.widget_type.tolist(),
+                                            self.widget_rect.tolist())]
+
+    def checkbox_candidates(self) -> np.ndarray:
+        """Small, roughly square rectangles, (N, 4) x0, y0, x1, y1"""
+        w = self.rects[:, 2] - self.rects[:, 0]
+        h = self.rects[:, 3] - self.rects[:, 1]
+        square = (np.maximum(w, h) <= CHECKBOX_MAX_ASPECT * np.minimum(w, h))
+        sized = (w >= CHECKBOX_MIN_SIZE) & (w <= CHECKBOX_MAX_SIZE) & (h >= CHECKBOX_MIN_SIZE) & (h <= CHECKBOX_MAX_SIZE)
+        return self.rects[square & sized]
+
+
+class TemplateLayout:
+    """Layout of every page of one template"""
+
+    def __init__(self, sha256: str, pages: List[PageLayout]):
+        self.sha256 = sha256
+        self.pages = pages
+
+    def __len__(self):
+        return len(self.pages)
+
+
+def _page_arrays(page: 'fitz.Page', plumber_page=None) -> Dict[str, np.ndarray]:
+    fonts: Dict[str, int] = {}
+    span_bbox, span_text, span_size, span_flags, span_font, span_line = [], [], [], [], [], []
+    line_bbox, line_block, block_bbox = [], [], []
+
+    for block in page.get_text('dict').get('blocks', []):
+        if 'lines' not in block:
+            continue
+        block_bbox.append(block['bbox'])
+        for line in block['lines']:
+            line_bbox.append(line['bbox'])
+            line_block.append(len(block_bbox) - 1)
+            for span in line['spans']:
+                span_bbox.append(span['bbox'])
+                span_text.append(span['text'])
+                span_size.append(span['size'])
+                span_flags.append(span['flags'])
+                span_font.append(fonts.setdefault(span['font'], len(fonts)))
+                span_line.append(len(line_bbox) - 1)
+
+    widgets = list(page.widgets() or [])
+
+    if plumber_page is not None:
+        lines = [(l['x0'], l['y0'], l['x1'], l['y1'], l.get('width', 1)) for l in plumber_page.lines]
+        rects = [(r['x0'], r['top'], r['x1'], r['bottom']) for r in plumber_page.rects]
+        tables = []
+        for table in plumber_page.find_tables():
+            rows = len(table.rows) if table.rows else 0
+            columns = len(getattr(table.rows[0], 'cells', table.rows[0])) if table.rows else 0
+            tables.append((*table.bbox, rows, columns))
+    else:
+        lines, rects, tables = [], [], []
+        for drawing in page.get_drawings():
+            for item in drawing['items']:
+                if item[0] == 'l':
+                    lines.append((item[1].x, item[1].y, item[2].x, item[2].y, drawing.get('width') or 1))
+                elif item[0] == 're':
+                    rects.append(tuple(item[1]))
+
+    def floats(rows, columns):
+        return np.array(rows, dtype=np.float64).reshape(-1, columns)
+
+    return {
+        'size': np.array([page.rect.width, page.rect.height], dtype=np.float64),
+        'span_bbox': floats(span_bbox, 4),
+        'span_text': np.array(span_text, dtype=str),
+        'span_size': np.array(span_size, dtype=np.float64),
+        'span_flags': np.array(span_flags, dtype=np.int32),
+        'span_font': np.array(span_font, dtype=np.int32),
+        'span_line': np.array(span_line, dtype=np.int32),
+        'line_bbox': floats(line_bbox, 4),
+        'line_block': np.array(line_block, dtype=np.int32),
+        'block_bbox': floats(block_bbox, 4),
+        'fonts': np.array(list(fonts), dtype=str),
+        'lines': floats(lines, 5),
+        'rects': floats(rects, 4),
+        'tables': floats(tables, 6),
+        'widget_rect': floats([tuple(w.rect) for w in widgets], 4),
+        'widget_name': np.array([w.field_name or 'unnamed' for w in widgets], dtype=str),
+        'widget_type': np.array([w.field_type_string for w in widgets], dtype=str)
+    }
+
+
+def parse_template(pdf_path: str) -> List[Dict[str, np.ndarray]]:
+    """Per-page layout arrays from one PyMuPDF pass and one pdfplumber pass"""
+    try:
+        import pdfplumber
+        plumber = pdfplumber.open(pdf_path)
+    except Exception as e:
+        logger.warning(f"pdfplumber unavailable for {pdf_path}, using PyMuPDF drawings: {e}")
+        plumber = None
+    try:
+        with fitz.open(pdf_path) as doc:
+            return [_page_arrays(page, plumber.pages[page.number] if plumber else None) for page in doc]
+    finally:
+        if plumber:
+            plumber.close()
+
+
+def _cache_path(sha256: str) -> str:
+    return os.path.join(LAYOUT_CACHE_DIR, f"{sha256[:40]}.v{LAYOUT_VERSION}.npz")
+
+
+def _save(path: str, pages: List[Dict[str, np.ndarray]]):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    flat = {f"p{n}_{key}": value for n, arrays in enumerate(pages) for key, value in arrays.items()}
+    flat['page_count'] = np.array(len(pages))
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, **flat)
+    os.replace(tmp_path, path)
+
+
+def _load(path: str) -> Optional[List[Dict[str, np.ndarray]]]:
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            pages = [{} for _ in range(int(data['page_count']))]
+            for name in data.files:
+                if name != 'page_count':
+                    page, key = name[1:].split('_', 1)
+                    pages[int(page)][key] = data[name]
+            return pages
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Ignoring unreadable layout cache {path}: {e}")
+        return None
+
+
+_layouts: 'OrderedDict[str, TemplateLayout]' = OrderedDict()
+_layouts_lock = threading.Lock()
+
+
+def template_layout(pdf_path: str) -> TemplateLayout:
+    """Layout model of a template, parsed at most once per content hash"""
+    sha256 = page_rasterizer.document_hash(pdf_path)
+    with _layouts_lock:
+        layout = _layouts.get(sha256)
+        if layout is not None:
+            _layouts.move_to_end(sha256)
+            return layout
+
+    path = _cache_path(sha256)
+    pages = _load(path) if os.path.exists(path) else None
+    if pages is None:
+        pages = parse_template(pdf_path)
+        try:
+            _save(path, pages)
+        except OSError as e:
+            logger.warning(f"Could not write layout cache {path}: {e}")
+
+    layout = TemplateLayout(sha256, [PageLayout(arrays) for arrays in pages])
+    with _layouts_lock:
+        _layouts[sha256] = layout
+        while len(_layouts) > LAYOUT_CACHE_ENTRIES:
+            _layouts.popitem(last=False)
+    return layout
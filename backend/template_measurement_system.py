@@ -5,13 +5,21 @@ Combines manual measurement with AI vision detection
 """
 
 import fitz  # PyMuPDF
-import cv2
-import numpy as np
 import json
 import os
-from typing import Dict, List, Tuple, Any
-from PIL import Image
-import pytesseract
+from typing import Dict
+
+try:
+    from page_rasterizer import page_rasterizer, cached_page_text
+    from line_detector import detect_lines, line_positions
+    from template_fingerprint import IncrementalTemplateAnalysis, code_version
+    from checkbox_detector import detect_checkboxes, box_left_of
+except ImportError:
+    from backend.page_rasterizer import page_rasterizer, cached_page_text
+    from backend.line_detector import detect_lines, line_positions
+    from backend.template_fingerprint import IncrementalTemplateAnalysis, code_version
+    from backend.checkbox_detector import detect_checkboxes, box_left_of
+
 
 class TemplateMeasurementSystem:
     """Precisely measure actual JO template for pixel-perfect positioning"""
@@ -20,8 +28,12 @@ class TemplateMeasurementSystem:
         self.door_template = r'C:\Users\USER\Desktop\Project management\Sendora\Material\JOB ORDER FORM -DOOR.pdf'
         self.measurements = {}
         
-    def measure_template_precisely(self):
-        """Measure the actual template with extreme precision"""
+    def measure_template_precisely(self, force: bool = False):
+        """Measure the actual template with extreme precision
+
+        If the template's first page is unchanged since the last run (by
+        fingerprint), the stored measurements are reused; force re-measures.
+        """
         
         print("=" * 60)
         print("TEMPLATE MEASUREMENT SYSTEM")
@@ -32,6 +44,16 @@ class TemplateMeasurementSystem:
             print(f"Template not found: {self.door_template}")
             return None
         
+        analysis = IncrementalTemplateAnalysis(self.door_template, 'template_measurements.json',
+                                               'template_measurements', pages=[0], force=force,
+                                               version=code_version(TemplateMeasurementSystem, detect_lines,
+                                                                    detect_checkboxes))
+        if not analysis.pages_to_analyze():
+            print("\nTemplate unchanged since the last measurement - reusing it")
+            measurements = analysis.page_results()[0]
+            self.save_measurements(measurements)
+            return measurements
+        
         # Open template
         doc = fitz.open(self.door_template)
         page = doc[0]
@@ -44,18 +66,9 @@ class TemplateMeasurementSystem:
         print(f"\nTemplate Dimensions: {page_width:.2f} x {page_height:.2f} points")
         print(f"Format: {'Landscape A4' if page_width > page_height else 'Portrait A4'}")
         
-        # Convert to high-res image for AI vision analysis
-        mat = fitz.Matrix(3, 3)  # 3x zoom for precision
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("png")
-        
-        # Save for analysis
-        temp_img = "temp_template_analysis.png"
-        pix.save(temp_img)
-        
-        # Load with OpenCV
-        img = cv2.imread(temp_img)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        # High-res grayscale render for AI vision analysis (3x zoom), shared with
+        # the other template analyzers and built straight from the pixmap samples
+        gray = page_rasterizer.render_template(self.door_template, 0, scale=3.0)
         
         # Measure using multiple methods
         measurements = {
@@ -70,12 +83,12 @@ class TemplateMeasurementSystem:
             'footer_fields': self.measure_footer_fields(page, gray, 3.0)
         }
         
-        # Clean up
-        os.remove(temp_img)
         doc.close()
         
         # Save measurements
         self.save_measurements(measurements)
+        analysis.set(0, measurements)
+        analysis.save()
         
         return measurements
     
@@ -85,7 +98,7 @@ class TemplateMeasurementSystem:
         print("\nMeasuring header fields...")
         
         # Get text with positions
-        text_dict = page.get_text("dict")
+        text_dict = cached_page_text(page)
         
         header_fields = {}
         
@@ -168,25 +181,12 @@ class TemplateMeasurementSystem:
         
         print("\nMeasuring table structure...")
         
-        # Detect table lines using computer vision
-        edges = cv2.Canny(gray_img, 50, 150, apertureSize=3)
-        
-        # Detect horizontal lines (table rows)
-        lines = cv2.HoughLinesP(edges, 1, np.pi/180, threshold=100, 
-                                minLineLength=200, maxLineGap=10)
+        # Horizontal rules of the table, merged into one position per line
+        lines = detect_lines(gray_img, scale=scale, min_length=200, max_gap=10)
         
         # Find table boundaries
-        horizontal_lines = []
-        if lines is not None:
-            for line in lines:
-                x1, y1, x2, y2 = line[0]
-                if abs(y2 - y1) < 5:  # Horizontal line
-                    y_pos = y1 / scale  # Convert back to PDF scale
-                    if 150 < y_pos < 500:  # Table area
-                        horizontal_lines.append(y_pos)
-        
-        # Sort and deduplicate
-        horizontal_lines = sorted(set(horizontal_lines))
+        horizontal_lines = [float(y) for y in line_positions(lines['horizontal'])
+                            if 150 < y < 500]  # Table area
         
         # Identify table rows (gaps between lines)
         table_rows = []
@@ -202,7 +202,7 @@ class TemplateMeasurementSystem:
                 })
         
         # Measure column positions from template
-        text_dict = page.get_text("dict")
+        text_dict = cached_page_text(page)
         
         column_headers = {
             'ITEM': 36,
@@ -252,10 +252,10 @@ class TemplateMeasurementSystem:
         
         print("\nMeasuring checkbox positions...")
         
-        # Find checkbox symbols using pattern matching
-        # Checkboxes typically appear as small squares
+        # Printed checkbox squares, found in one connected-components pass
+        boxes = detect_checkboxes(gray_img, scale)
         
-        text_dict = page.get_text("dict")
+        text_dict = cached_page_text(page)
         
         checkbox_groups = {
             'door_thickness': [],
@@ -297,16 +297,23 @@ class TemplateMeasurementSystem:
                         if option_text in text:
                             bbox = span['bbox']
                             
-                            # Checkbox is typically 10-15 points to the left of text
-                            checkbox_x = bbox[0] - 15
-                            checkbox_y = bbox[1]
+                            box = box_left_of(boxes, bbox)
+                            if box is not None:
+                                # Measured square just left of the option text
+                                checkbox_x, checkbox_y = float(box[0]), float(box[1])
+                                checkbox_size = round(float(max(box[2] - box[0], box[3] - box[1])), 1)
+                            else:
+                                # Checkbox is typically 10-15 points to the left of text
+                                checkbox_x = bbox[0] - 15
+                                checkbox_y = bbox[1]
+                                checkbox_size = 8
                             
                             checkbox_groups[group].append({
                                 'option': option_text,
                                 'checkbox_position': {
                                     'x': checkbox_x,
                                     'y': checkbox_y,
-                                    'size': 8
+                                    'size': checkbox_size
                                 },
                                 'text_position': {
                                     'x': bbox[0],
@@ -315,7 +322,7 @@ class TemplateMeasurementSystem:
                             })
         
         total_checkboxes = sum(len(group) for group in checkbox_groups.values())
-        print(f"  Found {total_checkboxes} checkbox positions")
+        print(f"  Found {total_checkboxes} checkbox positions ({len(boxes)} printed boxes detected)")
         
         return checkbox_groups
     
@@ -422,13 +429,15 @@ class TemplateMeasurementSystem:
 
 # Run the measurement system
 if __name__ == "__main__":
+    import sys
+    
     measurer = TemplateMeasurementSystem()
     
     print("Starting precise template measurement...")
     print("This ensures your JO format remains 100% identical")
     print("No changes to your existing SOP required!\n")
     
-    measurements = measurer.measure_template_precisely()
+    measurements = measurer.measure_template_precisely(force='--force' in sys.argv)
     
     if measurements:
         print("\n" + "=" * 60)
@@ -6,13 +6,9 @@ Uses actual Sendora JO template PDFs and overlays parsed data directly onto them
 import os
 from datetime import datetime
 from typing import Dict, List, Any, Optional
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.units import mm
-from reportlab.lib import colors
-from PyPDF2 import PdfReader, PdfWriter
-from reportlab.pdfgen.canvas import Canvas
 import io
+# ReportLab and PyPDF2 are imported in the methods that draw and merge pages,
+# so creating the generator at app startup does not load them
 
 
 class SendoraTemplateOverlay:
@@ -125,6 +121,7 @@ class SendoraTemplateOverlay:
     
     def _overlay_frame_template(self, data: Dict[str, Any], template_path: str, output_path: str):
         """Overlay data on FRAME template"""
+        from PyPDF2 import PdfReader, PdfWriter
         
         try:
             # Read the original template
@@ -158,6 +155,8 @@ class SendoraTemplateOverlay:
     
     def _create_frame_overlay(self, data: Dict[str, Any]) -> io.BytesIO:
         """Create overlay data for frame template"""
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
         
         buffer = io.BytesIO()
         c = canvas.Canvas(buffer, pagesize=A4)
@@ -244,6 +243,7 @@ class SendoraTemplateOverlay:
     
     def _overlay_door_template(self, data: Dict[str, Any], template_path: str, output_path: str):
         """Overlay data on DOOR template"""
+        from PyPDF2 import PdfReader, PdfWriter
         
         try:
             print(f"DEBUG: Opening template file: {template_path}")
@@ -307,6 +307,9 @@ class SendoraTemplateOverlay:
     
     def _create_door_overlay(self, data: Dict[str, Any]) -> io.BytesIO:
         """Create overlay data for door template"""
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib import colors
         
         # DEBUG: Print extracted data to console
         print("DEBUG: Extracted data structure:")
@@ -374,6 +377,7 @@ class SendoraTemplateOverlay:
     
     def _overlay_general_template(self, data: Dict[str, Any], template_path: str, output_path: str):
         """Overlay data on GENERAL template"""
+        from PyPDF2 import PdfReader, PdfWriter
         
         try:
             # For general template, we'll create a simple overlay
@@ -398,6 +402,8 @@ class SendoraTemplateOverlay:
     
     def _create_fallback_jo(self, data: Dict[str, Any], output_path: str):
         """Create a fallback JO when template overlay fails"""
+        from reportlab.pdfgen import canvas
+        from reportlab.lib.pagesizes import A4
         
         c = canvas.Canvas(output_path, pagesize=A4)
         
@@ -0,0 +1,137 @@
+"""
+Tesseract Word Cache
+Runs Tesseract once per page raster and keeps the word boxes, keyed by a hash
+of the raster's pixels (plus the Tesseract config). Every later question about
+that page, such as the words in a region, the words matching a label, the
+page text or the mean confidence, is answered from the cached boxes without
+another Tesseract run.
+
+Rasters from the shared page_rasterizer cache are identical for identical
+template revisions, so repeated analyses of the same template hit the cache.
+"""
+
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Any, Tuple
+
+import numpy as np
+
+try:
+    from pipeline_metrics import pipeline_metrics
+except ImportError:
+    from backend.pipeline_metrics import pipeline_metrics
+
+WORD_CACHE_ENTRIES = 32
+
+
+def raster_hash(image: np.ndarray) -> str:
+    """Content hash of a raster (pixels, shape and dtype)"""
+    image = np.ascontiguousarray(image)
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{image.shape}{image.dtype}".encode('ascii'))
+    digest.update(memoryview(image).cast('B'))
+    return digest.hexdigest()
+
+
+class PageWords:
+    """Word boxes of one raster from a single image_to_data call"""
+
+    def __init__(self, data: Dict[str, List]):
+        self.data = data
+        self.text = [str(t) for t in data['text']]
+        self.conf = np.array([float(c) for c in data['conf']], dtype=np.float64)
+        self.left = np.array(data['left'], dtype=np.int64)
+        self.top = np.array(data['top'], dtype=np.int64)
+        self.right = self.left + np.array(data['width'], dtype=np.int64)
+        self.bottom = self.top + np.array(data['height'], dtype=np.int64)
+        self.is_word = np.array([bool(t.strip()) for t in self.text]) & (self.conf >= 0)
+
+    def __len__(self):
+        return int(self.is_word.sum())
+
+    def words(self, min_conf: float = -1) -> List[Dict[str, Any]]:
+        """Words as dicts with pixel bbox and confidence, in reading order"""
+        return [self._word(i) for i in np.flatnonzero(self.is_word & (self.conf > min_conf))]
+
+    def in_region(self, x0: float, y0: float, x1: float, y1: float,
+                  min_conf: float = -1) -> List[Dict[str, Any]]:
+        """Words whose box lies inside the pixel rectangle"""
+        inside = (self.is_word & (self.conf > min_conf) & (self.left >= x0) & (self.top >= y0)
+                  & (self.right <= x1) & (self.bottom <= y1))
+        return [self._word(i) for i in np.flatnonzero(inside)]
+
+    def matching(self, needle: str, min_conf: float = -1) -> List[Dict[str, Any]]:
+        """Words containing needle (case-insensitive)"""
+        needle = needle.lower()
+        return [word for word in self.words(min_conf) if needle in word['text'].lower()]
+
+    def region_text(self, x0: float, y0: float, x1: float, y1: float, min_conf: float = -1) -> str:
+        return ' '.join(word['text'] for word in self.in_region(x0, y0, x1, y1, min_conf))
+
+    def page_text(self) -> str:
+        """Text laid out by Tesseract's block/paragraph/line numbering (as image_to_string)"""
+        lines: 'OrderedDict[Tuple, List[str]]' = OrderedDict()
+        for i in np.flatnonzero(self.is_word):
+            key = (self.data['block_num'][i], self.data['par_num'][i], self.data['line_num'][i])
+            lines.setdefault(key, []).append(self.text[i].strip())
+        return '\n'.join(' '.join(words) for words in lines.values())
+
+    def mean_confidence(self) -> float:
+        """Mean word confidence in 0..1 (0.5 when the page has no words)"""
+        confidences = self.conf[self.is_word]
+        return float(confidences.mean() / 100.0) if confidences.size else 0.5
+
+    def _word(self, i: int) -> Dict[str, Any]:
+        return {
+            'text': self.text[i].strip(),
+            'conf': float(self.conf[i]),
+            'left': int(self.left[i]), 'top': int(self.top[i]),
+            'width': int(self.right[i] - self.left[i]), 'height': int(self.bottom[i] - self.top[i])
+        }
+
+
+class TesseractWordCache:
+    """LRU cache of PageWords keyed by raster hash and Tesseract config"""
+
+    def __init__(self, max_entries: int = WORD_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.pages: 'OrderedDict[Tuple[str, str], PageWords]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def page_words(self, image: np.ndarray, config: str = '') -> PageWords:
+        """Word boxes of a page raster, running Tesseract only on a cache miss"""
+        key = (raster_hash(image), config)
+        with self.lock:
+            cached = self.pages.get(key)
+            if cached is not None:
+                self.pages.move_to_end(key)
+                self.hits += 1
+                pipeline_metrics.increment('tesseract.cache_hits')
+                return cached
+            self.misses += 1
+
+        import pytesseract
+
+        start = time.time()
+        data = pytesseract.image_to_data(image, config=config, output_type=pytesseract.Output.DICT)
+        pipeline_metrics.observe('tesseract.page_seconds', time.time() - start)
+        pipeline_metrics.increment('tesseract.calls')
+
+        words = PageWords(data)
+        with self.lock:
+            self.pages[key] = words
+            while len(self.pages) > self.max_entries:
+                self.pages.popitem(last=False)
+        return words
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {'cached_pages': len(self.pages), 'hits': self.hits, 'misses': self.misses}
+
+
+# Shared instance used across the backend modules
+tesseract_words = TesseractWordCache()
@@ -8,10 +8,23 @@ import cv2
 import numpy as np
 import json
 import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, List, Tuple, Any
-import pytesseract
 from PIL import Image
 
+try:
+    from page_rasterizer import page_rasterizer
+    from line_detector import detect_lines
+    from tesseract_cache import tesseract_words
+    from template_fingerprint import IncrementalTemplateAnalysis, code_version
+except ImportError:
+    from backend.page_rasterizer import page_rasterizer
+    from backend.line_detector import detect_lines
+    from backend.tesseract_cache import tesseract_words
+    from backend.template_fingerprint import IncrementalTemplateAnalysis, code_version
+
+
 class VisualTemplateAnalyzer:
     """Analyze template structure using computer vision"""
     
@@ -22,25 +35,54 @@ class VisualTemplateAnalyzer:
             'combined': r'C:\Users\USER\Desktop\Project management\Sendora\Material\JOB ORDER FORM.pdf'
         }
         
-    def analyze_all_templates(self):
-        """Analyze all templates with computer vision"""
-        
-        results = {}
-        
+    def analyze_all_templates(self, workers: int = 1, force: bool = False):
+        """Analyze all templates with computer vision
+
+        Templates whose first page is unchanged since the last run (by
+        fingerprint) reuse their stored spec; force re-analyzes everything.
+        With workers > 1 each template is analyzed in its own process (line
+        detection, Tesseract and table detection are all CPU-bound); results
+        are collected in template order, so the spec files match a sequential run.
+        """
+        
+        analyses = {}
         for template_name, template_path in self.template_paths.items():
             if os.path.exists(template_path):
-                print(f"\n🔍 Analyzing {template_name} template with computer vision...")
-                coords = self.analyze_template_visually(template_path, template_name)
-                results[template_name] = coords
-                
-                # Save precise specifications
-                spec_file = f"visual_{template_name}_spec.json"
-                with open(spec_file, 'w', encoding='utf-8') as f:
-                    json.dump(coords, f, indent=2, ensure_ascii=False)
-                print(f"✅ Saved: {spec_file}")
+                analyses[template_name] = IncrementalTemplateAnalysis(
+                    template_path, f"visual_{template_name}_spec.json", 'visual_spec', pages=[0], force=force,
+                    version=code_version(VisualTemplateAnalyzer, detect_lines, tesseract_words))
             else:
                 print(f"❌ Template not found: {template_path}")
         
+        pending = {template_name: analysis.pdf_path for template_name, analysis in analyses.items()
+                   if analysis.pages_to_analyze()}
+        if workers > 1 and len(pending) > 1:
+            print(f"\n🔍 Analyzing {len(pending)} templates with computer vision ({workers} processes)...")
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+                specs = dict(zip(pending, pool.map(_analyze_template_in_worker, pending.items())))
+        else:
+            specs = {}
+            for template_name, template_path in pending.items():
+                print(f"\n🔍 Analyzing {template_name} template with computer vision...")
+                specs[template_name] = self.analyze_template_visually(template_path, template_name)
+        
+        results = {}
+        
+        for template_name, analysis in analyses.items():
+            if template_name in specs:
+                analysis.set(0, specs[template_name])
+            else:
+                print(f"\n♻️ {template_name} template unchanged, reusing its visual spec")
+            coords = analysis.page_results()[0]
+            results[template_name] = coords
+            
+            # Save precise specifications
+            spec_file = f"visual_{template_name}_spec.json"
+            with open(spec_file, 'w', encoding='utf-8') as f:
+                json.dump(coords, f, indent=2, ensure_ascii=False)
+            analysis.save()
+            print(f"✅ Saved: {spec_file}")
+        
         return results
     
     def analyze_template_visually(self, pdf_path: str, template_name: str) -> Dict:
@@ -55,18 +97,11 @@ class VisualTemplateAnalyzer:
         page_width = rect.width
         page_height = rect.height
         
-        # Convert to image
-        mat = fitz.Matrix(2, 2)  # 2x zoom for better quality
-        pix = page.get_pixmap(matrix=mat)
-        img_data = pix.tobytes("png")
-        
-        # Load with OpenCV
-        nparr = np.frombuffer(img_data, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
         doc.close()
         
+        # Grayscale render at 2x zoom from the shared template cache (no PNG round trip)
+        gray = page_rasterizer.render_template(pdf_path, 0, scale=2.0)
+        
         # Detect form structure
         coordinates = {
             'template_name': template_name,
@@ -94,37 +129,24 @@ class VisualTemplateAnalyzer:
     def detect_form_lines(self, gray_img: np.ndarray, coordinates: Dict, scale_factor: float):
         """Detect horizontal and vertical lines in the form"""
         
-        # Detect horizontal lines
-        horizontal_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1))
-        horizontal_lines = cv2.morphologyEx(gray_img, cv2.MORPH_OPEN, horizontal_kernel, iterations=2)
-        
-        # Detect vertical lines  
-        vertical_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40))
-        vertical_lines = cv2.morphologyEx(gray_img, cv2.MORPH_OPEN, vertical_kernel, iterations=2)
-        
-        # Find line coordinates
-        h_lines = cv2.HoughLinesP(horizontal_lines, 1, np.pi/180, threshold=100, minLineLength=100, maxLineGap=10)
-        v_lines = cv2.HoughLinesP(vertical_lines, 1, np.pi/180, threshold=100, minLineLength=50, maxLineGap=10)
+        # Merged line strokes from projection profiles (minimum lengths as the old Hough pass)
+        lines = detect_lines(gray_img, scale=scale_factor, min_length=100, min_vertical_length=50, max_gap=10)
         
         form_lines = []
         
-        if h_lines is not None:
-            for line in h_lines:
-                x1, y1, x2, y2 = line[0]
-                form_lines.append({
-                    'type': 'horizontal',
-                    'x1': x1 / scale_factor, 'y1': y1 / scale_factor,
-                    'x2': x2 / scale_factor, 'y2': y2 / scale_factor
-                })
+        for y, x1, x2, _ in lines['horizontal'].tolist():
+            form_lines.append({
+                'type': 'horizontal',
+                'x1': x1, 'y1': y,
+                'x2': x2, 'y2': y
+            })
         
-        if v_lines is not None:
-            for line in v_lines:
-                x1, y1, x2, y2 = line[0]
-                form_lines.append({
-                    'type': 'vertical',
-                    'x1': x1 / scale_factor, 'y1': y1 / scale_factor,
-                    'x2': x2 / scale_factor, 'y2': y2 / scale_factor
-                })
+        for x, y1, y2, _ in lines['vertical'].tolist():
+            form_lines.append({
+                'type': 'vertical',
+                'x1': x, 'y1': y1,
+                'x2': x, 'y2': y2
+            })
         
         coordinates['form_lines'] = form_lines
         print(f"📏 Detected {len(form_lines)} form lines")
@@ -134,8 +156,8 @@ class VisualTemplateAnalyzer:
         
         # Use Tesseract to detect text blocks
         try:
-            # Get text with bounding boxes
-            data = pytesseract.image_to_data(gray_img, output_type=pytesseract.Output.DICT)
+            # Word boxes from one Tesseract run per raster, shared through the cache
+            page_words = tesseract_words.page_words(gray_img)
             
             header_fields = {}
             
@@ -149,27 +171,26 @@ class VisualTemplateAnalyzer:
                 'measure by': 'measure_by'
             }
             
-            for i, text in enumerate(data['text']):
-                if data['conf'][i] > 30:  # Confidence threshold
-                    text_lower = text.lower().strip()
-                    
-                    # Check if this text matches a field label
-                    for label, field_name in field_labels.items():
-                        if label in text_lower and len(text_lower) > 3:
-                            x = data['left'][i] / scale_factor
-                            y = data['top'][i] / scale_factor
-                            w = data['width'][i] / scale_factor
-                            h = data['height'][i] / scale_factor
-                            
-                            # Position data field to the right of label
-                            data_x = x + w + 10
-                            data_y = y
-                            
-                            header_fields[field_name] = {
-                                'label_position': {'x': x, 'y': y, 'width': w, 'height': h},
-                                'data_position': {'x': data_x, 'y': data_y, 'width': 150, 'height': h},
-                                'font_size': max(8, min(h, 12))
-                            }
+            for word in page_words.words(min_conf=30):  # Confidence threshold
+                text_lower = word['text'].lower()
+                
+                # Check if this text matches a field label
+                for label, field_name in field_labels.items():
+                    if label in text_lower and len(text_lower) > 3:
+                        x = word['left'] / scale_factor
+                        y = word['top'] / scale_factor
+                        w = word['width'] / scale_factor
+                        h = word['height'] / scale_factor
+                        
+                        # Position data field to the right of label
+                        data_x = x + w + 10
+                        data_y = y
+                        
+                        header_fields[field_name] = {
+                            'label_position': {'x': x, 'y': y, 'width': w, 'height': h},
+                            'data_position': {'x': data_x, 'y': data_y, 'width': 150, 'height': h},
+                            'font_size': max(8, min(h, 12))
+                        }
             
             coordinates['header_fields'] = header_fields
             print(f"📝 Detected {len(header_fields)} header fields")
@@ -302,15 +323,28 @@ class VisualTemplateAnalyzer:
         return overlay_spec
 
 
+def _analyze_template_in_worker(job) -> Dict:
+    """Process-pool entry point: (template_name, template_path) -> overlay spec"""
+    template_name, template_path = job
+    return VisualTemplateAnalyzer().analyze_template_visually(template_path, template_name)
+
+
 # Main execution
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Analyze the Sendora JO templates with computer vision')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes for per-template analysis (1 = sequential)')
+    parser.add_argument('--force', action='store_true',
+                        help='Re-analyze every template even if its fingerprint is unchanged')
+    args = parser.parse_args()
+    
     analyzer = VisualTemplateAnalyzer()
     
     print("🤖 Visual Template Analysis Starting...")
     print("=" * 60)
     
     try:
-        results = analyzer.analyze_all_templates()
+        results = analyzer.analyze_all_templates(workers=args.workers, force=args.force)
         
         print("\n" + "=" * 60)
         print("✅ Visual analysis complete!")
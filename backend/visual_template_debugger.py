@@ -8,6 +8,12 @@ import fitz  # PyMuPDF
 import os
 from typing import Dict, List, Tuple
 
+try:
+    from page_rasterizer import cached_page_text
+except ImportError:
+    from backend.page_rasterizer import cached_page_text
+
+
 class VisualTemplateDebugger:
     """Debug and visualize exact positions on template"""
     
@@ -150,7 +156,7 @@ class VisualTemplateDebugger:
         page = doc[0]
         
         # Get all text with exact positions
-        text_dict = page.get_text("dict")
+        text_dict = cached_page_text(page)
         
         measurements = {
             'page_size': [page.rect.width, page.rect.height],
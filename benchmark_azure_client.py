@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Azure Form Recognizer submit/poll path against the local stand-in.
+Compares the old per-call requests + fixed 1s polling with the pooled client
+that honors Retry-After and backs off with jitter.
+
+    python benchmark_azure_client.py --docs 40 --concurrency 8 --processing 2.0
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from azure_standin_server import start_standin
+from pipeline_metrics import pipeline_metrics
+
+
+def legacy_submit_and_poll(endpoint, api_key, image_data, max_wait=30):
+    """The pre-pooling behaviour: new connection per call, fixed 1s poll"""
+    response = requests.post(
+        f"{endpoint}formrecognizer/v3.1/layout/analyze",
+        headers={'Ocp-Apim-Subscription-Key': api_key, 'Content-Type': 'application/octet-stream'},
+        data=image_data
+    )
+    operation_location = response.headers['Operation-Location']
+    start_time = time.time()
+    polls = 0
+    while time.time() - start_time < max_wait:
+        response = requests.get(operation_location, headers={'Ocp-Apim-Subscription-Key': api_key})
+        polls += 1
+        if response.status_code == 200 and response.json()['status'] == 'succeeded':
+            return polls
+        time.sleep(1)
+    raise Exception("Analysis timed out")
+
+
+def run(label, call, docs, concurrency, endpoint):
+    requests.post(f"{endpoint}reset")
+    latencies = []
+
+    def timed(_):
+        start = time.time()
+        call()
+        latencies.append(time.time() - start)
+
+    wall_start = time.time()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, range(docs)))
+    wall = time.time() - wall_start
+
+    stats = requests.get(f"{endpoint}stats").json()
+    latencies.sort()
+    print(f"{label:<22} wall {wall:6.2f}s | p50 {statistics.median(latencies):5.2f}s "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1]:5.2f}s | "
+          f"polls/doc {stats['poll_requests'] / docs:4.1f} | connections {stats['connections']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Azure client polling benchmark (local stand-in)')
+    parser.add_argument('--docs', type=int, default=40)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--processing', type=float, default=2.0, help='Stand-in analysis time (s)')
+    parser.add_argument('--jitter', type=float, default=0.5)
+    parser.add_argument('--retry-after', type=float, default=1.0, help='Negative to omit the header')
+    args = parser.parse_args()
+
+    retry_after = args.retry_after if args.retry_after >= 0 else None
+    server = start_standin(processing_seconds=args.processing, jitter=args.jitter, retry_after=retry_after)
+    endpoint = f"http://127.0.0.1:{server.server_port}/"
+    os.environ['AZURE_FORM_RECOGNIZER_ENDPOINT'] = endpoint
+
+    from azure_form_recognizer import SendoraFormRecognizer, AZURE_MAX_CONCURRENT
+    recognizer = SendoraFormRecognizer()
+    image_data = os.urandom(200 * 1024)
+
+    print(f"{args.docs} docs, {args.concurrency} client threads, analysis {args.processing}s "
+          f"+ up to {args.jitter}s, Retry-After {retry_after}, client cap {AZURE_MAX_CONCURRENT}")
+    run('legacy (1s fixed poll)', lambda: legacy_submit_and_poll(endpoint, recognizer.api_key, image_data),
+        args.docs, args.concurrency, endpoint)
+    run('pooled + adaptive', lambda: recognizer._submit_and_poll(image_data),
+        args.docs, args.concurrency, endpoint)
+
+    timings = pipeline_metrics.snapshot()['timings']
+    print(f"slot wait p95 {timings['azure.slot_wait_seconds']['p95']:.2f}s, "
+          f"poll phase p50 {timings['azure.poll_seconds']['p50']:.2f}s")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
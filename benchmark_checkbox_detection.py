@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark the batched checkbox detector (one connectedComponentsWithStats call
+plus integral-image masks) against a per-contour loop: findContours, then
+boundingRect and the same size, border and empty-middle checks on a slice of
+the binary image for every contour, and rows grouped in a Python loop.
+
+Runs on the door, frame and combined templates at the measurement system's
+3x raster and reports time, boxes found and whether both methods agree.
+
+    python benchmark_checkbox_detection.py
+    python benchmark_checkbox_detection.py --templates door.pdf frame.pdf combined.pdf
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from page_rasterizer import page_rasterizer
+from checkbox_detector import detect_checkboxes, MIN_SIZE, MAX_SIZE, MAX_ASPECT, MIN_BORDER_INK, ROW_TOLERANCE
+
+OPTIONS = {
+    'door': ['37mm', '43mm', '48mm', 'S/L', 'D/L', 'Unequal D/L', 'Honeycomb', 'Solid Tubular Core',
+             'Solid Timber', 'Metal Skeleton', 'NA Lipping', 'ABS Edging', 'No Edging', 'T-bar', 'Groove Line'],
+    'frame': ['INNER', 'OUTER', 'Rebated', 'Non Rebated', 'Single Rebate', 'Double Rebate']
+}
+
+
+def contour_loop(gray, scale):
+    """Per-contour detection as a loop over findContours output"""
+    _, binary = cv2.threshold(np.asarray(gray), 127, 1, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not (MIN_SIZE * scale <= w <= MAX_SIZE * scale and MIN_SIZE * scale <= h <= MAX_SIZE * scale):
+            continue
+        if max(w, h) > MAX_ASPECT * min(w, h):
+            continue
+        crop = binary[y:y + h, x:x + w]
+        border = int(crop.sum()) - int(crop[1:-1, 1:-1].sum())
+        if border < MIN_BORDER_INK * (2 * (w + h) - 4):
+            continue
+        if crop[h // 4:h - h // 4, w // 4:w - w // 4].any():
+            continue
+        boxes.append([x / scale, y / scale, (x + w) / scale, (y + h) / scale])
+    boxes.sort(key=lambda b: (b[1] + b[3]) / 2)
+    rows, current = [], []
+    for box in boxes:
+        if current and (box[1] + box[3]) / 2 - (current[-1][1] + current[-1][3]) / 2 > ROW_TOLERANCE:
+            rows.append(sorted(current))
+            current = []
+        current.append(box)
+    if current:
+        rows.append(sorted(current))
+    return [box for row in rows for box in row]
+
+
+def draw_page(page, options, rows=16):
+    """Ruled table rows with an option checkbox block in each, plus header text"""
+    for i, label in enumerate(['Job Order No:', 'Job Order Date:', 'PO NO:', 'Delivery Date:']):
+        page.insert_text((40 + (i % 2) * 500, 40 + (i // 2) * 14), label, fontsize=9)
+    top, row_height = 80.0, 30.0
+    for r in range(rows + 1):
+        page.draw_line((30, top + r * row_height), (812, top + r * row_height), width=0.8)
+    boxes = 0
+    for r in range(rows):
+        for o, option in enumerate(options[:6]):
+            option = options[(r + o) % len(options)]
+            x, y = 40 + o * 128, top + r * row_height + 12
+            page.draw_rect(fitz.Rect(x, y - 7, x + 7, y), width=0.5)
+            page.insert_text((x + 10, y), option, fontsize=7)
+            boxes += 1
+        page.insert_text((40, top + r * row_height + 25), f"Remarks row {r + 1}: Oo 0 [] ABCD", fontsize=6)
+    return boxes
+
+
+def synthetic_templates(directory):
+    paths, expected = {}, {}
+    for name, layout in (('door', ['door']), ('frame', ['frame']), ('combined', ['door', 'frame'])):
+        doc = fitz.open()
+        expected[name] = sum(draw_page(doc.new_page(width=842, height=595), OPTIONS[kind]) for kind in layout)
+        paths[name] = os.path.join(directory, f"{name}_template.pdf")
+        doc.save(paths[name])
+        doc.close()
+    return paths, expected
+
+
+def timed(fn, pages, repeat):
+    times, found = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        found = [np.asarray(fn(gray, 3.0)).reshape(-1, 4) for gray in pages]
+        times.append((time.perf_counter() - start) * 1000)
+    return found, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Checkbox detection benchmark')
+    parser.add_argument('--templates', nargs=3, metavar=('DOOR', 'FRAME', 'COMBINED'))
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    if args.templates:
+        paths, expected = dict(zip(('door', 'frame', 'combined'), args.templates)), {}
+    else:
+        paths, expected = synthetic_templates(tempfile.mkdtemp(prefix='checkbox_bench_'))
+
+    print(f"{'template':<10}{'pages':>6}{'loop ms':>9}{'batched ms':>12}{'speedup':>9}"
+          f"{'loop boxes':>12}{'batched':>9}{'printed':>9}{'agree':>7}")
+    for name, path in paths.items():
+        pages = [page_rasterizer.render_template(path, n, scale=3.0)
+                 for n in range(page_rasterizer.page_count(path))]
+        loop, loop_ms = timed(contour_loop, pages, args.repeat)
+        batched, batched_ms = timed(detect_checkboxes, pages, args.repeat)
+        agree = all(a.shape == b.shape and np.allclose(a, b, atol=0.5) for a, b in zip(loop, batched))
+        print(f"{name:<10}{len(pages):>6}{loop_ms:>9.1f}{batched_ms:>12.1f}{loop_ms / batched_ms:>8.1f}x"
+              f"{sum(len(a) for a in loop):>12}{sum(len(b) for b in batched):>9}"
+              f"{expected.get(name, '-'):>9}{str(agree):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the health endpoints of the production app through Flask's test
+client. "Before" is what every /health hit used to do: build a
+GoogleDocumentProcessor (credentials read, gRPC client created) and stat the
+wkhtmltopdf binary. /health, /health/live and /health/ready now only read the
+probe results that the background refresher caches.
+
+    python benchmark_health_checks.py
+    python benchmark_health_checks.py --requests 2000
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+
+def per_call_us(fn, count):
+    times = []
+    for _ in range(count):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(times), sorted(times)[int(len(times) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Health endpoint benchmark')
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--before', type=int, default=20, help='Calls of the old per-request check')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='health_bench_')
+    for name in ('UPLOAD_FOLDER', 'OUTPUT_FOLDER'):
+        os.environ.setdefault(name, os.path.join(workdir, name.lower()))
+        os.makedirs(os.environ[name], exist_ok=True)
+
+    from backend.app_v2_production import app
+    from backend.health_checks import health_checks
+    from backend.google_document_ai import GoogleDocumentProcessor
+
+    def before():
+        processor = GoogleDocumentProcessor()
+        return processor.client is not None, os.path.exists('/usr/bin/wkhtmltopdf')
+
+    client = app.test_client()
+    client.get('/health/ready')          # starts the refresher
+    deadline = time.time() + 30
+    while any(check['state'] == 'pending' for check in health_checks.status()['checks'].values()):
+        if time.time() > deadline:
+            sys.exit('probes did not report within 30s')
+        time.sleep(0.1)
+
+    print(f"{'check':<36}{'median us':>11}{'p99 us':>10}")
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')   # GoogleDocumentProcessor prints on every construction
+    try:
+        old = per_call_us(before, args.before)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    print(f"{'old /health work (per request)':<36}{old[0]:>11.0f}{old[1]:>10.0f}")
+    for path in ('/health', '/health/live', '/health/ready'):
+        median, p99 = per_call_us(lambda: client.get(path), args.requests)
+        print(f"{path + ' (test client)':<36}{median:>11.0f}{p99:>10.0f}")
+    median, p99 = per_call_us(health_checks.status, args.requests)
+    print(f"{'health_checks.status()':<36}{median:>11.1f}{p99:>10.1f}")
+
+    status = health_checks.status()
+    print(f"\nready: {status['ready']} ({status['status']})")
+    for name, check in status['checks'].items():
+        print(f"  {name:<20}{check['state']:<9}probe {check.get('duration_ms', '-')} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark the projection-profile line detector against the HoughLinesP passes
+it replaced in VisualTemplateAnalyzer.detect_form_lines (morphology + Hough
+at 2x) and TemplateMeasurementSystem.measure_table_structure (Canny + Hough
+at 3x).
+
+On the synthetic template the ruled lines are known, so each method is scored
+for recall (ruled lines found) and stray detections (output not on any ruled
+line). On real templates the two methods are scored against each other.
+
+    python benchmark_line_detection.py
+    python benchmark_line_detection.py "JOB ORDER FORM -DOOR.pdf" "JOB ORDER FORM  - FRAME.pdf"
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from page_rasterizer import page_rasterizer
+from line_detector import detect_lines, line_positions
+
+TOLERANCE = 1.5  # points
+
+
+def hough_form_lines(gray, scale):
+    """VisualTemplateAnalyzer.detect_form_lines before the line detector: (y, x0, x1) / (x, y0, y1) segments"""
+    horizontal = cv2.morphologyEx(gray, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (40, 1)),
+                                  iterations=2)
+    vertical = cv2.morphologyEx(gray, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, 40)),
+                                iterations=2)
+    h = cv2.HoughLinesP(horizontal, 1, np.pi / 180, threshold=100, minLineLength=100, maxLineGap=10)
+    v = cv2.HoughLinesP(vertical, 1, np.pi / 180, threshold=100, minLineLength=50, maxLineGap=10)
+    h = np.empty((0, 4)) if h is None else h.reshape(-1, 4) / scale
+    v = np.empty((0, 4)) if v is None else v.reshape(-1, 4) / scale
+    return ([(y1, min(x1, x2), max(x1, x2)) for x1, y1, x2, y2 in h],
+            [(x1, min(y1, y2), max(y1, y2)) for x1, y1, x2, y2 in v])
+
+
+def hough_row_rules(gray, scale):
+    """TemplateMeasurementSystem.measure_table_structure before the line detector: rule y positions"""
+    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=100, minLineLength=200, maxLineGap=10)
+    found = []
+    if lines is not None:
+        for x1, y1, x2, y2 in lines.reshape(-1, 4):
+            if abs(y2 - y1) < 5 and 150 < y1 / scale < 500:
+                found.append(y1 / scale)
+    return sorted(set(found))
+
+
+def projection_form_lines(gray, scale):
+    lines = detect_lines(gray, scale=scale, min_length=100, min_vertical_length=50, max_gap=10)
+    return ([tuple(row[:3]) for row in lines['horizontal']], [tuple(row[:3]) for row in lines['vertical']])
+
+
+def projection_row_rules(gray, scale):
+    lines = detect_lines(gray, scale=scale, min_length=200, max_gap=10)
+    return [float(y) for y in line_positions(lines['horizontal']) if 150 < y < 500]
+
+
+def synthetic_template(path, rows=14, columns=11):
+    """A JO-like page with a ruled table; returns the ruled lines as (y, x0, x1) and (x, y0, y1)"""
+    doc = fitz.open()
+    page = doc.new_page(width=842, height=595)
+    for i, label in enumerate(['Job Order No:', 'Job Order Date:', 'PO NO:', 'Delivery Date:']):
+        page.insert_text((40 + (i % 2) * 500, 40 + (i // 2) * 14), label, fontsize=8)
+        page.draw_line((130 + (i % 2) * 500, 42 + (i // 2) * 14), (300 + (i % 2) * 500, 42 + (i // 2) * 14),
+                       width=0.5)
+    left, top, right, bottom = 30.0, 160.0, 812.0, 520.0
+    row_height, column_width = (bottom - top) / rows, (right - left) / columns
+    horizontal = [(top + r * row_height, left, right) for r in range(rows + 1)]
+    vertical = [(left + c * column_width, top, bottom) for c in range(columns + 1)]
+    horizontal += [(42 + (i // 2) * 14, 130 + (i % 2) * 500, 300 + (i % 2) * 500) for i in range(4)]
+    for y, x0, x1 in horizontal[:rows + 1]:
+        page.draw_line((x0, y), (x1, y), width=1.0)
+    for x, y0, y1 in vertical:
+        page.draw_line((x, y0), (x, y1), width=1.0)
+    for r in range(rows):
+        for c in range(columns):
+            x, y = left + c * column_width + 4, top + r * row_height + 12
+            page.draw_rect(fitz.Rect(x, y - 7, x + 7, y), width=0.5)  # checkbox, not a line
+            page.insert_text((x + 10, y), f"OPT {r}-{c}", fontsize=6)
+    doc.save(path)
+    doc.close()
+    return horizontal, vertical
+
+
+def on_line(segment, lines):
+    """segment (pos, a, b) lies on one of lines"""
+    pos, a, b = segment
+    return any(abs(pos - lp) <= TOLERANCE and a >= la - TOLERANCE and b <= lb + TOLERANCE for lp, la, lb in lines)
+
+
+def covered(line, segments):
+    """Fraction of line's length covered by segments at its position"""
+    pos, a, b = line
+    mask = np.zeros(int(round(b - a)) + 1, dtype=bool)
+    for sp, sa, sb in segments:
+        if abs(sp - pos) <= TOLERANCE:
+            mask[max(0, int(sa - a)):max(0, int(sb - a)) + 1] = True
+    return mask.mean()
+
+
+def timed(fn, gray, scale, repeat):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(gray, scale)
+        times.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Line detector vs HoughLinesP')
+    parser.add_argument('templates', nargs='*', help='Template PDFs (default: synthetic)')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    truth = {}
+    templates = args.templates
+    if not templates:
+        path = os.path.join(tempfile.mkdtemp(prefix='line_bench_'), 'synthetic_template.pdf')
+        truth[path] = synthetic_template(path)
+        templates = [path]
+
+    for path in templates:
+        print(f"\n{os.path.basename(path)}")
+        gray2 = page_rasterizer.render_template(path, 0, scale=2.0)
+        gray3 = page_rasterizer.render_template(path, 0, scale=3.0)
+
+        (hough_h, hough_v), hough_ms = timed(hough_form_lines, gray2, 2.0, args.repeat)
+        (proj_h, proj_v), proj_ms = timed(projection_form_lines, gray2, 2.0, args.repeat)
+        hough_rules, hough_rules_ms = timed(hough_row_rules, gray3, 3.0, args.repeat)
+        proj_rules, proj_rules_ms = timed(projection_row_rules, gray3, 3.0, args.repeat)
+
+        print(f"{'form lines (2x)':<26}{'ms':>8}{'segments':>10}{'recall':>9}{'stray':>8}")
+        for label, h, v, ms in (('HoughLinesP', hough_h, hough_v, hough_ms),
+                                ('projection profile', proj_h, proj_v, proj_ms)):
+            if path in truth:
+                true_h, true_v = truth[path]
+                lines = [(line, h) for line in true_h] + [(line, v) for line in true_v]
+                recall = sum(covered(line, found) >= 0.9 for line, found in lines) / len(lines)
+                stray = sum(not on_line(s, true_h) for s in h) + sum(not on_line(s, true_v) for s in v)
+            else:
+                # No ground truth: score against the other method's output
+                other_h, other_v = (proj_h, proj_v) if label == 'HoughLinesP' else (hough_h, hough_v)
+                lines = [(line, h) for line in other_h] + [(line, v) for line in other_v]
+                recall = sum(covered(line, found) >= 0.9 for line, found in lines) / max(len(lines), 1)
+                stray = float('nan')
+            print(f"{label:<26}{ms:>8.1f}{len(h) + len(v):>10}{recall:>9.0%}{stray:>8}")
+
+        print(f"{'table rules (3x)':<26}{'ms':>8}{'rules':>10}{'matched':>9}")
+        expected = sorted(y for y, x0, x1 in truth[path][0] if 150 < y < 500) if path in truth else proj_rules
+        for label, rules, ms in (('Canny + HoughLinesP', hough_rules, hough_rules_ms),
+                                 ('projection profile', proj_rules, proj_rules_ms)):
+            matched = sum(any(abs(y - r) <= TOLERANCE for r in rules) for y in expected)
+            print(f"{label:<26}{ms:>8.1f}{len(rules):>10}{matched:>6}/{len(expected)}")
+
+
+if __name__ == '__main__':
+    main()
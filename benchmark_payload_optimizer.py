@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark upload payload reduction before Document AI.
+Reports bytes in/out and optimization time per document; with --live it also
+sends both the original and the optimized payload to Document AI and reports
+the round-trip latency change.
+
+    python benchmark_payload_optimizer.py                      # synthetic phone photos + scanned PDF
+    python benchmark_payload_optimizer.py uploads/*.jpg --live
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from payload_optimizer import optimize_payload
+
+MIME_TYPES = {'.pdf': 'application/pdf', '.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png'}
+
+
+def synthetic_inputs(workdir, count):
+    """12MP colour 'phone photos' and an image-only 'scanned' PDF from the synthetic corpus"""
+    import fitz
+    from synthetic_invoice_generator import SyntheticInvoiceGenerator
+
+    generator = SyntheticInvoiceGenerator(seed=11, output_dir=workdir, dpi=300, min_items=3, max_items=12)
+    rng = np.random.default_rng(11)
+    inputs = []
+    pngs = []
+    for index in range(count):
+        result = generator.generate_one(index, formats=('png',))
+        pngs.extend(os.path.join(workdir, name) for name in result['png'])
+
+    for path in pngs:
+        page = cv2.imread(path)
+        photo = cv2.resize(page, (4000, 3000) if page.shape[1] > page.shape[0] else (3000, 4000))
+        tint = np.array([235, 240, 250], dtype=np.float32)
+        photo = photo.astype(np.float32) * (tint / 255.0) + rng.normal(0, 6, photo.shape)
+        photo_path = path.replace('.png', '_photo.jpg')
+        cv2.imwrite(photo_path, np.clip(photo, 0, 255).astype(np.uint8), [cv2.IMWRITE_JPEG_QUALITY, 95])
+        inputs.append(photo_path)
+
+    scan_pdf = os.path.join(workdir, 'scanned_invoice.pdf')
+    with fitz.open() as doc:
+        for path in pngs:
+            page = doc.new_page(width=595, height=842)
+            page.insert_image(page.rect, filename=path.replace('.png', '_photo.jpg'))
+        doc.save(scan_pdf)
+    inputs.append(scan_pdf)
+    return inputs
+
+
+def live_latency(content, mime_type):
+    """Document AI round trip for one payload (seconds)"""
+    from google.cloud import documentai_v1 as documentai
+    from google_document_ai import GoogleDocumentProcessor
+
+    processor = GoogleDocumentProcessor()
+    if not processor.client:
+        raise RuntimeError('Document AI client unavailable (check credentials)')
+    request = documentai.ProcessRequest(
+        name=processor.client.processor_path(processor.project_id, processor.location,
+                                             processor.processors['invoice']),
+        raw_document=documentai.RawDocument(content=content, mime_type=mime_type)
+    )
+    start = time.time()
+    processor.client.process_document(request=request)
+    return time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Payload optimizer benchmark')
+    parser.add_argument('files', nargs='*', help='Documents to measure (default: synthetic inputs)')
+    parser.add_argument('--synthetic', type=int, default=3, help='Synthetic invoices to generate')
+    parser.add_argument('--live', action='store_true', help='Also time real Document AI calls')
+    args = parser.parse_args()
+
+    files = args.files or synthetic_inputs(tempfile.mkdtemp(prefix='payload_bench_'), args.synthetic)
+
+    header = f"{'document':<36}{'in KB':>9}{'out KB':>9}{'saved':>7}{'opt ms':>8}"
+    if args.live:
+        header += f"{'OCR s (orig)':>14}{'OCR s (opt)':>13}"
+    print(header)
+
+    total_in = total_out = 0
+    for path in files:
+        with open(path, 'rb') as f:
+            content = f.read()
+        mime_type = MIME_TYPES.get(os.path.splitext(path)[1].lower(), 'application/octet-stream')
+        optimized, optimized_mime, info = optimize_payload(content, mime_type)
+        total_in += info['bytes_in']
+        total_out += info['bytes_out']
+
+        line = (f"{os.path.basename(path)[-36:]:<36}{info['bytes_in'] / 1024:>9.0f}{info['bytes_out'] / 1024:>9.0f}"
+                f"{info['bytes_saved'] / max(info['bytes_in'], 1):>7.0%}{info['optimize_seconds'] * 1000:>8.0f}")
+        if args.live:
+            line += f"{live_latency(content, mime_type):>14.2f}{live_latency(optimized, optimized_mime):>13.2f}"
+        print(line)
+
+    print(f"total {total_in / 1024 / 1024:.1f} MB -> {total_out / 1024 / 1024:.1f} MB "
+          f"({1 - total_out / max(total_in, 1):.0%} less upload)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Benchmark web app startup: import time of the apps in a fresh interpreter,
+and per-worker memory of gunicorn (gunicorn.conf.py) in three modes:
+
+  per-worker imports  no preload, every worker imports the heavy modules
+                      (what each worker and each --max-requests recycle paid
+                      when the app imported them at module load)
+  lazy, idle          no preload, heavy modules not yet used
+  preload + freeze    the repo config: the master imports everything once,
+                      gc.freeze(), workers share the pages copy-on-write
+
+RSS counts shared pages in every worker; PSS splits them between the
+processes sharing them and private is what a worker owns alone, so PSS and
+private are what preloading reduces. Linux only (reads /proc).
+
+    python benchmark_startup.py
+    python benchmark_startup.py --workers 4 --repeat 5
+"""
+
+import os
+import sys
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import statistics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CONFIG = os.path.join(ROOT, 'gunicorn.conf.py')
+
+IMPORTS = {
+    'app_v2_production': 'import backend.app_v2_production',
+    'app_v2_production + preload': 'import backend.app_v2_production; '
+                                   'from backend.startup import preload; preload()',
+    'app (legacy)': 'import sys; sys.path.insert(0, "backend"); import app',
+}
+
+MODES = {
+    'per-worker imports': ('false', 'def post_worker_init(worker):\n'
+                                    '    from backend.startup import preload\n'
+                                    '    preload()\n'),
+    'lazy, idle': ('false', ''),
+    'preload + freeze': ('true', ''),
+}
+
+
+def import_seconds(statement, repeat):
+    times = []
+    for _ in range(repeat):
+        code = f"import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)"
+        result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return statistics.median(times), None
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def children(pid):
+    found = []
+    for name in os.listdir('/proc'):
+        if name.isdigit():
+            try:
+                with open(f"/proc/{name}/stat") as f:
+                    if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                        found.append(int(name))
+            except (OSError, IndexError, ValueError):
+                pass
+    return found
+
+
+def memory_kb(pid):
+    """Rss, Pss and private (clean + dirty) from smaps_rollup, in kB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values['Rss'], values['Pss'], values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+
+
+def worker_memory(preload, extra, workers, timeout=120.0):
+    with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as config:
+        config.write(f"exec(open({CONFIG!r}).read())\n{extra}")
+    env = dict(os.environ, GUNICORN_PRELOAD=preload, GUNICORN_WORKERS=str(workers),
+               GUNICORN_BIND=f"127.0.0.1:{free_port()}", GUNICORN_LOG_LEVEL='warning')
+    start = time.perf_counter()
+    master = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', config.name,
+                               'backend.app_v2_production:app'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        # Workers are up once there are enough of them and their memory stops growing
+        last, stable_since = None, None
+        while time.perf_counter() - start < timeout:
+            time.sleep(0.25)
+            pids = sorted(children(master.pid))
+            if len(pids) < workers:
+                continue
+            sample = [memory_kb(pid) for pid in pids]
+            if sample != last:
+                last, stable_since = sample, time.perf_counter()
+            elif time.perf_counter() - stable_since >= 1.5:
+                return last, stable_since - start
+        raise RuntimeError('gunicorn workers did not settle')
+    finally:
+        master.terminate()
+        master.wait(timeout=30)
+        os.unlink(config.name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Web app startup benchmark')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3, help='Fresh interpreters per import measurement')
+    args = parser.parse_args()
+
+    print(f"{'import':<32}{'seconds':>9}")
+    for name, statement in IMPORTS.items():
+        seconds, error = import_seconds(statement, args.repeat)
+        print(f"{name:<32}{seconds:>9.2f}" if error is None else f"{name:<32}{'-':>9}  {error}")
+
+    print(f"\n{args.workers} workers{'':<15}{'ready s':>8}{'RSS MB':>9}{'PSS MB':>9}{'private MB':>12}")
+    for name, (preload, extra) in MODES.items():
+        try:
+            sample, ready = worker_memory(preload, extra, args.workers)
+        except Exception as e:
+            print(f"{name:<24}  failed: {e}")
+            continue
+        rss, pss, private = (statistics.mean(values) / 1024 for values in zip(*sample))
+        print(f"{name:<24}{ready:>8.1f}{rss:>9.1f}{pss:>9.1f}{private:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
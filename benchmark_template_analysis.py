@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark sequential vs process-parallel template analysis.
+Runs TemplateCoordinateExtractor.extract_all_templates and
+VisualTemplateAnalyzer.analyze_all_templates with workers=1 and workers=N on
+door, frame and combined templates, and checks the spec JSON files match.
+
+    python benchmark_template_analysis.py                    # synthetic templates
+    python benchmark_template_analysis.py --workers 4 --pages 3
+    python benchmark_template_analysis.py --templates door.pdf frame.pdf combined.pdf
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from template_coordinate_extractor import TemplateCoordinateExtractor
+from visual_template_analyzer import VisualTemplateAnalyzer
+
+DOOR_COLUMNS = ['LAMINATE CODE', 'DOOR THICKNESS', 'DOOR SIZE', 'DOOR TYPE', 'DOOR CORE', 'EDGING',
+                'DECORATIVE LINE', 'DESIGN NAME', 'OPEN HOLE TYPE', 'DRAWING REMARK']
+FRAME_COLUMNS = ['FRAME LAMINATE CODE', 'FRAME WIDTH', 'REBATED', 'FRAME SIZE', 'INNER OR OUTER',
+                 'FRAME PROFILE', 'DRAWING REMARK']
+OPTIONS = ['37mm', '43mm', '48mm', 'S/L', 'D/L', 'Honeycomb', 'Solid Timber', 'NA Lipping', 'ABS Edging',
+           'T-bar', 'Groove Line', 'INNER', 'OUTER']
+
+
+def draw_form_page(page, columns, rows=18):
+    """A JO-like page: header labels, a ruled table with column titles, checkbox options"""
+    for i, label in enumerate(['Job Order No:', 'Job Order Date:', 'PO NO:']):
+        page.insert_text((40, 40 + i * 14), label, fontsize=8)
+    for i, label in enumerate(['Delivery Date:', 'Customer Name:', 'Measure By :']):
+        page.insert_text((560, 40 + i * 14), label, fontsize=8)
+
+    left, top, right, bottom = 30, 90, page.rect.width - 30, page.rect.height - 40
+    width = (right - left) / len(columns)
+    row_height = (bottom - top) / rows
+    for r in range(rows + 1):
+        page.draw_line((left, top + r * row_height), (right, top + r * row_height), width=0.8)
+    for c in range(len(columns) + 1):
+        page.draw_line((left + c * width, top), (left + c * width, bottom), width=0.8)
+    for c, title in enumerate(columns):
+        page.insert_text((left + c * width + 3, top + row_height - 6), title, fontsize=5)
+    for o, option in enumerate(OPTIONS):
+        x, y = left + (o % len(columns)) * width + 14, top + (2 + o // len(columns)) * row_height - 6
+        page.draw_rect(fitz.Rect(x - 10, y - 6, x - 3, y + 1), width=0.6)
+        page.insert_text((x, y), option, fontsize=5)
+
+
+def synthetic_templates(directory, pages):
+    paths = {}
+    layouts = {'door': [DOOR_COLUMNS] * pages, 'frame': [FRAME_COLUMNS] * pages,
+               'combined': [DOOR_COLUMNS, FRAME_COLUMNS] * pages}
+    for name, page_columns in layouts.items():
+        doc = fitz.open()
+        for columns in page_columns:
+            draw_form_page(doc.new_page(width=842, height=595), columns)
+        paths[name] = os.path.join(directory, f"{name}_template.pdf")
+        doc.save(paths[name])
+        doc.close()
+    return paths
+
+
+def run(tool, method, paths, workers, output_dir):
+    """Time one analysis run writing its spec files into output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    tool.template_paths = paths
+    cwd = os.getcwd()
+    os.chdir(output_dir)
+    devnull = open(os.devnull, 'w')
+    stdout, sys.stdout = sys.stdout, devnull
+    try:
+        start = time.perf_counter()
+        getattr(tool, method)(workers=workers)
+        return time.perf_counter() - start
+    finally:
+        sys.stdout = stdout
+        devnull.close()
+        os.chdir(cwd)
+
+
+def same_specs(dir_a, dir_b):
+    names = sorted(os.listdir(dir_a))
+    if names != sorted(os.listdir(dir_b)):
+        return False
+    for name in names:
+        with open(os.path.join(dir_a, name)) as a, open(os.path.join(dir_b, name)) as b:
+            if json.load(a) != json.load(b):
+                return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Template analysis parallelism benchmark')
+    parser.add_argument('--templates', nargs=3, metavar=('DOOR', 'FRAME', 'COMBINED'),
+                        help='Template PDFs (default: synthetic)')
+    parser.add_argument('--pages', type=int, default=2, help='Pages per synthetic door/frame template')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='template_bench_')
+    if args.templates:
+        paths = dict(zip(('door', 'frame', 'combined'), args.templates))
+    else:
+        paths = synthetic_templates(work_dir, args.pages)
+    page_total = 0
+    for path in paths.values():
+        with fitz.open(path) as doc:
+            page_total += len(doc)
+    print(f"{len(paths)} templates, {page_total} pages, {args.workers} workers")
+
+    print(f"{'analysis':<24}{'sequential s':>14}{'parallel s':>12}{'speedup':>9}{'same specs':>12}")
+    for label, tool, method in (('coordinate extractor', TemplateCoordinateExtractor(), 'extract_all_templates'),
+                                ('visual analyzer', VisualTemplateAnalyzer(), 'analyze_all_templates')):
+        # Parallel first: forked workers would otherwise inherit rasters cached by the sequential run
+        parallel_dir = os.path.join(work_dir, f"{method}_parallel")
+        sequential_dir = os.path.join(work_dir, f"{method}_sequential")
+        parallel = run(tool, method, paths, args.workers, parallel_dir)
+        sequential = run(tool, method, paths, 1, sequential_dir)
+        same = same_specs(sequential_dir, parallel_dir)
+        print(f"{label:<24}{sequential:>14.2f}{parallel:>12.2f}{sequential / parallel:>8.1f}x{str(same):>12}")
+
+
+if __name__ == '__main__':
+    main()
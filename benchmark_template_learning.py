@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Benchmark AICoordinateLearner: per-label page scans vs the spatial word index.
+The legacy rows re-run the original lookups (page.get_text('dict') parsed and
+every span scanned for each label, checkbox option and table row); the indexed
+row is the current learner. Also reports how many learned positions agree.
+
+    python benchmark_template_learning.py                  # synthetic filled JO, 40 door rows
+    python benchmark_template_learning.py --rows 120
+    python benchmark_template_learning.py path/to/filled_jo.pdf
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+import statistics
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from ai_coordinate_learner import AICoordinateLearner
+
+
+class LegacyScanLearner(AICoordinateLearner):
+    """The learner's original lookups: one full page parse and scan per query"""
+
+    def _spans(self, page):
+        for block in page.get_text("dict").get('blocks', []):
+            for line in block.get('lines', []):
+                for span in line['spans']:
+                    yield span
+
+    def learn_header_positions(self, page, coordinates):
+        header_labels = {'Job Order No': 'job_order_no', 'Job Order Date': 'job_order_date', 'PO NO': 'po_no',
+                         'Delivery Date': 'delivery_date', 'Customer Name': 'customer_name',
+                         'Measure By': 'measure_by'}
+        for span in self._spans(page):
+            text = span['text'].strip()
+            for label, field_name in header_labels.items():
+                if label.lower() in text.lower():
+                    bbox = span['bbox']
+                    coordinates['header_fields'][field_name] = {
+                        'label_position': {'x': bbox[0], 'y': bbox[1],
+                                           'width': bbox[2] - bbox[0], 'height': bbox[3] - bbox[1]},
+                        'data_position': self.find_data_position_for_label(page, bbox, field_name),
+                        'font_size': span['size']
+                    }
+
+    def find_data_position_for_label(self, page, label_bbox, field_name):
+        for span in self._spans(page):
+            bbox, text = span['bbox'], span['text'].strip()
+            if abs(bbox[1] - label_bbox[1]) < 10 and bbox[0] > label_bbox[2] and text and not self.is_label_text(text):
+                return {'x': bbox[0], 'y': bbox[1], 'width': bbox[2] - bbox[0], 'height': bbox[3] - bbox[1],
+                        'sample_text': text}
+        return {'x': label_bbox[2] + 20, 'y': label_bbox[1], 'width': 150, 'height': 12, 'sample_text': None}
+
+    def learn_door_table_structure(self, page, coordinates):
+        door_headers = ['LAMINATE CODE', 'DOOR THICKNESS', 'DOOR SIZE', 'DOOR TYPE', 'DOOR CORE', 'EDGING',
+                        'DECORATIVE LINE', 'DESIGN NAME', 'OPEN HOLE TYPE', 'DRAWING REMARK']
+        header_positions = {}
+        for span in self._spans(page):
+            text = span['text'].strip()
+            for header in door_headers:
+                if header.lower() in text.lower() or text.upper() in header:
+                    header_positions[header] = {'x': span['bbox'][0], 'y': span['bbox'][1],
+                                                'width': span['bbox'][2] - span['bbox'][0]}
+        coordinates['door_table']['headers'] = header_positions
+        self.learn_door_rows(page, coordinates)
+        self.learn_door_checkboxes(page, coordinates)
+
+    def find_row_data(self, page, reference_bbox):
+        row_data = {}
+        for span in self._spans(page):
+            bbox, text = span['bbox'], span['text'].strip()
+            if abs(bbox[1] - reference_bbox[1]) < 20 and text:
+                if re.search(r'\d+MM?\s*[xX×]\s*\d+MM?', text):
+                    row_data['door_size'] = {'text': text, 'x': bbox[0], 'y': bbox[1]}
+                elif 'Location' in text:
+                    row_data['location'] = {'text': text, 'x': bbox[0], 'y': bbox[1]}
+        return row_data
+
+    def find_checkbox_option_position(self, page, option_text):
+        for span in self._spans(page):
+            if option_text.lower() in span['text'].strip().lower():
+                bbox = span['bbox']
+                return {'text_x': bbox[0], 'text_y': bbox[1], 'checkbox_x': bbox[0] - 15,
+                        'checkbox_y': bbox[1] + 2, 'font_size': span['size']}
+        return None
+
+    def learn_frame_table_structure(self, page, coordinates):
+        frame_headers = ['FRAME LAMINATE CODE', 'FRAME WIDTH', 'REBATED', 'FRAME SIZE', 'INNER OR OUTER',
+                         'FRAME PROFILE', 'DRAWING REMARK']
+        header_positions = {}
+        for span in self._spans(page):
+            text = span['text'].strip()
+            for header in frame_headers:
+                if header.lower() in text.lower():
+                    header_positions[header] = {'x': span['bbox'][0], 'y': span['bbox'][1],
+                                                'width': span['bbox'][2] - span['bbox'][0]}
+        coordinates['frame_table'] = {'headers': header_positions, 'rows': self.learn_frame_rows(page),
+                                      'checkboxes': self.learn_frame_checkboxes(page)}
+
+
+def synthetic_filled_jo(path, rows):
+    """Two landscape pages laid out like a filled JO: header, door table with data rows, frame table"""
+    doc = fitz.open()
+    page = doc.new_page(width=842, height=595)
+    headers = [('Job Order No:', 'JO-2024-0917'), ('Job Order Date:', '12/03/2024'), ('PO NO:', 'PO 55812')]
+    for i, (label, value) in enumerate(headers):
+        page.insert_text((40, 40 + i * 14), label, fontsize=8)
+        page.insert_text((120, 40 + i * 14), value, fontsize=8)
+    for i, (label, value) in enumerate([('Delivery Date:', '20/03/2024'), ('Customer Name:', 'SYARIKAT MAJU'),
+                                        ('Measure By :', 'AHMAD')]):
+        page.insert_text((560, 40 + i * 14), label, fontsize=8)
+        page.insert_text((640, 40 + i * 14), value, fontsize=8)
+
+    columns = ['LAMINATE CODE', 'DOOR THICKNESS', 'DOOR SIZE', 'DOOR TYPE', 'DOOR CORE', 'EDGING',
+               'DECORATIVE LINE', 'DESIGN NAME', 'OPEN HOLE TYPE', 'DRAWING REMARK']
+    for c, header in enumerate(columns):
+        page.insert_text((40 + c * 78, 100), header, fontsize=5)
+    options = ['37mm', '43mm', '48mm', 'S/L', 'D/L', 'Unequal D/L', 'Honeycomb', 'Solid Tubular Core',
+               'Solid Timber', 'Metal Skeleton', 'NA Lipping', 'ABS Edging', 'No Edging', 'T-bar', 'Groove Line']
+    for o, option in enumerate(options):
+        page.insert_text((40 + (o % 8) * 95, 112 + (o // 8) * 9), option, fontsize=5)
+
+    row_height = (595 - 150) / max(rows, 1)
+    for r in range(rows):
+        y = 140 + r * row_height
+        values = [f"{r % 9 + 1}S-A{r:03d}", '43mm', f"{800 + r}MM x 2100MM", 'S/L', 'Honeycomb', 'ABS Edging',
+                  'T-bar', f"DESIGN {r}", 'NONE', f"Location R{r}"]
+        for c, value in enumerate(values):
+            page.insert_text((40 + c * 78, y), value, fontsize=4)
+
+    frame = doc.new_page(width=842, height=595)
+    for c, header in enumerate(['FRAME LAMINATE CODE', 'FRAME WIDTH', 'REBATED', 'FRAME SIZE',
+                                'INNER OR OUTER', 'FRAME PROFILE', 'DRAWING REMARK']):
+        frame.insert_text((40 + c * 110, 100), header, fontsize=6)
+    frame.insert_text((40, 112), 'INNER', fontsize=6)
+    frame.insert_text((120, 112), 'OUTER', fontsize=6)
+    for r in range(rows):
+        frame.insert_text((40, 130 + r * row_height), f"{r % 9 + 1}S-{100 + r}", fontsize=4)
+    doc.save(path)
+    doc.close()
+
+
+def learn(learner, pdf_path):
+    """The learning steps of analyze_sample_form, without writing the JSON outputs"""
+    coordinates = {'page_size': None, 'header_fields': {},
+                   'door_table': {'rows': [], 'columns': {}, 'checkboxes': {}},
+                   'frame_table': {'rows': [], 'columns': {}, 'checkboxes': {}}}
+    with fitz.open(pdf_path) as doc:
+        coordinates['page_size'] = [doc[0].rect.width, doc[0].rect.height]
+        learner.learn_header_positions(doc[0], coordinates)
+        learner.learn_door_table_structure(doc[0], coordinates)
+        if len(doc) > 1:
+            learner.learn_frame_table_structure(doc[1], coordinates)
+    return coordinates
+
+
+def flatten(value, prefix=''):
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from flatten(item, f"{prefix}.{key}")
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from flatten(item, f"{prefix}[{i}]")
+    else:
+        yield prefix, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Template learning benchmark')
+    parser.add_argument('pdf', nargs='?', help='Filled JO sample (default: synthetic)')
+    parser.add_argument('--rows', type=int, default=40, help='Door rows in the synthetic sample')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.mkdtemp(prefix='learn_bench_'), 'filled_jo.pdf')
+        synthetic_filled_jo(pdf_path, args.rows)
+    with fitz.open(pdf_path) as doc:
+        spans = sum(len(line['spans']) for page in doc for block in page.get_text('dict')['blocks']
+                    for line in block.get('lines', []))
+    print(f"{os.path.basename(pdf_path)}: {spans} spans")
+
+    legacy, indexed = LegacyScanLearner(), AICoordinateLearner()
+    results = {}
+    print(f"{'variant':<22}{'ms (p50)':>10}{'ms (first)':>12}")
+    for label, learner in (('legacy scans', legacy), ('spatial index', indexed)):
+        times = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            results[label] = learn(learner, pdf_path)
+            times.append((time.perf_counter() - start) * 1000)
+        print(f"{label:<22}{statistics.median(times):>10.1f}{times[0]:>12.1f}")
+
+    old = dict(flatten(results['legacy scans']))
+    new = dict(flatten(results['spatial index']))
+    same = sum(1 for key in old if key in new and old[key] == new[key])
+    print(f"learned values: {same}/{len(old)} identical to the legacy scan")
+    for key in sorted(set(old) ^ set(new) | {k for k in old if k in new and old[k] != new[k]})[:10]:
+        print(f"  {key}: {old.get(key)!r} -> {new.get(key)!r}")
+
+
+if __name__ == '__main__':
+    main()
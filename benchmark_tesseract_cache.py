@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark Tesseract per-call OCR vs the per-raster word cache.
+"Before" repeats what the analysis code did: one image_to_data per analysis
+pass, plus image_to_string for page text in the ensemble path, and a
+separate OCR per region query. "After" asks the same questions of
+tesseract_words, which runs image_to_data once per raster.
+
+    python benchmark_tesseract_cache.py                   # synthetic template at 3x
+    python benchmark_tesseract_cache.py template.pdf --passes 5 --regions 12
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import fitz  # PyMuPDF
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from page_rasterizer import page_rasterizer
+from tesseract_cache import TesseractWordCache
+
+LABELS = ['Job Order No:', 'Job Order Date:', 'PO NO:', 'Delivery Date:', 'Customer Name:', 'Measure By :']
+
+
+def synthetic_template(path):
+    doc = fitz.open()
+    page = doc.new_page(width=842, height=595)
+    for i, label in enumerate(LABELS):
+        page.insert_text((40 + (i // 3) * 500, 40 + (i % 3) * 16), label, fontsize=9)
+    for r in range(12):
+        page.insert_text((40, 120 + r * 30), f"ROW {r + 1}  LAMINATE CODE 6S-A{r:03d}  DOOR SIZE 850MM x 2100MM",
+                         fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def regions(image, count):
+    """count horizontal bands covering the page, in pixels"""
+    if count <= 0:
+        return []
+    height, width = image.shape[:2]
+    step = height / count
+    return [(0, int(i * step), width, int((i + 1) * step)) for i in range(count)]
+
+
+def before(image, passes, bands):
+    import pytesseract
+    for _ in range(passes):
+        data = pytesseract.image_to_data(image, output_type=pytesseract.Output.DICT)
+        [t for t, c in zip(data['text'], data['conf']) if float(c) > 30]
+    pytesseract.image_to_string(image)
+    for x0, y0, x1, y1 in bands:
+        pytesseract.image_to_string(image[y0:y1, x0:x1])
+
+
+def after(cache, image, passes, bands):
+    for _ in range(passes):
+        cache.page_words(image).words(min_conf=30)
+    cache.page_words(image).page_text()
+    for band in bands:
+        cache.page_words(image).region_text(*band)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tesseract word cache benchmark')
+    parser.add_argument('pdf', nargs='?', help='Template PDF (default: synthetic)')
+    parser.add_argument('--scale', type=float, default=3.0)
+    parser.add_argument('--passes', type=int, default=3, help='Analysis passes reading the whole page')
+    parser.add_argument('--regions', type=int, default=8, help='Region queries per page')
+    args = parser.parse_args()
+
+    try:
+        import pytesseract
+        pytesseract.get_tesseract_version()
+    except Exception as e:
+        sys.exit(f"Tesseract is not available: {e}")
+
+    pdf_path = args.pdf
+    if not pdf_path:
+        pdf_path = os.path.join(tempfile.mkdtemp(prefix='tesseract_bench_'), 'template.pdf')
+        synthetic_template(pdf_path)
+    image = page_rasterizer.render_template(pdf_path, 0, scale=args.scale)
+    bands = regions(image, args.regions)
+    print(f"{os.path.basename(pdf_path)} at {args.scale}x: {image.shape[1]}x{image.shape[0]} px, "
+          f"{args.passes} page passes + page text + {args.regions} regions")
+
+    start = time.perf_counter()
+    before(image, args.passes, bands)
+    per_call = time.perf_counter() - start
+
+    cache = TesseractWordCache()
+    start = time.perf_counter()
+    after(cache, image, args.passes, bands)
+    cached_first = time.perf_counter() - start
+    start = time.perf_counter()
+    after(cache, image, args.passes, bands)
+    cached_again = time.perf_counter() - start
+
+    calls = args.passes + 1 + args.regions
+    print(f"{'variant':<28}{'tesseract runs':>15}{'seconds':>10}{'s/run':>8}")
+    print(f"{'per-call (before)':<28}{calls:>15}{per_call:>10.2f}{per_call / calls:>8.2f}")
+    print(f"{'word cache, cold':<28}{1:>15}{cached_first:>10.2f}{cached_first:>8.2f}")
+    print(f"{'word cache, same template':<28}{0:>15}{cached_again:>10.3f}{'-':>8}")
+    print(f"speedup: {per_call / cached_first:.1f}x cold, {per_call / max(cached_again, 1e-6):.0f}x warm")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,13 @@
+"""
+Shared test setup: backend modules import each other both as `backend.x`
+(production app) and as bare `x` (scripts run from backend/), so put both
+the project root and backend/ on sys.path.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, 'backend')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
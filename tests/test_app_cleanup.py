@@ -0,0 +1,31 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+
+def test_expired_sessions_are_cleaned_up_by_the_worker_loop(tmp_path, monkeypatch):
+    for name in ('UPLOAD_FOLDER', 'OUTPUT_FOLDER', 'SHARED_STORE_DIR', 'PROGRESS_EVENTS_DIR'):
+        os.makedirs(tmp_path / name, exist_ok=True)
+        monkeypatch.setenv(name, str(tmp_path / name))
+    from backend import app_v2_production as production
+
+    upload = tmp_path / 'UPLOAD_FOLDER' / 'old.pdf'
+    upload.write_bytes(b'%PDF-1.4')
+    production.validation_sessions['expired'] = {
+        'file_path': str(upload), 'timestamp': datetime.now() - timedelta(hours=24)}
+    production.validation_sessions['fresh'] = {
+        'file_path': str(tmp_path / 'missing.pdf'), 'timestamp': datetime.now()}
+
+    monkeypatch.setitem(production.app.config, 'CLEANUP_INTERVAL_SECONDS', 0.05)
+    try:
+        production.app.test_client().get('/health/live')     # first request starts the loop
+        deadline = time.time() + 5
+        while 'expired' in production.validation_sessions and time.time() < deadline:
+            time.sleep(0.05)
+        assert 'expired' not in production.validation_sessions
+        assert 'fresh' in production.validation_sessions
+        assert not upload.exists()
+        assert production.cleanup_loop['pid'] == os.getpid()
+    finally:
+        production.app.config['CLEANUP_INTERVAL_SECONDS'] = 900
+        production.validation_sessions.clear()
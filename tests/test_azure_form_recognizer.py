@@ -0,0 +1,65 @@
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import azure_form_recognizer
+from azure_form_recognizer import SendoraFormRecognizer
+from azure_standin_server import start_standin
+
+
+class ThrottlingHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_response(429)
+        self.send_header('Retry-After', '120')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def recognizer_for(monkeypatch):
+    def build(endpoint):
+        monkeypatch.setenv('AZURE_FORM_RECOGNIZER_ENDPOINT', endpoint)
+        return SendoraFormRecognizer()
+    return build
+
+
+def test_recognizers_share_one_session(recognizer_for):
+    first = recognizer_for('http://127.0.0.1:9/')
+    second = recognizer_for('http://127.0.0.1:9/')
+    assert first.session is second.session
+
+
+def test_throttled_submit_gives_up_within_budget(recognizer_for, monkeypatch):
+    monkeypatch.setattr(azure_form_recognizer, 'AZURE_THROTTLE_MAX_WAIT', 1.0)
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ThrottlingHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        recognizer = recognizer_for(f"http://127.0.0.1:{server.server_address[1]}/")
+        start = time.time()
+        with pytest.raises(Exception, match='throttled'):
+            recognizer._submit_and_poll(b'%PDF-1.4', 'application/pdf', max_wait=30)
+        assert time.time() - start < 5
+    finally:
+        server.shutdown()
+
+
+def test_analyze_against_standin(recognizer_for):
+    server = start_standin(processing_seconds=0.2, jitter=0.0)
+    try:
+        recognizer = recognizer_for(f"http://127.0.0.1:{server.server_address[1]}/")
+        result = recognizer._submit_and_poll(b'%PDF-1.4', 'application/pdf', max_wait=10)
+        assert result['status'] == 'succeeded'
+    finally:
+        server.shutdown()
+
+
+def test_ensemble_reuses_one_recognizer(monkeypatch):
+    import ensemble_ocr
+    monkeypatch.setattr(ensemble_ocr, '_azure', None)
+    assert ensemble_ocr.azure_recognizer() is ensemble_ocr.azure_recognizer()
@@ -0,0 +1,41 @@
+import cv2
+import numpy as np
+
+from checkbox_detector import detect_checkboxes, group_rows, box_left_of
+
+SCALE = 3.0   # pixels per point, as the template renders use
+
+
+def page_with_boxes(boxes, height=600, width=900):
+    page = np.full((height, width), 255, dtype=np.uint8)
+    for x, y, size in boxes:
+        cv2.rectangle(page, (x, y), (x + size, y + size), 0, 2)
+    return page
+
+
+def test_hollow_squares_are_found_in_row_order():
+    page = page_with_boxes([(400, 100, 30), (100, 100, 30), (100, 300, 30)])
+    boxes = detect_checkboxes(page, scale=SCALE)
+    assert boxes.shape == (3, 4)
+    assert np.allclose(boxes[:, :2], [[100 / SCALE, 100 / SCALE], [400 / SCALE, 100 / SCALE],
+                                      [100 / SCALE, 300 / SCALE]], atol=1)
+    assert [len(row) for row in group_rows(boxes)] == [2, 1]
+
+
+def test_letters_filled_and_oversized_shapes_are_rejected():
+    page = page_with_boxes([(100, 100, 30)])
+    cv2.rectangle(page, (300, 100), (330, 130), 0, -1)             # filled (a ticked or solid box)
+    cv2.rectangle(page, (400, 100), (600, 300), 0, 2)              # table cell, too big
+    cv2.rectangle(page, (700, 100), (760, 120), 0, 2)              # too wide to be square
+    cv2.putText(page, 'NHO', (100, 400), cv2.FONT_HERSHEY_SIMPLEX, 1.2, 0, 2)
+    boxes = detect_checkboxes(page, scale=SCALE)
+    assert len(boxes) == 1
+    assert abs(boxes[0][0] - 100 / SCALE) <= 1
+
+
+def test_box_left_of_a_label():
+    boxes = detect_checkboxes(page_with_boxes([(100, 100, 30), (400, 100, 30)]), scale=SCALE)
+    label = (boxes[0][2] + 4, boxes[0][1], boxes[0][2] + 60, boxes[0][3])
+    assert np.allclose(box_left_of(boxes, label), boxes[0])
+    assert box_left_of(boxes, (0, 200, 20, 210)) is None
+    assert len(detect_checkboxes(np.full((100, 100), 255, dtype=np.uint8), scale=SCALE)) == 0
@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ensemble_ocr import EnsembleOCRProcessor, OCRUnavailable
+
+TEXT = 'INVOICE NO: INV-2024-118\nTOTAL: RM 1,250.00'
+
+
+class TimedEngines(EnsembleOCRProcessor):
+    """Engines replaced by sleeps, so only the ensemble's scheduling is exercised"""
+
+    seconds = {'google': 0.4, 'azure': 0.4, 'local': 0.4}
+
+    def answer(self, engine):
+        delay = self.seconds[engine]
+        if delay is None:
+            raise ConnectionError(f"{engine} unreachable")
+        time.sleep(delay)
+        return self.google.extract_from_text(TEXT), 0.8
+
+    def run_google(self, file_path):
+        return self.answer('google')
+
+    def run_azure(self, file_path):
+        return self.answer('azure')
+
+    def run_local(self, file_path):
+        return self.answer('local')
+
+
+@pytest.fixture(scope='module')
+def processor():
+    return TimedEngines(deadline=0.5, max_wait=1.0)
+
+
+def test_concurrent_documents_each_get_the_full_deadline(processor):
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        results = list(pool.map(processor.process_document, ['doc.pdf'] * 4))
+    for result in results:
+        assert result['invoice_number'] == 'INV-2024-118'
+        assert all(engine['status'] == 'ok' for engine in result['ensemble']['engines'].values())
+
+
+def test_first_late_answer_is_used_when_none_came_by_the_deadline(processor, monkeypatch):
+    monkeypatch.setattr(processor, 'seconds', {'google': 0.75, 'azure': None, 'local': 1.5})
+    start = time.time()
+    result = processor.process_document('doc.pdf')
+    assert time.time() - start < 0.95
+    assert result['invoice_number'] == 'INV-2024-118'
+    assert result['ensemble']['engines']['google']['status'] == 'ok'
+    assert result['ensemble']['engines']['local']['status'] == 'timeout'
+
+
+def test_no_answer_raises_instead_of_demo_data(processor, monkeypatch):
+    monkeypatch.setattr(processor, 'seconds', {'google': None, 'azure': None, 'local': 1.5})
+    with pytest.raises(OCRUnavailable, match='local timeout'):
+        processor.process_document('doc.pdf')
@@ -0,0 +1,55 @@
+import time
+import threading
+
+from health_checks import HealthChecks
+
+
+def checks(ttl=60.0):
+    health = HealthChecks(interval=3600, ttl=ttl)
+    health.start = lambda: None   # probes are run by hand below
+    return health
+
+
+def test_probe_without_a_result_is_pending_and_not_ready():
+    health = HealthChecks(interval=3600, ttl=60)
+    release = threading.Event()
+    health.register('slow', lambda: release.wait(5) and {})
+    try:
+        status = health.status()    # starts the refresher, which blocks in the probe
+        assert status['checks']['slow']['state'] == 'pending'
+        assert not status['ready'] and status['status'] == 'unavailable'
+    finally:
+        release.set()
+    deadline = time.time() + 5
+    while health.status()['checks']['slow']['state'] == 'pending' and time.time() < deadline:
+        time.sleep(0.01)
+    assert health.status()['ready']
+
+
+def test_old_result_is_stale_and_not_ready():
+    health = checks(ttl=0.05)
+    health.register('store', lambda: {'ok': True})
+    health.refresh()
+    assert health.status()['checks']['store']['state'] == 'ok'
+    time.sleep(0.1)
+    status = health.status()
+    assert status['checks']['store']['state'] == 'stale'
+    assert not status['checks']['store']['ok'] and not status['ready']
+
+
+def test_failing_optional_probe_degrades_and_failing_critical_probe_blocks():
+    health = checks()
+    health.register('storage', lambda: {'ok': True})
+    health.register('pdf_converter', lambda: {'ok': False, 'path': None}, critical=False)
+    health.refresh()
+    status = health.status()
+    assert status['ready'] and status['status'] == 'degraded'
+    assert status['checks']['pdf_converter']['state'] == 'failing'
+
+    def broken():
+        raise ConnectionError('redis unreachable')
+    health.register('storage', broken)
+    health.refresh()
+    status = health.status()
+    assert not status['ready'] and status['status'] == 'unavailable'
+    assert status['checks']['storage']['error'] == 'redis unreachable'
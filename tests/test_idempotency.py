@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+from flask import Flask, jsonify, request
+
+import idempotency
+from shared_store import FileStore
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(idempotency, 'shared_store', FileStore(str(tmp_path)))
+    monkeypatch.setattr(idempotency, 'POLL_SECONDS', 0.02)
+    app = Flask(__name__)
+    app.calls = 0
+    app.entered = threading.Event()
+    app.release = threading.Event()
+    app.release.set()
+
+    @app.route('/upload', methods=['POST'])
+    @idempotency.idempotent('upload')
+    def upload():
+        app.calls += 1
+        app.entered.set()
+        app.release.wait(10)
+        if request.form.get('fail'):
+            return jsonify({'error': 'backend down'}), 503
+        return jsonify({'run': app.calls, 'name': request.form.get('name')}), 201
+
+    client = app.test_client()
+    client.app = app
+    return client
+
+
+def post(client, key=None, **form):
+    headers = {'Idempotency-Key': key} if key is not None else {}
+    return client.post('/upload', data=form, headers=headers)
+
+
+def test_repeat_replays_the_stored_response(client):
+    first = post(client, 'key-1', name='jo.pdf')
+    second = post(client, 'key-1', name='jo.pdf')
+    assert first.status_code == second.status_code == 201
+    assert second.get_json() == first.get_json() == {'run': 1, 'name': 'jo.pdf'}
+    assert second.headers['Idempotent-Replayed'] == 'true'
+    assert 'Idempotent-Replayed' not in first.headers
+    assert client.app.calls == 1
+
+
+def test_key_reused_for_a_different_request_is_rejected(client):
+    post(client, 'key-2', name='a.pdf')
+    assert post(client, 'key-2', name='b.pdf').status_code == 422
+    assert client.app.calls == 1
+
+
+def test_server_errors_are_not_stored(client):
+    assert post(client, 'key-3', fail='1').status_code == 503
+    assert post(client, 'key-3', fail='1').status_code == 503
+    assert client.app.calls == 2
+
+
+def test_requests_without_or_with_invalid_keys(client):
+    post(client, name='a.pdf')
+    post(client, name='a.pdf')
+    assert client.app.calls == 2
+    assert post(client, 'has space', name='a.pdf').status_code == 400
+    assert client.app.calls == 2
+
+
+def start_blocked(client, key, **form):
+    """Send a request that stays inside the view until client.app.release is set"""
+    client.app.release.clear()
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(post(client, key, **form)))
+    thread.start()
+    assert client.app.entered.wait(5)
+    return thread, responses
+
+
+def test_repeat_attaches_to_the_running_request(client):
+    thread, first = start_blocked(client, 'key-4', name='jo.pdf')
+    repeats = []
+    repeat = threading.Thread(target=lambda: repeats.append(post(client, 'key-4', name='jo.pdf')))
+    repeat.start()
+    repeat.join(0.2)
+    assert repeat.is_alive()                      # waiting on the running request, not running the view
+
+    client.app.release.set()
+    thread.join(5)
+    repeat.join(5)
+    assert client.app.calls == 1
+    assert repeats[0].status_code == 201
+    assert repeats[0].get_json() == first[0].get_json()
+    assert repeats[0].headers['Idempotent-Replayed'] == 'true'
+
+
+def test_different_body_for_a_running_key_is_rejected(client):
+    thread, first = start_blocked(client, 'key-5', name='a.pdf')
+    try:
+        assert post(client, 'key-5', name='b.pdf').status_code == 422
+    finally:
+        client.app.release.set()
+        thread.join(5)
+    assert first[0].status_code == 201
+    assert client.app.calls == 1
+
+
+def test_repeat_gives_up_with_409_while_the_first_still_runs(client, monkeypatch):
+    monkeypatch.setattr(idempotency, 'IDEMPOTENCY_WAIT', 0.2)
+    thread, _ = start_blocked(client, 'key-6', name='a.pdf')
+    try:
+        response = post(client, 'key-6', name='a.pdf')
+        assert response.status_code == 409
+        assert response.headers['Retry-After'] == '5'
+    finally:
+        client.app.release.set()
+        thread.join(5)
+    assert client.app.calls == 1
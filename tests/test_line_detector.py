@@ -0,0 +1,43 @@
+import cv2
+import numpy as np
+
+from line_detector import detect_lines, line_positions
+
+
+def blank(height=400, width=600):
+    return np.full((height, width), 255, dtype=np.uint8)
+
+
+def test_thick_rules_come_back_as_single_lines():
+    page = blank()
+    page[100:103, 50:550] = 0          # 3 px horizontal rule
+    page[20:380, 300:302] = 0          # 2 px vertical rule
+    lines = detect_lines(page)
+    assert len(lines['horizontal']) == 1
+    y, x0, x1, thickness = lines['horizontal'][0]
+    assert abs(y - 101) <= 1 and x0 <= 51 and x1 >= 549 and thickness == 3
+    assert len(lines['vertical']) == 1
+    x, y0, y1, thickness = lines['vertical'][0]
+    assert abs(x - 300.5) <= 1 and y0 <= 21 and y1 >= 379 and thickness == 2
+
+
+def test_small_gaps_are_bridged_and_text_is_ignored():
+    page = blank()
+    page[200, 50:250] = 0
+    page[200, 256:550] = 0             # 6 px gap, under max_gap
+    cv2.putText(page, 'INVOICE NUMBER 12345 DOOR FRAME', (40, 320),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+    horizontal = detect_lines(page)['horizontal']
+    assert len(horizontal) == 1
+    assert horizontal[0][1] <= 51 and horizontal[0][2] >= 549
+
+
+def test_scale_converts_to_points_and_positions_group():
+    page = blank()
+    page[100, 50:550] = 0
+    page[300, 50:300] = 0
+    page[300, 302:550] = 0             # one rule split by a divider
+    horizontal = detect_lines(page, scale=2.0, max_gap=1)['horizontal']
+    assert len(horizontal) == 3
+    assert np.allclose(line_positions(horizontal), [50.25, 150.25])   # pixel centres: (row + 0.5) / scale
+    assert np.allclose(line_positions(horizontal, min_span=200), [50.25])
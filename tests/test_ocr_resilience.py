@@ -0,0 +1,86 @@
+import time
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from ocr_resilience import (CircuitBreaker, CircuitOpenError, call_with_resilience,
+                            CLOSED, OPEN, HALF_OPEN)
+
+
+def breaker(name, **kwargs):
+    kwargs.setdefault('failure_threshold', 3)
+    kwargs.setdefault('reset_timeout', 0.05)
+    return CircuitBreaker(f"test_{name}", **kwargs)
+
+
+def fail_with(error):
+    def call():
+        raise error
+    return call
+
+
+def call(b, fn):
+    return call_with_resilience(b.name, fn, b, deadline=5, timing_name=f"{b.name}.seconds")
+
+
+def test_consecutive_backend_failures_open_the_breaker():
+    b = breaker('opens')
+    for _ in range(3):
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            call(b, fail_with(google_exceptions.ServiceUnavailable('down')))
+    assert b.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        call(b, lambda: 'ok')
+
+
+@pytest.mark.parametrize('error', [
+    google_exceptions.InvalidArgument('bad document'),
+    google_exceptions.PermissionDenied('no access'),
+    ValueError('unreadable file'),
+])
+def test_client_errors_pass_through_unrecorded(error):
+    b = breaker(f"client_{type(error).__name__}")
+    for _ in range(5):
+        with pytest.raises(type(error)):
+            call(b, fail_with(error))
+    assert b.state == CLOSED
+    assert b.consecutive_failures == 0
+
+
+@pytest.mark.parametrize('error', [
+    google_exceptions.ResourceExhausted('quota'),
+    google_exceptions.InternalServerError('oops'),
+    google_exceptions.DeadlineExceeded('slow'),
+    ConnectionError('reset'),
+])
+def test_backend_errors_are_counted(error):
+    b = breaker(f"backend_{type(error).__name__}", failure_threshold=1)
+    with pytest.raises(type(error)):
+        call(b, fail_with(error))
+    assert b.state == OPEN
+
+
+def test_half_open_trial_closes_or_reopens():
+    b = breaker('half_open', failure_threshold=1)
+    with pytest.raises(TimeoutError):
+        call(b, fail_with(TimeoutError('slow')))
+    time.sleep(0.06)
+    with pytest.raises(TimeoutError):
+        call(b, fail_with(TimeoutError('still slow')))
+    assert b.state == OPEN
+
+    time.sleep(0.06)
+    assert call(b, lambda: 'ok') == 'ok'
+    assert b.state == CLOSED
+
+
+def test_client_error_in_half_open_frees_the_trial():
+    b = breaker('half_open_client', failure_threshold=1)
+    with pytest.raises(TimeoutError):
+        call(b, fail_with(TimeoutError('slow')))
+    time.sleep(0.06)
+    with pytest.raises(google_exceptions.InvalidArgument):
+        call(b, fail_with(google_exceptions.InvalidArgument('bad document')))
+    assert b.state == HALF_OPEN
+    assert call(b, lambda: 'ok') == 'ok'
+    assert b.state == CLOSED
@@ -0,0 +1,67 @@
+import gc
+
+import fitz  # PyMuPDF
+import numpy as np
+import pytest
+
+from page_rasterizer import PageRasterizer
+
+
+@pytest.fixture
+def six_page_pdf(tmp_path):
+    path = str(tmp_path / 'six.pdf')
+    doc = fitz.open()
+    for n in range(6):
+        page = doc.new_page()
+        page.insert_text((72, 72 + n * 40), f"page {n} " * 6, fontsize=20)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def reference_pages(path, dpi):
+    with fitz.open(path) as doc:
+        return [np.frombuffer(doc[n].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False).samples,
+                              dtype=np.uint8).copy() for n in range(doc.page_count)]
+
+
+def churn():
+    gc.collect()
+    return [np.full(4_000_000, 7, dtype=np.uint8) for _ in range(10)]
+
+
+def test_arrays_survive_eviction(six_page_pdf):
+    rasterizer = PageRasterizer(max_bytes=9 * 1024 * 1024)
+    arrays = rasterizer.render_document(six_page_pdf, dpi=200)
+    assert rasterizer.stats()['cached_pages'] < 6
+    churn()
+    for array, expected in zip(arrays, reference_pages(six_page_pdf, 200)):
+        assert np.array_equal(array.ravel(), expected)
+
+
+def test_arrays_survive_when_never_cached(six_page_pdf):
+    rasterizer = PageRasterizer(max_bytes=1024)
+    page = rasterizer.render_page(six_page_pdf, 2, dpi=100)
+    assert rasterizer.stats()['cached_pages'] == 0
+    churn()
+    assert np.array_equal(page.ravel(), reference_pages(six_page_pdf, 100)[2])
+
+
+def test_cache_hits_return_shared_read_only_arrays(six_page_pdf):
+    rasterizer = PageRasterizer()
+    first = rasterizer.render_page(six_page_pdf, 0, dpi=72)
+    again = rasterizer.render_page(six_page_pdf, 0, dpi=72)
+    assert again is first
+    assert not first.flags.writeable
+    assert rasterizer.stats()['hits'] == 1
+
+
+def test_lru_stays_within_budget(six_page_pdf):
+    page_bytes = PageRasterizer().render_page(six_page_pdf, 0, dpi=72).nbytes
+    rasterizer = PageRasterizer(max_bytes=page_bytes * 2)
+    rasterizer.render_document(six_page_pdf, dpi=72)
+    stats = rasterizer.stats()
+    assert stats['cached_pages'] == 2
+    assert rasterizer.cached_bytes <= page_bytes * 2
+    rasterizer.render_page(six_page_pdf, 5, dpi=72)
+    assert rasterizer.stats()['hits'] == 1     # the newest pages are the ones kept
@@ -0,0 +1,42 @@
+import time
+import threading
+
+from progress_events import ProgressTracker
+
+
+def frames(stream):
+    return [frame for frame in stream if not frame.startswith(('retry', ':'))]
+
+
+def test_stream_replays_events_and_ends_at_a_terminal_stage(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    tracker.start('job-00001')
+    tracker.publish('job-00001', 'saved')
+    threading.Timer(0.1, tracker.publish, ('job-00001', 'session_created')).start()
+    sent = frames(tracker.stream('job-00001', max_seconds=5))
+    assert [frame.split('\n')[1] for frame in sent] == ['event: saved', 'event: session_created']
+
+
+def test_unknown_job_ends_after_the_grace_period(tmp_path):
+    tracker = ProgressTracker(str(tmp_path))
+    start = time.time()
+    sent = frames(tracker.stream('never-published', max_seconds=30, grace_seconds=0.2))
+    assert time.time() - start < 2
+    assert sent[-1].startswith('event: failed') and 'Unknown job' in sent[-1]
+
+
+def test_streams_over_the_cap_get_a_snapshot_and_poll(tmp_path):
+    tracker = ProgressTracker(str(tmp_path), max_streams=1)
+    tracker.start('job-00002')
+    tracker.publish('job-00002', 'saved')
+
+    live = tracker.stream('job-00002', max_seconds=30)
+    next(live)                                        # holds the only slot
+    start = time.time()
+    overflow = list(tracker.stream('job-00002', max_seconds=30))
+    assert time.time() - start < 1
+    assert overflow[0].startswith('retry: 3000')
+    assert [frame.split('\n')[1] for frame in overflow[1:]] == ['event: saved']
+
+    live.close()                                      # a closed stream frees its slot
+    assert tracker.stream_slots.acquire(blocking=False)
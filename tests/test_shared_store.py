@@ -0,0 +1,58 @@
+import json
+import time
+import multiprocessing
+
+from shared_store import FileStore
+
+
+def test_add_claims_absent_key_once(tmp_path):
+    store = FileStore(str(tmp_path))
+    assert store.add('job:1', {'owner': 'a'}, ttl=60)
+    assert not store.add('job:1', {'owner': 'b'}, ttl=60)
+    assert store.get('job:1') == {'owner': 'a'}
+    store.delete('job:1')
+    assert store.add('job:1', {'owner': 'c'}, ttl=60)
+
+
+def test_expired_key_reads_as_absent_and_can_be_reclaimed(tmp_path):
+    store = FileStore(str(tmp_path))
+    store.set('job:2', 'old', ttl=0.05)
+    assert store.get('job:2') == 'old'
+    time.sleep(0.1)
+    assert store.get('job:2') is None
+    assert store.add('job:2', 'new', ttl=60)
+    assert store.get('job:2') == 'new'
+
+
+def test_cleanup_removes_only_expired_keys(tmp_path):
+    store = FileStore(str(tmp_path))
+    store.set('stale', 1, ttl=0.05)
+    store.set('live', 2, ttl=60)
+    time.sleep(0.1)
+    store.cleanup()
+    names = [name for name in tmp_path.iterdir() if name.suffix == '.json']
+    assert len(names) == 1
+    assert json.loads(names[0].read_text())['key'] == 'live'
+
+
+def _claim(directory, start, results):
+    store = FileStore(directory)
+    while time.time() < start:
+        pass
+    results.put(store.add('leader', 'me', ttl=60))
+
+
+def test_only_one_process_claims_an_expired_marker(tmp_path):
+    context = multiprocessing.get_context('fork')
+    for _ in range(5):
+        store = FileStore(str(tmp_path))
+        store.set('leader', 'crashed', ttl=-1)
+        results = context.Queue()
+        start = time.time() + 0.2
+        workers = [context.Process(target=_claim, args=(str(tmp_path), start, results)) for _ in range(6)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join(10)
+        claims = [results.get(timeout=5) for _ in workers]
+        assert claims.count(True) == 1
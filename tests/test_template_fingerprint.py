@@ -0,0 +1,85 @@
+import cv2
+import fitz
+import numpy as np
+
+import checkbox_detector
+import line_detector
+from template_fingerprint import IncrementalTemplateAnalysis, code_version
+
+
+def make_template(path, pages=2):
+    with fitz.open() as doc:
+        for number in range(pages):
+            page = doc.new_page()
+            page.insert_text((72, 72), f"JO template page {number}")
+            page.draw_rect(fitz.Rect(72, 100, 300, 140))
+        doc.save(str(path))
+
+
+def logo_png(shade):
+    image = np.full((40, 80, 3), shade, dtype=np.uint8)
+    cv2.circle(image, (40, 20), 15, (255 - shade,) * 3, -1)
+    return cv2.imencode('.png', image)[1].tobytes()
+
+
+def make_form(path, widget_x=72, logo_shade=40, page_0_text='JO template page 0'):
+    """Three pages: text, a text widget, an embedded logo"""
+    with fitz.open() as doc:
+        doc.new_page().insert_text((72, 72), page_0_text)
+        page = doc.new_page()
+        page.insert_text((72, 72), 'Customer')
+        widget = fitz.Widget()
+        widget.field_name = 'customer_name'
+        widget.field_type = fitz.PDF_WIDGET_TYPE_TEXT
+        widget.rect = fitz.Rect(widget_x, 100, widget_x + 200, 120)
+        page.add_widget(widget)
+        page = doc.new_page()
+        page.insert_text((72, 72), 'Sendora')
+        page.insert_image(fitz.Rect(72, 100, 152, 140), stream=logo_png(logo_shade))
+        doc.save(str(path))
+
+
+def analyze(template, output, version):
+    analysis = IncrementalTemplateAnalysis(str(template), str(output), 'test', version=version)
+    for page_number in analysis.pages_to_analyze():
+        analysis.set(page_number, {'page': page_number, 'version': version})
+    analysis.save()
+    return analysis
+
+
+def test_unchanged_template_and_code_reuse_every_page(tmp_path):
+    template = tmp_path / 'template.pdf'
+    make_template(template)
+    analyze(template, tmp_path / 'spec.json', 'v1')
+    again = IncrementalTemplateAnalysis(str(template), str(tmp_path / 'spec.json'), 'test', version='v1')
+    assert again.pages_to_analyze() == []
+    assert again.reused == [0, 1]
+
+
+def test_changed_analysis_code_redoes_every_page(tmp_path):
+    template = tmp_path / 'template.pdf'
+    make_template(template)
+    analyze(template, tmp_path / 'spec.json', 'v1')
+    rerun = analyze(template, tmp_path / 'spec.json', 'v2')
+    assert rerun.reused == []
+    assert rerun.page_results() == [{'page': 0, 'version': 'v2'}, {'page': 1, 'version': 'v2'}]
+
+
+def test_code_version_follows_the_source_files():
+    assert code_version(line_detector.detect_lines) == code_version(line_detector)
+    assert code_version(line_detector) != code_version(line_detector, checkbox_detector)
+    assert code_version(line_detector, checkbox_detector) == code_version(checkbox_detector, line_detector)
+
+
+def test_only_the_edited_page_is_analyzed_again(tmp_path):
+    template = tmp_path / 'form.pdf'
+    output = tmp_path / 'form_spec.json'
+    make_form(template)
+    analyze(template, output, 'v1')
+
+    for edit, changed_page in [({'widget_x': 272}, 1), ({'logo_shade': 200}, 2),
+                               ({'page_0_text': 'JO template page 0 rev B'}, 0)]:
+        make_form(template, **edit)
+        analysis = IncrementalTemplateAnalysis(str(template), str(output), 'test', version='v1')
+        assert analysis.pages_to_analyze() == [changed_page], edit
+        make_form(template)